@@ -0,0 +1,106 @@
+# бенчмарк режима distort: n-граммный движок против пути через модель
+"""
+Сравнивает задержку хода distort при DISTORT_ENGINE=local (src/ai/ngram.py)
+и DISTORT_ENGINE=llm (заглушка Ollama, benchmarks/ollama_stub.py), а
+также время обучения модели, загрузки ее из файла и одной генерации.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_distort.py [--turns 50] [--ttft 0.3] [--tps 25] [--think 0]
+"""
+
+import argparse
+import dataclasses
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_e2e import INPUTS, percentiles  # noqa: E402
+from ollama_stub import OllamaStub, StubConfig  # noqa: E402
+
+from src.ai.ngram import NgramModel, _read_corpus, _sources  # noqa: E402
+from src.modules import distort  # noqa: E402
+from src.settings import get_settings, set_settings  # noqa: E402
+
+
+def bench_model(repeat: int) -> dict:
+    settings = get_settings()
+    started = time.perf_counter()
+    model = NgramModel.train(_read_corpus(settings))
+    trained = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "distort.ngram")
+        sources = _sources(settings)
+        model.save(path, sources)
+        started = time.perf_counter()
+        NgramModel.load(path, sources)
+        loaded = time.perf_counter() - started
+        size = os.path.getsize(path)
+
+    started = time.perf_counter()
+    for i in range(repeat):
+        model.generate(INPUTS[i % len(INPUTS)], settings.distort_max_words)
+    generated = (time.perf_counter() - started) / repeat
+    return {
+        "words": len(model),
+        "contexts": len(model.keys),
+        "file_bytes": size,
+        "train_ms": trained * 1000,
+        "load_ms": loaded * 1000,
+        "generate_us": generated * 1e6,
+    }
+
+
+def bench_engine(engine: str, turns: int) -> dict:
+    set_settings(dataclasses.replace(get_settings(), distort_engine=engine))
+    totals, silent = [], 0
+    for i in range(turns):
+        started = time.perf_counter()
+        response = distort(f"{INPUTS[i % len(INPUTS)]} {i}")
+        totals.append(time.perf_counter() - started)
+        if not response:
+            silent += 1
+    return {"turn": percentiles(totals), "silent": silent}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10_000, help="генераций для замера движка")
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--tps", type=float, default=25.0)
+    parser.add_argument("--think", type=int, default=0)
+    args = parser.parse_args()
+
+    config = StubConfig(ttft=args.ttft, tokens_per_sec=args.tps, think_tokens=args.think)
+    with OllamaStub(config) as stub:
+        # Молчание и кэш не участвуют: каждый ход доходит до движка
+        set_settings(dataclasses.replace(
+            get_settings(),
+            ollama_api_url=stub.url,
+            model_name=config.model,
+            response_cache=False,
+            silence_repeat_window_sec=0.0,
+            distort_empty_probability=0.0,
+        ))
+        model = bench_model(args.repeat)
+        local = bench_engine("local", args.turns)
+        llm = bench_engine("llm", args.turns)
+
+    print(f"n-gram model: {model['words']} words, {model['contexts']} contexts, {model['file_bytes']} bytes")
+    print(f"  train {model['train_ms']:.2f} ms  load {model['load_ms']:.2f} ms  "
+          f"generate {model['generate_us']:.1f} us")
+    for name, data in (("local", local), ("llm", llm)):
+        turn = data["turn"]
+        print(f"distort {name:5s} turn p50 {turn['p50_ms']:8.2f} ms  p95 {turn['p95_ms']:8.2f} ms  "
+              f"silent {data['silent']}/{turn['count']}")
+    if llm["turn"]["p50_ms"] and local["turn"]["p50_ms"]:
+        print(f"local is {llm['turn']['p50_ms'] / local['turn']['p50_ms']:.0f}x faster at p50")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# сквозной бенчмарк задержки поверх заглушки Ollama
+"""
+Меряет полный путь хода (режим -> respond -> HTTP -> фильтры) против
+benchmarks/ollama_stub.py, без GPU и без реальной модели:
+
+- turns:   задержка хода, время до первого видимого токена и число
+           сгенерированных токенов по каждому режиму из src/modules;
+- filters: пропускная способность FilterEngine (целиком и потоком);
+- retry:   поведение ретраев при таймауте, 500, зависании сервера
+           и откате chat -> generate;
+- memory:  пик выделенной памяти за серию ходов (tracemalloc) и maxrss.
+
+Результат пишется в JSON; --compare печатает изменение относительно
+прошлого прогона, чтобы сравнивать коммиты.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_e2e.py [--turns 20] [--ttft 0.05] [--tps 200]
+        [--provider ollama|openai] [--output bench_e2e.json] [--compare old.json]
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import pkgutil
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_filters import synthetic_response  # noqa: E402
+from ollama_stub import OllamaStub, StubConfig  # noqa: E402
+
+import src.modules  # noqa: E402
+from src.ai.client import CancelScope  # noqa: E402
+from src.ai.filters import FilterEngine  # noqa: E402
+from src.ai.responder import respond  # noqa: E402
+from src.settings import get_settings, set_settings  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+INPUTS = [
+    "мне пусто", "что дальше", "я устал", "почему так тихо", "расскажи о пустоте",
+    "зачем это все", "я не знаю", "все повторяется", "кто ты", "где я",
+]
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(values),
+        "mean_ms": statistics.fmean(values) * 1000,
+        "p50_ms": pick(0.50) * 1000,
+        "p95_ms": pick(0.95) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def mode_functions() -> dict:
+    """Все режимы из src/modules: имя модуля = имя функции режима."""
+    found = {}
+    for info in pkgutil.iter_modules(src.modules.__path__):
+        func = getattr(src.modules, info.name, None)
+        if callable(func):
+            found[info.name] = func
+    return found
+
+
+def timed_turn(func, text: str) -> tuple:
+    """(полное время, время до первого видимого токена или None, ответ)."""
+    first = []
+    started = time.perf_counter()
+
+    def on_token(chunk: str) -> None:
+        if not first:
+            first.append(time.perf_counter() - started)
+
+    response = func(text, on_token=on_token, cancel=CancelScope())
+    return time.perf_counter() - started, first[0] if first else None, response
+
+
+def bench_turns(turns: int, stub: OllamaStub) -> dict:
+    results = {}
+    for name, func in mode_functions().items():
+        totals, ttfts, silent = [], [], 0
+        tokens = stub.tokens
+        for i in range(turns):
+            total, ttft, response = timed_turn(func, f"{INPUTS[i % len(INPUTS)]} {i}")
+            totals.append(total)
+            if ttft is not None:
+                ttfts.append(ttft)
+            if not response:
+                silent += 1
+        results[name] = {
+            "turn": percentiles(totals),
+            "first_token": percentiles(ttfts),
+            "silent": silent,
+            # Токенов от модели на ход: бюджет режима, think и ранний обрыв потока
+            "tokens_per_turn": (stub.tokens - tokens) / turns,
+        }
+    return results
+
+
+def bench_filters(size: int, repeat: int) -> dict:
+    text = synthetic_response(size)
+    engine = FilterEngine.for_mode("ask", get_settings())
+    results = {}
+    for label, run in (
+        ("apply", lambda: engine.apply(text)),
+        ("stream", lambda: _stream_all(engine, text)),
+    ):
+        best = min(_time(run) for _ in range(repeat))
+        results[label] = {"best_ms": best * 1000, "mb_per_sec": len(text.encode("utf-8")) / best / 1e6}
+    return results
+
+
+def _stream_all(engine: FilterEngine, text: str, chunk: int = 4) -> None:
+    stream = engine.stream()
+    for i in range(0, len(text), chunk):
+        stream.feed(text[i:i + chunk])
+        if stream.done:
+            break
+    stream.flush()
+
+
+def _time(run) -> float:
+    started = time.perf_counter()
+    run()
+    return time.perf_counter() - started
+
+
+def bench_retry(stub: OllamaStub, base) -> dict:
+    """Сценарии сбоев: сколько запросов ушло и сколько длился ход."""
+    scenarios = {
+        "timeout_then_ok": (dict(hang_first=1, hang_time=1.0), dict(ollama_timeout=0.3, ollama_retry_delay=0.1)),
+        "server_500": (dict(fail_first=1, fail_status=500), dict(ollama_retry_delay=0.1)),
+        "chat_404_fallback": (dict(chat_404=True), {}),
+        # Зависший сервер: ход ограничен сроком, а не таймаутом на каждую попытку
+        "hang_deadline": (dict(hang_first=100, hang_time=2.0), dict(ollama_timeout=5.0, ollama_turn_deadline_sec=1.0)),
+    }
+    results = {}
+    for name, (stub_changes, settings_changes) in scenarios.items():
+        stub.config = dataclasses.replace(base, **stub_changes)
+        stub.reset()
+        set_settings(dataclasses.replace(get_settings(), **settings_changes))
+        started = time.perf_counter()
+        response = respond(f"сбой {name}", "ask", on_token=lambda chunk: None)
+        results[name] = {
+            "ms": (time.perf_counter() - started) * 1000,
+            "answered": bool(response),
+            "requests": dict(stub.requests),
+        }
+    stub.config = base
+    return results
+
+
+def bench_memory(turns: int) -> dict:
+    func = mode_functions()["ask"]
+    tracemalloc.start()
+    for i in range(turns):
+        timed_turn(func, f"память {i}")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {"turns": turns, "tracemalloc_peak_kb": peak / 1024}
+    if resource is not None:
+        # Linux отдает килобайты, macOS - байты
+        scale = 1 if sys.platform.startswith("linux") else 1 / 1024
+        result["maxrss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(data: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old: dict, new: dict) -> None:
+    """Изменение метрик *_ms, *_kb и mb_per_sec относительно прошлого прогона."""
+    before, after = flatten(old["results"]), flatten(new["results"])
+    print(f"\n{old['commit']} -> {new['commit']}")
+    for name in sorted(after):
+        if name not in before or not name.endswith(("_ms", "_kb", "mb_per_sec")) or not before[name]:
+            continue
+        change = (after[name] - before[name]) / before[name] * 100
+        print(f"  {name:50s} {before[name]:10.2f} -> {after[name]:10.2f} ({change:+6.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк Star_Void")
+    parser.add_argument("--turns", type=int, default=20, help="ходов на режим")
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--tps", type=float, default=200.0)
+    parser.add_argument("--think", type=int, default=20)
+    parser.add_argument("--filter-size", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--provider", default="ollama", help="LLM_PROVIDER: ollama или openai")
+    parser.add_argument("--output", default="bench_e2e.json")
+    parser.add_argument("--compare", help="JSON прошлого прогона")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    base = StubConfig(ttft=args.ttft, tokens_per_sec=args.tps, think_tokens=args.think)
+    with OllamaStub(base) as stub:
+        # Паузы интерфейса и кэш не участвуют: меряется только путь ответа
+        settings = dataclasses.replace(
+            get_settings(),
+            llm_provider=args.provider,
+            ollama_api_url=stub.url,
+            openai_api_url=stub.openai_url,
+            model_name=base.model,
+            response_cache=False,
+            silence_repeat_window_sec=0.0,
+        )
+        set_settings(settings)
+
+        results = {
+            "turns": bench_turns(args.turns, stub),
+            "filters": bench_filters(args.filter_size, 5),
+            "memory": bench_memory(args.turns),
+        }
+        results["retry"] = bench_retry(stub, base)
+        set_settings(settings)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, data in results["turns"].items():
+        turn = data["turn"]
+        first = data["first_token"].get("p50_ms")
+        first_text = f"{first:7.1f} ms" if first is not None else "      -"
+        print(f"{name:10s} turn p50 {turn['p50_ms']:7.1f} ms  p95 {turn['p95_ms']:7.1f} ms  "
+              f"first token p50 {first_text}  tokens {data['tokens_per_turn']:5.1f}  "
+              f"silent {data['silent']}/{turn['count']}")
+    for name, data in results["filters"].items():
+        print(f"filters {name:6s} {data['mb_per_sec']:8.1f} MB/s")
+    for name, data in results["retry"].items():
+        print(f"retry {name:18s} {data['ms']:7.1f} ms  answered={data['answered']}  {data['requests']}")
+    print(f"memory peak {results['memory']['tracemalloc_peak_kb']:.0f} KB")
+    print(f"\nresults: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
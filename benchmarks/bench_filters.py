@@ -0,0 +1,124 @@
+# микро-бенчмарк фильтров: старая цепочка против FilterEngine
+"""
+Сравнивает цепочку filter_thinking -> filter_advice -> filter_empathy ->
+filter_length с однопроходным FilterEngine (целиком и по кускам потока)
+на больших синтетических ответах.
+
+Цепочка и engine.apply сравниваются при одинаковых условиях: те же
+фильтры и лимит длины (--max-len), без MODE_MAX_SENTENCES. Движок
+режима ask с лимитом предложений выводится отдельно - он раньше
+останавливается, и с цепочкой его сравнивать нечестно. --max-len 0
+снимает лимит длины: обе стороны читают ответ до конца.
+
+Без лимита длины engine.apply медленнее цепочки (около 2x на 50k
+символов): он обрабатывает каждое совпадение в Python, а цепочка -
+встроенными re.sub и str.replace целиком. Выигрыш движка - ранняя
+остановка на лимите длины и предложений и ответ по кускам потока.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_filters.py [--size 200000] [--repeat 20] [--chunk 4] [--max-len 200]
+"""
+
+import argparse
+import dataclasses
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai.filters import (  # noqa: E402
+    FilterEngine,
+    filter_advice,
+    filter_empathy,
+    filter_length,
+    filter_thinking,
+)
+from src.settings import get_settings  # noqa: E402
+
+WORDS = [
+    "пустота", "тишина", "внутри", "ничего", "время", "мысль", "дорога",
+    "лучше", "стоит", "Понимаю", "сочувствую", "мне жаль", "вопрос",
+    "okay", "the", "user", "seems", "to", "feel", "empty",
+]
+
+
+def synthetic_response(size: int, seed: int = 0) -> str:
+    """Ответ в стиле deepseek-r1: длинный <think> и несколько строк ответа."""
+    rng = random.Random(seed)
+    think = " ".join(rng.choice(WORDS) for _ in range(size // 8))
+    lines = []
+    while sum(len(line) for line in lines) < size // 4:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 14))]
+        lines.append(" ".join(words) + rng.choice([".", "?", "..."]))
+    return f"<think>\n{think}\n</think>\n\n" + "\n".join(lines)
+
+
+def legacy_chain(text: str, settings=None) -> str:
+    text = filter_thinking(text)
+    text = filter_advice(text, settings)
+    text = filter_empathy(text, "ask", settings)
+    return filter_length(text, settings)
+
+
+def engine_stream(engine: FilterEngine, text: str, chunk: int = 4) -> str:
+    stream = engine.stream()
+    parts = []
+    for i in range(0, len(text), chunk):
+        parts.append(stream.feed(text[i:i + chunk]))
+        if stream.done:
+            break
+    parts.append(stream.flush())
+    return "".join(parts)
+
+
+def measure(func, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def ratio(base: float, other: float) -> str:
+    """Во сколько раз other быстрее base (или медленнее, если меньше 1)."""
+    if other <= base:
+        return f"{base / other:.1f}x faster"
+    return f"{other / base:.1f}x slower"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000, help="размер ответа в символах")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--chunk", type=int, default=4, help="размер куска потока")
+    parser.add_argument("--max-len", type=int, default=None, help="лимит длины (по умолчанию MAX_RESPONSE_LENGTH, 0 - без лимита)")
+    args = parser.parse_args()
+
+    text = synthetic_response(args.size)
+    settings = get_settings()
+    max_len = settings.max_response_length if args.max_len is None else (args.max_len or len(text) * 2)
+    settings = dataclasses.replace(settings, max_response_length=max_len)
+    # Те же фильтры, что у цепочки: без лимита предложений
+    engine = FilterEngine(max_len=max_len)
+    ask = FilterEngine(max_len=max_len, max_sentences=settings.max_sentences_for("ask"))
+
+    base = measure(lambda t: legacy_chain(t, settings), text, args.repeat)
+    applied = measure(engine.apply, text, args.repeat)
+    limited = measure(ask.apply, text, args.repeat)
+    streamed = measure(lambda t: engine_stream(engine, t, args.chunk), text, args.repeat)
+    chunks = -(-len(text) // args.chunk)
+
+    print(f"response size: {len(text)} chars, max_len {max_len}, best of {args.repeat}")
+    print(f"  legacy chain: {base * 1000:8.2f} ms")
+    print(f"  engine.apply: {applied * 1000:8.2f} ms  ({ratio(base, applied)})")
+    print(f"  apply ask:{ask.max_sentences or '-'}  : {limited * 1000:8.2f} ms  (with sentence limit, not comparable)")
+    # Поток сравнивать с цепочкой нечестно: там нет ответа до конца генерации
+    print(f" engine.stream: {streamed * 1000:8.2f} ms  "
+          f"({streamed / chunks * 1e6:.2f} us per {args.chunk}-char chunk)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# бенчмарк семантического кэша: поиск по матрице и ходы с перефразами
+"""
+Меряет:
+- search: поиск top-1 по SemanticIndex на --entries записях размерности
+  --dim (без сервера, случайные векторы);
+- turns:  ходы ask через respond() против заглушки Ollama, где реплики -
+  перефразы друг друга: задержка промаха (вложение + генерация) и
+  попадания (только вложение), доля попаданий.
+
+Запуск из корня репозитория (нужен NumPy):
+    python benchmarks/bench_semantic.py [--entries 512] [--dim 768] [--threshold 0.7]
+"""
+
+import argparse
+import dataclasses
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_e2e import percentiles  # noqa: E402
+from ollama_stub import OllamaStub, StubConfig  # noqa: E402
+
+from src.ai.responder import respond  # noqa: E402
+from src.ai.semantic import SemanticIndex, _load_numpy, get_semantic_cache  # noqa: E402
+from src.settings import get_settings, set_settings  # noqa: E402
+
+PARAPHRASES = [
+    ["мне пусто", "внутри пусто", "пустота внутри", "мне так пусто"],
+    ["я устал", "я очень устал", "устал я", "как же я устал"],
+    ["почему так тихо", "почему здесь так тихо", "так тихо почему"],
+    ["кто ты", "кто ты такой", "ты кто"],
+]
+
+
+def bench_search(entries: int, dim: int, repeat: int) -> dict:
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    index = SemanticIndex(entries, dim)
+    vectors = rng.standard_normal((entries, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    for vector in vectors:
+        index.add(vector, 0, "", "")
+    query = vectors[entries // 2]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        index.search(query, 0)
+        timings.append(time.perf_counter() - started)
+    return percentiles(timings)
+
+
+def bench_turns(stub: OllamaStub, threshold: float) -> dict:
+    set_settings(dataclasses.replace(
+        get_settings(),
+        ollama_api_url=stub.url,
+        model_name=stub.config.model,
+        response_cache=False,
+        response_cache_serve_probability=1.0,
+        silence_repeat_window_sec=0.0,
+        semantic_cache=True,
+        semantic_cache_dir="",
+        semantic_cache_threshold=threshold,
+    ))
+    hits, misses = [], []
+    for group in PARAPHRASES:
+        for text in group:
+            before = get_semantic_cache().stats()["hits"]
+            started = time.perf_counter()
+            respond(text, "ask")
+            elapsed = time.perf_counter() - started
+            (hits if get_semantic_cache().stats()["hits"] > before else misses).append(elapsed)
+    return {"hit": percentiles(hits), "miss": percentiles(misses), "stats": get_semantic_cache().stats()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=512)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=0.7, help="SEMANTIC_CACHE_THRESHOLD для заглушки")
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--tps", type=float, default=25.0)
+    args = parser.parse_args()
+    if not _load_numpy():
+        parser.error("нужен NumPy: pip install numpy")
+
+    search = bench_search(args.entries, args.dim, args.repeat)
+    print(f"search {args.entries}x{args.dim}: p50 {search['p50_ms'] * 1000:.1f} us  p95 {search['p95_ms'] * 1000:.1f} us")
+
+    with OllamaStub(StubConfig(ttft=args.ttft, tokens_per_sec=args.tps, think_tokens=0)) as stub:
+        turns = bench_turns(stub, args.threshold)
+    for name in ("miss", "hit"):
+        data = turns[name]
+        if data["count"]:
+            print(f"turn {name:4s} p50 {data['p50_ms']:8.1f} ms  p95 {data['p95_ms']:8.1f} ms  ({data['count']} turns)")
+    stats = turns["stats"]
+    print(f"hit ratio {stats['hit_ratio']:.0%}  ({stats['hits']} hits, {stats['misses']} misses)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# бенчмарк холодного старта: время импорта и время до первого экрана
+"""
+Два замера в отдельных процессах (каждый запуск - холодный интерпретатор):
+
+1. python -X importtime -c "import main" - суммарное время импорта main
+   и самые дорогие из его зависимостей;
+2. время от запуска main.py до приглашения ввести имя. Ollama
+   подменяется локальной заглушкой, поэтому замер воспроизводим
+   и не зависит от загрузки модели.
+
+При превышении бюджета скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_startup.py [--runs 5] [--import-budget-ms 150] [--prompt-budget-ms 800]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from ollama_stub import OllamaStub, StubConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT = "Введи свое имя".encode("utf-8")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Вывод -X importtime -> {модуль верхнего уровня: (cumulative_us, [(name, cumulative_us), ...])}.
+
+    Вложенные импорты печатаются до родителя, поэтому все строки с отступом
+    перед строкой верхнего уровня - его зависимости.
+    """
+    roots = {}
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if name.startswith("  "):
+            children.append((name.strip(), int(cumulative_us)))
+        else:
+            roots[name.strip()] = (int(cumulative_us), children)
+            children = []
+    return roots
+
+
+def measure_import(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure_first_prompt(env: dict, timeout: float = 30.0) -> float:
+    """Секунды от запуска main.py до приглашения ввести имя."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", "main.py"],
+        cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    output = b""
+    try:
+        while PROMPT not in output:
+            chunk = os.read(process.stdout.fileno(), 4096)
+            if not chunk:
+                raise RuntimeError("main.py завершился до приглашения:\n" + output.decode("utf-8", "replace"))
+            output += chunk
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError("нет приглашения за отведенное время")
+        elapsed = time.perf_counter() - started
+        process.communicate(b"bench\n/quit\n", timeout=timeout)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="сколько дорогих импортов показать")
+    parser.add_argument("--import-budget-ms", type=float, default=150.0)
+    parser.add_argument("--prompt-budget-ms", type=float, default=800.0)
+    args = parser.parse_args()
+
+    stub = OllamaStub(StubConfig()).start()
+
+    env = dict(os.environ)
+    env.update({
+        "OLLAMA_API_URL": stub.url,
+        "MODEL_NAME": stub.config.model,
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    # Кэш байткода должен быть уже на диске: меряем запуск, а не компиляцию
+    subprocess.run([sys.executable, "-m", "compileall", "-q", "main.py", "src"], cwd=ROOT, check=True)
+
+    import_runs = [measure_import(env) for _ in range(args.runs)]
+    import_ms = statistics.median(run["main"][0] for run in import_runs) / 1000
+    prompt_ms = statistics.median(measure_first_prompt(env) for _ in range(args.runs)) * 1000
+    stub.stop()
+
+    print(f"import main:        {import_ms:8.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"first prompt:       {prompt_ms:8.1f} ms (budget {args.prompt_budget_ms:.0f} ms)")
+
+    # Самые дорогие импорты, которые тянет main (по последнему запуску)
+    heavy = sorted(import_runs[-1]["main"][1], key=lambda item: item[1], reverse=True)
+    print("\nheaviest imports under main:")
+    for name, cumulative in heavy[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = []
+    if import_ms > args.import_budget_ms:
+        failed.append(f"import main {import_ms:.1f} ms > {args.import_budget_ms:.0f} ms")
+    if prompt_ms > args.prompt_budget_ms:
+        failed.append(f"first prompt {prompt_ms:.1f} ms > {args.prompt_budget_ms:.0f} ms")
+    for message in failed:
+        print(f"BUDGET EXCEEDED: {message}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# нагрузочный генератор для сервера сессий (src/server.py)
+"""
+Открывает много одновременных сессий к серверу Star_Void и меряет
+пропускную способность (сессий и ходов в секунду) и задержки: время
+до первого токена и полное время хода, p50/p95/max.
+
+По умолчанию сервер и заглушка Ollama (benchmarks/ollama_stub.py)
+поднимаются в этом же процессе; --connect направляет нагрузку на уже
+запущенный сервер.
+
+Запуск из корня репозитория:
+    python benchmarks/loadgen.py [--sessions 50] [--concurrency 10] [--turns 3]
+        [--mode ask] [--mix] [--slots 2] [--ttft 0.05] [--tps 200]
+        [--connect 127.0.0.1:8765] [--output loadgen.json]
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_e2e import INPUTS, percentiles  # noqa: E402
+from ollama_stub import OllamaStub, StubConfig  # noqa: E402
+
+from src.ai.scheduler import get_scheduler  # noqa: E402
+from src.server import Server  # noqa: E402
+from src.settings import get_settings, set_settings  # noqa: E402
+
+
+# Режимы --mix: от самого важного для планировщика к наименее важному
+MIX_MODES = ("psycholog", "ask", "distort", "void")
+
+
+class Stats:
+    def __init__(self):
+        self.turns = []
+        self.first_tokens = []
+        self.sessions = 0
+        self.outcomes = Counter()
+        self.by_mode = defaultdict(list)
+        self.silent_by_mode = Counter()
+
+
+async def run_session(host: str, port: int, mode: str, turns: int, stats: Stats) -> None:
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+
+    async def receive() -> dict:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("сервер закрыл соединение")
+        return json.loads(line)
+
+    def send(payload: dict) -> None:
+        writer.write(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    try:
+        ready = await receive()
+        send({"type": "hello", "name": ready["session"], "mode": mode})
+        await receive()  # подтверждение режима
+        for i in range(turns):
+            started = time.perf_counter()
+            first = None
+            send({"type": "message", "text": f"{INPUTS[i % len(INPUTS)]} {i}"})
+            await writer.drain()
+            while True:
+                event = await receive()
+                if event["type"] == "token":
+                    if first is None:
+                        first = time.perf_counter() - started
+                    continue
+                break
+            if event["type"] == "done":
+                stats.turns.append(time.perf_counter() - started)
+                stats.by_mode[mode].append(stats.turns[-1])
+                if first is not None:
+                    stats.first_tokens.append(first)
+                stats.outcomes["answered" if event["text"] else "silent"] += 1
+                if not event["text"]:
+                    stats.silent_by_mode[mode] += 1
+            else:
+                stats.outcomes[event["type"]] += 1
+        stats.sessions += 1
+    except (ConnectionError, OSError) as e:
+        stats.outcomes[f"connection: {type(e).__name__}"] += 1
+    finally:
+        writer.close()
+
+
+async def generate_load(host: str, port: int, args) -> dict:
+    stats = Stats()
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one(mode: str) -> None:
+        async with gate:
+            await run_session(host, port, mode, args.turns, stats)
+
+    modes = MIX_MODES if args.mix else (args.mode,)
+    started = time.perf_counter()
+    await asyncio.gather(*(one(modes[i % len(modes)]) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed_sec": elapsed,
+        "sessions": stats.sessions,
+        "sessions_per_sec": stats.sessions / elapsed,
+        "turns_per_sec": len(stats.turns) / elapsed,
+        "turn": percentiles(stats.turns),
+        "first_token": percentiles(stats.first_tokens),
+        "outcomes": dict(stats.outcomes),
+        "modes": {
+            mode: {"turn": percentiles(values), "silent": stats.silent_by_mode[mode]}
+            for mode, values in stats.by_mode.items()
+        },
+    }
+
+
+async def run(args) -> dict:
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        return await generate_load(host, int(port), args)
+
+    config = StubConfig(ttft=args.ttft, tokens_per_sec=args.tps, think_tokens=args.think)
+    with OllamaStub(config) as stub:
+        # Молчание и кэш не участвуют: каждый ход доходит до модели
+        set_settings(dataclasses.replace(
+            get_settings(),
+            ollama_api_url=stub.url,
+            ollama_api_urls=(),
+            model_name=config.model,
+            response_cache=False,
+            distort_empty_probability=0.0,
+            void_speak_probability=1.0,
+            silence_repeat_window_sec=0.0,
+            enable_logging=False,
+            scheduler_concurrency=args.slots or get_settings().scheduler_concurrency,
+        ))
+        server = await Server().start("127.0.0.1", 0)
+        try:
+            host, port = server.address[:2]
+            result = await generate_load(host, port, args)
+        finally:
+            await server.close()
+        result["backend_requests"] = dict(stub.requests)
+        result["scheduler"] = get_scheduler().stats()
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузка на сервер сессий Star_Void")
+    parser.add_argument("--sessions", type=int, default=50, help="всего сессий")
+    parser.add_argument("--concurrency", type=int, default=10, help="одновременных сессий")
+    parser.add_argument("--turns", type=int, default=3, help="ходов в сессии")
+    parser.add_argument("--mode", default="ask")
+    parser.add_argument("--mix", action="store_true", help="сессии во всех режимах по кругу")
+    parser.add_argument("--slots", type=int, default=None, help="SCHEDULER_CONCURRENCY")
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--tps", type=float, default=200.0)
+    parser.add_argument("--think", type=int, default=20)
+    parser.add_argument("--connect", help="host:port запущенного сервера (без заглушки)")
+    parser.add_argument("--output", help="записать результат в JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": result}, f, ensure_ascii=False, indent=2)
+
+    turn, first = result["turn"], result["first_token"]
+    print(f"sessions {result['sessions']} in {result['elapsed_sec']:.2f} s: "
+          f"{result['sessions_per_sec']:.1f} sessions/s, {result['turns_per_sec']:.1f} turns/s")
+    if turn["count"]:
+        print(f"turn        p50 {turn['p50_ms']:7.1f} ms  p95 {turn['p95_ms']:7.1f} ms  max {turn['max_ms']:7.1f} ms")
+    if first["count"]:
+        print(f"first token p50 {first['p50_ms']:7.1f} ms  p95 {first['p95_ms']:7.1f} ms  max {first['max_ms']:7.1f} ms")
+    if args.mix:
+        for mode, data in result["modes"].items():
+            t = data["turn"]
+            print(f"  {mode:10s} p50 {t['p50_ms']:7.1f} ms  p95 {t['p95_ms']:7.1f} ms  silent {data['silent']}/{t['count']}")
+    print(f"outcomes {result['outcomes']}")
+    if "scheduler" in result:
+        print(f"scheduler {result['scheduler']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+# заглушка Ollama для бенчмарков и ручной проверки без GPU
+"""
+HTTP-сервер, повторяющий нужную Star_Void часть API Ollama:
+/api/tags, /api/ps, /api/chat, /api/generate, /api/embeddings и /api/embed.
+Тот же генератор отвечает и как OpenAI-совместимый сервер (llama.cpp
+server, vLLM): /v1/models, /v1/chat/completions (поток - SSE) и
+/v1/embeddings. Вложения - хэшированные триграммы символов: близкие
+по написанию реплики получают близкие векторы.
+
+Ответ генерируется по токенам с заданными временем до первого токена
+(TTFT) и скоростью (токенов в секунду), с блоком <think> нужной длины
+в стиле deepseek-r1, потоково (NDJSON) или одним JSON - как просит клиент.
+Ошибки внедряются по номерам запросов: 404 на /api/chat, 500 или
+зависание на первые N запросов генерации.
+
+Отдельный процесс:
+    python benchmarks/ollama_stub.py --port 11434 --ttft 0.3 --tps 25 --think 200
+
+Внутри бенчмарка:
+    with OllamaStub(StubConfig(ttft=0.1)) as stub:
+        ...  # OLLAMA_API_URL = stub.url или OPENAI_API_URL = stub.openai_url
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+THINK_WORDS = ["okay", "the", "user", "says", "hmm", "maybe", "silence", "void", "reply", "short"]
+
+
+@dataclass
+class StubConfig:
+    """Поведение заглушки. Меняется на лету: stub.config.ttft = 0.5."""
+
+    model: str = "deepseek-r1:8b"
+    answer: str = "Пустота не отвечает. Она слушает. Что остается, когда слова кончаются?"
+    ttft: float = 0.05               # секунды до первого токена (prefill)
+    tokens_per_sec: float = 200.0    # скорость генерации
+    think_tokens: int = 20           # длина блока <think> в токенах (0 - без блока)
+    load_time: float = 0.0           # загрузка модели при первом запросе генерации
+    chat_404: bool = False           # /api/chat отвечает 404 (старая Ollama)
+    fail_status: int = 500           # код для fail_first
+    fail_first: int = 0              # первые N запросов генерации завершаются ошибкой
+    hang_first: int = 0              # первые N запросов генерации зависают на hang_time
+    hang_time: float = 5.0
+    embedding_dim: int = 384
+
+
+def _tokens(config: StubConfig, request: Optional[dict] = None) -> list:
+    """Токены ответа: <think>...</think>, затем ответ по словам.
+
+    Как у Ollama: think=false выключает размышления, а num_predict
+    (max_tokens в OpenAI API) обрывает ответ на этом числе токенов.
+    """
+    request = request or {}
+    tokens = []
+    if config.think_tokens and request.get("think") is not False:
+        tokens.append("<think>\n")
+        tokens.extend(f"{THINK_WORDS[i % len(THINK_WORDS)]} " for i in range(config.think_tokens))
+        tokens.append("\n</think>\n\n")
+    words = config.answer.split(" ")
+    tokens.extend(word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words))
+    limit = (request.get("options") or {}).get("num_predict") or request.get("max_tokens")
+    return tokens[:limit] if limit else tokens
+
+
+def _embedding(text: str, dim: int) -> list:
+    """Детерминированный нормированный вектор триграмм символов текста."""
+    values = [0.0] * dim
+    text = f" {' '.join(text.lower().split())} "
+    for i in range(len(text) - 2):
+        digest = hashlib.sha256(text[i:i + 3].encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        values[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = sum(value * value for value in values) ** 0.5
+    if not norm:
+        values[0], norm = 1.0, 1.0
+    return [value / norm for value in values]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело уходят отдельными записями: без TCP_NODELAY каждый
+    # ответ ждал бы отложенного ACK клиента (~40 мс)
+    disable_nagle_algorithm = True
+    stub: "OllamaStub"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload: dict) -> None:
+        self._write_chunk(json.dumps(payload, ensure_ascii=False) + "\n")
+
+    def _send_event(self, payload) -> None:
+        """Событие SSE OpenAI: data: {...} или data: [DONE]."""
+        data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+        self._write_chunk(f"data: {data}\n\n")
+
+    def _write_chunk(self, text: str) -> None:
+        line = text.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        config = self.stub.config
+        self.stub.count(self.path)
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": config.model, "model": config.model}]})
+        elif self.path == "/api/ps":
+            loaded = [{"name": config.model, "model": config.model}] if self.stub.loaded else []
+            self._send_json({"models": loaded})
+        elif self.path == "/v1/models":
+            self._send_json({"object": "list", "data": [{"id": config.model, "object": "model"}]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        config = self.stub.config
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.stub.count(self.path)
+
+        if self.path in ("/api/embeddings", "/api/embed", "/v1/embeddings"):
+            return self._embed(request, config)
+        if self.path not in ("/api/chat", "/api/generate", "/v1/chat/completions"):
+            return self._send_json({"error": "not found"}, 404)
+        if self.path == "/api/chat" and config.chat_404:
+            return self._send_json({"error": "404 page not found"}, 404)
+
+        number = self.stub.next_generation()
+        if number <= config.hang_first:
+            # Клиент к этому времени уже отвалился по таймауту
+            time.sleep(config.hang_time)
+            self.close_connection = True
+            return
+        if number <= config.hang_first + config.fail_first:
+            return self._send_json({"error": "injected failure"}, config.fail_status)
+
+        if not self.stub.loaded:
+            time.sleep(config.load_time)
+            self.stub.loaded = True
+
+        if self.path == "/v1/chat/completions":
+            return self._complete(request, config)
+        chat = self.path == "/api/chat"
+        prompt = request.get("prompt")
+        # Пустой промпт /api/generate - только загрузка модели
+        if not chat and not prompt and "context" not in request:
+            return self._send_json({"model": config.model, "response": "", "done": True, "done_reason": "load"})
+
+        self._generate(request, config, chat)
+
+    def _embed(self, request: dict, config: StubConfig) -> None:
+        if self.path == "/api/embeddings":
+            return self._send_json({"embedding": _embedding(request.get("prompt", ""), config.embedding_dim)})
+        inputs = request.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if self.path == "/v1/embeddings":
+            return self._send_json({
+                "object": "list",
+                "model": request.get("model", config.model),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": _embedding(text, config.embedding_dim)}
+                    for i, text in enumerate(inputs)
+                ],
+            })
+        self._send_json({
+            "model": config.model,
+            "embeddings": [_embedding(text, config.embedding_dim) for text in inputs],
+        })
+
+    def _generate(self, request: dict, config: StubConfig, chat: bool) -> None:
+        started = time.perf_counter_ns()
+        tokens = _tokens(config, request)
+        prompt_tokens = len(json.dumps(request.get("messages") or request.get("prompt", ""))) // 4
+        interval = 1.0 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0.0
+        context = list(request.get("context") or []) + list(range(prompt_tokens + len(tokens)))
+
+        def chunk(text: str) -> dict:
+            if chat:
+                return {"model": config.model, "message": {"role": "assistant", "content": text}, "done": False}
+            return {"model": config.model, "response": text, "done": False}
+
+        def final() -> dict:
+            elapsed = time.perf_counter_ns() - started
+            data = chunk("")
+            data.update(
+                done=True,
+                done_reason="stop",
+                total_duration=elapsed,
+                load_duration=0,
+                prompt_eval_count=prompt_tokens,
+                prompt_eval_duration=int(config.ttft * 1e9),
+                eval_count=len(tokens),
+                eval_duration=max(0, elapsed - int(config.ttft * 1e9)),
+            )
+            if not chat:
+                data["context"] = context
+            return data
+
+        # Ollama по умолчанию отвечает потоком
+        if not request.get("stream", True):
+            time.sleep(config.ttft + interval * len(tokens))
+            self.stub.generated(len(tokens))
+            data = final()
+            text = "".join(tokens)
+            if chat:
+                data["message"]["content"] = text
+            else:
+                data["response"] = text
+            return self._send_json(data)
+
+        self._start_stream("application/x-ndjson")
+        try:
+            time.sleep(config.ttft)
+            for token in tokens:
+                self._send_chunk(chunk(token))
+                self.stub.generated(1)
+                time.sleep(interval)
+            self._send_chunk(final())
+            self._end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент закрыл поток (отмена или лимит длины) - генерация прекращается
+            self.stub.count("aborted")
+            self.close_connection = True
+
+    def _complete(self, request: dict, config: StubConfig) -> None:
+        """/v1/chat/completions в формате OpenAI."""
+        tokens = _tokens(config, request)
+        prompt_tokens = len(json.dumps(request.get("messages", ""))) // 4
+        interval = 1.0 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0.0
+        base = {"id": f"chatcmpl-{self.stub.next_generation()}", "created": int(time.time()), "model": config.model}
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+
+        if not request.get("stream"):
+            time.sleep(config.ttft + interval * len(tokens))
+            self.stub.generated(len(tokens))
+            message = {"role": "assistant", "content": "".join(tokens)}
+            return self._send_json({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        def event(delta: dict, finish: Optional[str] = None) -> dict:
+            choice = {"index": 0, "delta": delta, "finish_reason": finish}
+            return {**base, "object": "chat.completion.chunk", "choices": [choice]}
+
+        self._start_stream("text/event-stream")
+        try:
+            time.sleep(config.ttft)
+            self._send_event(event({"role": "assistant", "content": ""}))
+            for token in tokens:
+                self._send_event(event({"content": token}))
+                self.stub.generated(1)
+                time.sleep(interval)
+            self._send_event(event({}, "stop"))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._send_event({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+            self._send_event("[DONE]")
+            self._end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.stub.count("aborted")
+            self.close_connection = True
+
+
+class OllamaStub:
+    """Заглушка Ollama в фоновом потоке. port=0 - свободный порт."""
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.requests = Counter()
+        # Сколько токенов действительно отправлено (оборванный поток - не весь ответ)
+        self.tokens = 0
+        self.loaded = False
+        self._generations = 0
+        self._lock = threading.Lock()
+        handler = type("Handler", (_Handler,), {"stub": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Значение для OLLAMA_API_URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/chat"
+
+    @property
+    def openai_url(self) -> str:
+        """Значение для OPENAI_API_URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] += 1
+
+    def generated(self, count: int) -> None:
+        with self._lock:
+            self.tokens += count
+
+    def next_generation(self) -> int:
+        with self._lock:
+            self._generations += 1
+            return self._generations
+
+    def reset(self) -> None:
+        """Сбрасывает счетчики: внедренные ошибки срабатывают заново."""
+        with self._lock:
+            self.requests.clear()
+            self.tokens = 0
+            self._generations = 0
+
+    def start(self) -> "OllamaStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def __enter__(self) -> "OllamaStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Заглушка Ollama")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default=StubConfig.model)
+    parser.add_argument("--ttft", type=float, default=StubConfig.ttft)
+    parser.add_argument("--tps", type=float, default=StubConfig.tokens_per_sec, dest="tokens_per_sec")
+    parser.add_argument("--think", type=int, default=StubConfig.think_tokens, dest="think_tokens")
+    parser.add_argument("--load-time", type=float, default=StubConfig.load_time)
+    parser.add_argument("--chat-404", action="store_true")
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--fail-status", type=int, default=500)
+    parser.add_argument("--hang-first", type=int, default=0)
+    parser.add_argument("--hang-time", type=float, default=StubConfig.hang_time)
+    args = parser.parse_args()
+
+    names = {f.name for f in fields(StubConfig)}
+    config = StubConfig(**{name: value for name, value in vars(args).items() if name in names})
+    stub = OllamaStub(config, args.host, args.port)
+    print(f"Ollama stub: {stub.url}, OpenAI: {stub.openai_url} ({config.model})")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,18 @@
-import docker
+# До первого экрана импортируется только необходимое: HTTP-клиент,
+# asyncio и режимы подгружаются позже (см. src/repl.py, src/ai/warmup.py)
 import time
 import os
-import requests
-import json
-import subprocess
 import atexit
-import signal
-import threading
-import sys
-import urllib.request
-from dotenv import load_dotenv
 
-from src.ai.responder import respond
-from src.modules import ask, distort, silence, void, psycholog
-from src.utils.delay import random_delay, typing_effect
-
-# Загружаем переменные окружения
-load_dotenv("config/config.env")
+from src.ai.warmup import ModelPreloader, list_models, wait_ready
+from src.settings import get_settings, install_reload_handlers
 
 # Глобальная переменная для управления процессом Ollama
 ollama_process = None
 
 def stop_ollama_local():
+    import subprocess
+
     global ollama_process
     if ollama_process:
         print("\n[system] Завершение работы Ollama...")
@@ -43,17 +34,15 @@ atexit.register(stop_ollama_local)
 
 def ensure_ollama() -> bool:
 
-    model_name = os.getenv('MODEL_NAME', 'deepseek-r1:8b')
+    model_name = get_settings().model
     
     # 1. Сначала попробуем проверить, не запущена ли она уже и работает ли
-    try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=1)
-        if response.status_code == 200:
-            print("[system] Ollama уже запущена и отвечает.")
-            _check_and_pull_model(model_name)
-            return True
-    except Exception:
-        pass
+    if list_models(refresh=True) is not None:
+        print("[system] Ollama уже запущена и отвечает.")
+        _check_and_pull_model(model_name)
+        return True
+
+    import subprocess
 
     # 2. Если не отвечает, очищаем старые процессы (на случай зависания)
     print("[system] Подготовка к запуску Ollama...")
@@ -74,18 +63,19 @@ def ensure_ollama() -> bool:
             start_new_session=True
         )
         
-        # Ждем инициализации API с постепенным увеличением времени
-        for i in range(15):
-            time.sleep(1)
-            try:
-                response = requests.get("http://localhost:11434/api/tags", timeout=2)
-                if response.status_code == 200:
-                    print("[system] Ollama успешно запущена.")
-                    _check_and_pull_model(model_name)
-                    return True
-            except Exception:
-                print(f"[system] Ожидание API Ollama... ({i+1}/15)")
-                continue
+        # Ждем инициализации API: частые проверки вначале, потом реже
+        waiting = []
+
+        def on_wait(elapsed: float) -> None:
+            # Сообщаем раз в секунду, а не на каждую проверку
+            if int(elapsed) >= len(waiting) + 1:
+                waiting.append(elapsed)
+                print(f"[system] Ожидание API Ollama... ({int(elapsed)} с)")
+
+        if wait_ready(on_wait=on_wait):
+            print("[system] Ollama успешно запущена.")
+            _check_and_pull_model(model_name)
+            return True
     except FileNotFoundError:
         print("[error] Команда 'ollama' не найдена. Установите Ollama с сайта ollama.com")
         return False
@@ -98,6 +88,7 @@ def ensure_ollama() -> bool:
 def install_ollama_auto():
     """Автоматическая установка Ollama в зависимости от операционной системы"""
     import platform
+    import subprocess
     system = platform.system().lower()
     
     try:
@@ -130,11 +121,9 @@ def install_ollama_auto():
 def _check_and_pull_model(model_name: str) -> None:
 
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
-        if response.status_code == 200:
-            models = response.json().get('models', [])
-            model_names = [model['name'] for model in models]
-
+        # Список моделей уже получен проверкой готовности
+        model_names = list_models()
+        if model_names is not None:
             target_model = model_name if ':' in model_name else f"{model_name}:latest"
 
             if target_model not in model_names and model_name not in model_names:
@@ -147,6 +136,7 @@ def _check_and_pull_model(model_name: str) -> None:
                     # Попробовать установить Ollama автоматически
                     try:
                         import shutil
+                        import subprocess
                         if not shutil.which("ollama"):
                             print("Ollama не найдена в системе.")
                             choice = input("Хотите попробовать установить Ollama автоматически? (y/n): ")
@@ -180,55 +170,39 @@ def _check_and_pull_model(model_name: str) -> None:
     except Exception as e:
         print(f"\nОшибка при проверке модели Ollama: {e}")
 
-def print_help():
-    print("""
-            /ask       - диалог (краткие ответы, вопросы, дистанция)
-            /distort   - искажение (фрагментация, растворение смысла)
-            /void      - пустота (пассивное присутствие, молчание)
-            /silence   - молчание (полный отказ от ответов)
-            
-            /psycholog - слушатель, может вести диалог
-
-            /quit     - выход из программы
-        """)
-
-class ThinkingAnimation:
-    def __init__(self):
-        self._stop_event = threading.Event()
-        self._thread = None
-
-    def _animate(self):
-        chars = [".  ", ".. ", "...", "  .", "   "]
-        i = 0
-        while not self._stop_event.is_set():
-            sys.stdout.write(f"\r{chars[i % len(chars)]}")
-            sys.stdout.flush()
-            time.sleep(0.1)
-            i += 1
-        sys.stdout.write("\r   \r")
-        sys.stdout.flush()
-
-    def start(self):
-        if os.getenv("USE_THINKING_ANIMATION", "true").lower() == "true":
-            self._stop_event.clear()
-            self._thread = threading.Thread(target=self._animate)
-            self._thread.daemon = True
-            self._thread.start()
-
-    def stop(self):
-        if self._thread:
-            self._stop_event.set()
-            self._thread.join()
-            self._thread = None
-
 def main() -> None:
-    print("Проверка и запуск Ollama...")
-    ollama_ready = ensure_ollama()
+    # Настройки читаются один раз; config.env и SIGHUP подменяют снимок на лету
+    settings = get_settings()
+    install_reload_handlers()
+    if settings.enable_logging:
+        from src.utils.transcript import configure_logging
+        configure_logging(settings)
+
+    # Ollama запускается и проверяется здесь; внешний OpenAI-совместимый
+    # сервер управляется сам, его ошибки видны в первом же ходе
+    uses_ollama = settings.llm_provider.strip().lower() in ('local', 'ollama')
+    if uses_ollama:
+        print("Проверка и запуск Ollama...")
+        ollama_ready = ensure_ollama()
+    else:
+        print(f"[system] Провайдер {settings.llm_provider}: {settings.openai_api_url}")
+        ollama_ready = True
+
+    # Модель грузится в память, пока пользователь вводит имя
+    preloader = None
+    if uses_ollama and ollama_ready and get_settings().ollama_preload:
+        preloader = ModelPreloader().start()
     
-    username = input("Введи свое имя, пожалуйста: ")
+    try:
+        username = input("Введи свое имя, пожалуйста: ")
+    except (KeyboardInterrupt, EOFError):
+        print("\n\nПрограмма завершена.")
+        return
     
     if not ollama_ready:
         print("Ollama недоступна. ИИ-функции не будут работать.")
+    elif preloader is not None:
+        preloader.report()
 
     print("""
                  .   * .      .   .        .
@@ -248,69 +222,14 @@ def main() -> None:
             /help для получения помощи в выборе режима
                     """)
 
-    mode = 'psycholog'
-    modes = {
-        "ask": ask,
-        "distort": distort,
-        "void": void,
-        "silence": silence,
-        "psycholog":  psycholog
-    }
-    
-    animation = ThinkingAnimation()
-
-    while True:
-        try:
-            prompt = f"[{username}] > "
-            user_input = input(prompt).strip()
-            
-            # Обработка команд
-            if user_input.startswith("/"):
-                command = user_input[1:].lower()
-
-                if command in ['exit', 'quit']:
-                    print("\nДо встречи в пустоте...")
-                    break
+    # asyncio, HTTP-клиент и режимы нужны только с этого момента
+    import asyncio
+    from src.repl import Repl
 
-                elif command in modes:
-                    mode = command
-                    print(f"Режим изменен на {mode}")
-                    continue
-
-                elif command == "help":
-                    print_help()
-                    continue
-
-                else:
-                    print(f"Команда '{command}' не распознана. Введите /help для помощи.")
-                    continue
-
-            # Логика ответа
-            random_delay()
-            mode_func = modes.get(mode)
-            
-            if mode_func:
-                animation.start()
-                
-                try:
-                    response = mode_func(user_input)
-                finally:
-                    animation.stop()
-
-                if response:
-                    print(f"[{mode}] > " , end="" )
-                    typing_effect(response)
-                else:
-                    if mode != "silence":
-                        print(f"[{mode}] > " , end="" )
-                        typing_effect("...")
-
-        except KeyboardInterrupt:
-            print("\n\nПрограмма завершена.")
-            break
-        except Exception as e:
-            print(f"\nПроизошла ошибка: {e}")
-            continue
+    try:
+        asyncio.run(Repl(username).run())
+    except KeyboardInterrupt:
+        print("\n\nПрограмма завершена.")
 
 if __name__ == "__main__":
     main()
@@ -6,16 +6,84 @@
     responder: Единая точка взаимодействия с LLM API
     filters: Пост-фильтры для очистки ответов
     silence: Логика принятия решений о молчании
+    client: Общий HTTP-клиент Ollama с пулом соединений
+    prompts: Реестр готовых системных промптов
+    cache: Кэш ответов (LRU в памяти + SQLite)
+    warmup: Проверка готовности Ollama и предзагрузка модели
+    conversation: История диалога сессии
+    metrics: Длительность фаз хода и счетчики Ollama
+    providers: Провайдеры LLM (Ollama, OpenAI-совместимые серверы)
+    ngram: Локальный n-граммный движок режима distort
+    semantic: Семантический кэш (вложения + NumPy)
 """
 
-from .filters import filter_advice, filter_empathy, filter_length
-from .responder import respond
-from .silence import should_be_silent
+import importlib
+
+# Подмодули импортируются при первом обращении к имени (PEP 562):
+# "import src.ai" не тянет requests и не компилирует фильтры
+_EXPORTS = {
+    "respond": "responder",
+    "filter_advice": "filters",
+    "filter_empathy": "filters",
+    "filter_length": "filters",
+    "FilterEngine": "filters",
+    "should_be_silent": "silence",
+    "SilencePolicy": "silence",
+    "get_policy": "silence",
+    "OllamaClient": "client",
+    "get_client": "client",
+    "PromptRegistry": "prompts",
+    "get_registry": "prompts",
+    "ResponseCache": "cache",
+    "get_cache": "cache",
+    "Conversation": "conversation",
+    "get_conversation": "conversation",
+    "Metrics": "metrics",
+    "get_metrics": "metrics",
+    "Provider": "providers",
+    "get_provider": "providers",
+    "NgramModel": "ngram",
+    "get_distorter": "ngram",
+    "SemanticCache": "semantic",
+    "get_semantic_cache": "semantic",
+}
 
 __all__ = [
     "respond",
     "filter_advice",
     "filter_empathy",
     "filter_length",
+    "FilterEngine",
     "should_be_silent",
+    "SilencePolicy",
+    "get_policy",
+    "OllamaClient",
+    "get_client",
+    "PromptRegistry",
+    "get_registry",
+    "ResponseCache",
+    "get_cache",
+    "Conversation",
+    "get_conversation",
+    "Metrics",
+    "get_metrics",
+    "Provider",
+    "get_provider",
+    "NgramModel",
+    "get_distorter",
+    "SemanticCache",
+    "get_semantic_cache",
 ]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,189 @@
+# кэш ответов: LRU в памяти поверх SQLite на диске
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.settings import Settings, get_settings
+from src.utils.randomness import get_rng
+
+
+def normalize_input(text: str) -> str:
+    """Регистр и лишние пробелы не меняют смысл ввода."""
+    return " ".join(text.lower().split())
+
+
+class ResponseCache:
+    """Точный кэш ответов модели.
+
+    Ключ - модель, режим, хэш системного промпта, нормализованный ввод
+    и параметры генерации. Первый уровень - ограниченный LRU в памяти,
+    второй - SQLite, переживающий перезапуск. Оба уровня учитывают TTL.
+
+    serve_probability < 1 оставляет ответам непредсказуемость: с этой
+    вероятностью отдается сохраненный ответ, иначе генерируется новый.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        capacity: int = 256,
+        ttl: float = 86400.0,
+        serve_probability: float = 1.0,
+    ):
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self.serve_probability = serve_probability
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, mode: str, prompt_hash: str, user_input: str, options: dict) -> str:
+        raw = json.dumps(
+            [model, mode, prompt_hash, normalize_input(user_input), options],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] > self.ttl:
+                del self._memory[key]
+                entry = None
+            source = 'memory'
+
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    entry = (row[0], row[1])
+                    self._remember(key, entry)
+                    source = 'disk'
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._memory.move_to_end(key)
+            if self.serve_probability < 1.0 and get_rng().random() >= self.serve_probability:
+                self.bypassed += 1
+                return None
+
+            if source == 'memory':
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+            return entry[0]
+
+    def put(self, key: str, response: str) -> None:
+        entry = (response, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                    (key, entry[0], entry[1]),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def prune(self) -> int:
+        """Удаляет из SQLite записи старше TTL. Возвращает их количество."""
+        if self._db is None:
+            return 0
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses + self.bypassed
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def _cache_config(settings: Settings) -> tuple:
+    return (
+        settings.response_cache_path,
+        settings.response_cache_size,
+        settings.response_cache_ttl_sec,
+        settings.response_cache_serve_probability,
+    )
+
+
+def get_cache(settings: Optional[Settings] = None) -> Optional[ResponseCache]:
+    """Общий кэш ответов или None, если RESPONSE_CACHE выключен."""
+    global _cache
+    settings = settings or get_settings()
+    if not settings.response_cache:
+        return None
+
+    config = _cache_config(settings)
+    cache = _cache
+    if cache is None or (cache.path, cache.capacity, cache.ttl, cache.serve_probability) != config:
+        with _cache_lock:
+            cache = _cache
+            if cache is None or (cache.path, cache.capacity, cache.ttl, cache.serve_probability) != config:
+                if cache is not None:
+                    cache.close()
+                cache = ResponseCache(*config)
+                _cache = cache
+    return cache
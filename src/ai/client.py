@@ -0,0 +1,164 @@
+# общий HTTP-клиент для Ollama (пул соединений, keep-alive)
+import socket
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from src.settings import api_base_url, get_settings
+
+
+def _keepalive_socket_options() -> list:
+    """TCP keep-alive, чтобы простаивающие соединения пула не обрывались по пути."""
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # Параметры есть не на всех платформах (например, TCP_KEEPIDLE нет на macOS)
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault("socket_options", _keepalive_socket_options())
+        super().init_poolmanager(*args, **kwargs)
+
+
+class OllamaClient:
+    """Долгоживущий клиент Ollama.
+
+    Держит одну requests.Session с пулом соединений, добавляет keep_alive
+    в каждый запрос генерации (модель не выгружается между репликами)
+    и замеряет задержку каждого запроса.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        keep_alive: Optional[str] = None,
+        pool_size: Optional[int] = None,
+    ):
+        settings = get_settings()
+        if base_url is None:
+            base_url = settings.ollama_api_url
+        if keep_alive is None:
+            keep_alive = settings.ollama_keep_alive
+        if pool_size is None:
+            pool_size = settings.ollama_pool_size
+
+        self.base_url = api_base_url(base_url)
+        self.keep_alive = keep_alive
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        adapter = _KeepAliveAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self.last_latency: Optional[float] = None
+        self.request_count = 0
+        self.total_latency = 0.0
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def get(self, path: str, timeout: float = 5, **kwargs) -> requests.Response:
+        return self._request('GET', path, timeout=timeout, **kwargs)
+
+    def post(
+        self,
+        path: str,
+        payload: dict,
+        timeout: float = 30,
+        stream: bool = False,
+        **kwargs,
+    ) -> requests.Response:
+        if self.keep_alive:
+            payload = {**payload, 'keep_alive': self.keep_alive}
+        return self._request('POST', path, json=payload, timeout=timeout, stream=stream, **kwargs)
+
+    @property
+    def average_latency(self) -> Optional[float]:
+        if not self.request_count:
+            return None
+        return self.total_latency / self.request_count
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        # Для потоковых запросов это время до заголовков ответа
+        started = time.perf_counter()
+        try:
+            return self.session.request(method, self.url(path), **kwargs)
+        finally:
+            latency = time.perf_counter() - started
+            with self._lock:
+                self.last_latency = latency
+                self.request_count += 1
+                self.total_latency += latency
+
+
+class CancelScope:
+    """Отмена запроса из другого потока.
+
+    Поток генерации прикрепляет открытый потоковый ответ через attach();
+    cancel() закрывает его соединение, и Ollama прекращает генерацию,
+    не дожидаясь конца ответа.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._response: Optional[requests.Response] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def attach(self, response: requests.Response) -> None:
+        with self._lock:
+            if not self._cancelled:
+                self._response = response
+                return
+        response.close()
+
+    def detach(self) -> None:
+        with self._lock:
+            self._response = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            response, self._response = self._response, None
+        if response is not None:
+            response.close()
+
+
+_client: Optional[OllamaClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    """Общий на весь процесс клиент Ollama.
+
+    Пересоздается, если в новом снимке настроек поменялись адрес,
+    keep_alive или размер пула.
+    """
+    global _client
+    settings = get_settings()
+    wanted = (api_base_url(settings.ollama_api_url), settings.ollama_keep_alive, settings.ollama_pool_size)
+    client = _client
+    if client is None or (client.base_url, client.keep_alive, client.pool_size) != wanted:
+        with _client_lock:
+            client = _client
+            if client is None or (client.base_url, client.keep_alive, client.pool_size) != wanted:
+                client = OllamaClient()
+                _client = client
+    return client
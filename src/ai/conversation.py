@@ -0,0 +1,92 @@
+# история диалога (для режимов, которые ведут разговор)
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+from src.settings import Settings, get_settings
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов (для русского текста ~3 символа на токен)."""
+    return max(1, math.ceil(len(text) / 3))
+
+
+class Conversation:
+    """История одной сессии в одном режиме.
+
+    Кольцо последних сообщений с бюджетом токенов: при переполнении
+    выбрасываются самые старые. Для /api/chat история уходит списком
+    messages (общий префикс с прошлым ходом Ollama не пересчитывает),
+    для /api/generate сохраняется массив context из ответа, и следующий
+    ход досчитывает только новые токены.
+    """
+
+    def __init__(self, max_messages: int = 20, token_budget: int = 2048):
+        self.token_budget = token_budget
+        self._messages = deque(maxlen=max_messages)
+        self._tokens = 0
+        self._lock = threading.Lock()
+        self.context: Optional[List[int]] = None
+
+    def messages(self) -> List[dict]:
+        with self._lock:
+            return [{'role': role, 'content': content} for role, content, _ in self._messages]
+
+    def record(self, user_input: str, response: str, context: Optional[List[int]] = None) -> None:
+        """Добавляет завершенный ход; context - массив из ответа /api/generate."""
+        with self._lock:
+            self._append('user', user_input)
+            self._append('assistant', response)
+            # Слишком длинный context дороже пересобрать из истории
+            if context and len(context) <= self.token_budget:
+                self.context = context
+            else:
+                self.context = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._messages.clear()
+            self._tokens = 0
+            self.context = None
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def _append(self, role: str, content: str) -> None:
+        if len(self._messages) == self._messages.maxlen:
+            self._tokens -= self._messages[0][2]
+        tokens = estimate_tokens(content)
+        self._messages.append((role, content, tokens))
+        self._tokens += tokens
+        while self._tokens > self.token_budget and len(self._messages) > 1:
+            self._tokens -= self._messages.popleft()[2]
+
+
+_conversations: Dict[tuple, Conversation] = {}
+_conversations_lock = threading.Lock()
+
+
+def get_conversation(
+    session: str = "default",
+    mode: str = "ask",
+    settings: Optional[Settings] = None,
+) -> Optional[Conversation]:
+    """История сессии для режима или None, если режим не ведет диалог (HISTORY_MODES)."""
+    settings = settings or get_settings()
+    if mode not in settings.history_modes:
+        return None
+    key = (session, mode)
+    with _conversations_lock:
+        conversation = _conversations.get(key)
+        if conversation is None:
+            conversation = Conversation(settings.history_max_messages, settings.history_token_budget)
+            _conversations[key] = conversation
+        return conversation
+
+
+def drop_session(session: str) -> None:
+    """Забывает все истории сессии."""
+    with _conversations_lock:
+        for key in [key for key in _conversations if key[0] == session]:
+            del _conversations[key]
@@ -0,0 +1,190 @@
+# пул серверов Ollama: проверки здоровья, маршрутизация, размыкатель
+"""
+OLLAMA_API_URLS задает несколько серверов Ollama (через запятую), без
+него пул состоит из одного OLLAMA_API_URL.
+
+- Маршрутизация: запрос уходит на сервер с наименьшим числом запросов
+  в работе; при равенстве - по кругу.
+- Размыкатель: после OLLAMA_BREAKER_FAILURES ошибок подряд сервер
+  исключается на OLLAMA_BREAKER_COOLDOWN_SEC, затем получает пробный
+  запрос (успех замыкает цепь, ошибка снова размыкает).
+- Здоровье: фоновый поток раз в OLLAMA_HEALTH_INTERVAL_SEC опрашивает
+  /api/tags; не ответивший сервер не получает запросов до следующего
+  успешного опроса.
+
+Ошибка соединения или 5xx сразу переводит запрос на следующий сервер
+без паузы. Если исправных серверов нет, пробуются все по очереди:
+сведения о здоровье могут устареть.
+"""
+
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import requests
+
+from src.ai.client import OllamaClient
+from src.settings import Settings, get_settings
+
+# Таймаут проверки здоровья: /api/tags отвечает мгновенно
+PROBE_TIMEOUT = 2.0
+
+
+class Endpoint:
+    """Один сервер пула со своим пулом соединений и состоянием размыкателя."""
+
+    def __init__(self, url: str, client: OllamaClient):
+        self.url = url
+        self.client = client
+        self.outstanding = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self.healthy = True
+        self.requests = 0
+        # API генерации: 'chat' или 'generate' (выясняется первым запросом)
+        self.api = 'chat'
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.open_until
+
+    def state(self, now: float) -> str:
+        if not self.healthy:
+            return "down"
+        if now < self.open_until:
+            return "open"
+        return "half-open" if self.failures else "ok"
+
+
+class EndpointPool:
+    """Серверы Ollama с маршрутизацией по нагрузке и размыкателем."""
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        health_interval: float = 5.0,
+        keep_alive: Optional[str] = None,
+        pool_size: Optional[int] = None,
+    ):
+        self.endpoints: List[Endpoint] = [
+            Endpoint(url, OllamaClient(url, keep_alive=keep_alive, pool_size=pool_size)) for url in urls
+        ]
+        if not self.endpoints:
+            raise ValueError("пул серверов пуст")
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._turn = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "EndpointPool":
+        """Запускает фоновые проверки здоровья (если серверов больше одного и интервал задан)."""
+        if self._thread is None and self.health_interval > 0 and len(self.endpoints) > 1:
+            self._thread = threading.Thread(target=self._probe_loop, name="ollama-health", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        for endpoint in self.endpoints:
+            endpoint.client.close()
+
+    def acquire(self, exclude: Tuple[Endpoint, ...] = ()) -> Optional[Endpoint]:
+        """Наименее загруженный доступный сервер; None - все из exclude уже испробованы."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            if not candidates:
+                return None
+            candidates = [endpoint for endpoint in candidates if endpoint.available(now)] or candidates
+            count = len(self.endpoints)
+            self._turn += 1
+            endpoint = min(
+                candidates,
+                key=lambda e: (e.outstanding, e.failures, (self.endpoints.index(e) - self._turn) % count),
+            )
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, ok: bool = True) -> None:
+        """Запрос завершен; ok=False - ошибка сервера или соединения."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok:
+                endpoint.failures = 0
+                endpoint.open_until = 0.0
+                return
+            endpoint.failures += 1
+            if endpoint.failures >= self.failure_threshold:
+                endpoint.open_until = time.monotonic() + self.cooldown
+
+    def probe(self, endpoint: Endpoint) -> bool:
+        try:
+            response = endpoint.client.get('/api/tags', timeout=PROBE_TIMEOUT)
+            response.close()
+            healthy = response.status_code == 200
+        except requests.exceptions.RequestException:
+            healthy = False
+        endpoint.healthy = healthy
+        return healthy
+
+    def report(self) -> str:
+        """Состояние серверов для /stats."""
+        now = time.monotonic()
+        with self._lock:
+            return "\n".join(
+                f"  {endpoint.url:32s} {endpoint.state(now):9s} в работе {endpoint.outstanding}  "
+                f"запросов {endpoint.requests}  ошибок подряд {endpoint.failures}  /api/{endpoint.api}"
+                for endpoint in self.endpoints
+            )
+
+    def _probe_loop(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            for endpoint in self.endpoints:
+                if self._stop.is_set():
+                    return
+                self.probe(endpoint)
+
+
+_pool: Optional[EndpointPool] = None
+_pool_key: Optional[tuple] = None
+_pool_lock = threading.Lock()
+
+
+def _key(settings: Settings) -> tuple:
+    return (
+        settings.ollama_endpoints,
+        settings.ollama_keep_alive,
+        settings.ollama_pool_size,
+        settings.ollama_breaker_failures,
+        settings.ollama_breaker_cooldown_sec,
+        settings.ollama_health_interval_sec,
+    )
+
+
+def get_pool(settings: Optional[Settings] = None) -> EndpointPool:
+    """Общий пул серверов Ollama; пересоздается при смене его настроек."""
+    global _pool, _pool_key
+    settings = settings or get_settings()
+    key = _key(settings)
+    if _pool is None or _pool_key != key:
+        with _pool_lock:
+            if _pool is None or _pool_key != key:
+                old = _pool
+                _pool = EndpointPool(
+                    settings.ollama_endpoints,
+                    settings.ollama_breaker_failures,
+                    settings.ollama_breaker_cooldown_sec,
+                    settings.ollama_health_interval_sec,
+                    settings.ollama_keep_alive,
+                    settings.ollama_pool_size,
+                ).start()
+                _pool_key = key
+                if old is not None:
+                    # Запросы в работе дочитают свои ответы: закрывается только проверка здоровья
+                    old._stop.set()
+    return _pool
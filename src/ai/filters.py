@@ -1,54 +1,22 @@
 # пост-фильтры (длина, эмпатия, "советы")
 
-import random
-import os
-from statistics import mode
-from dotenv import load_dotenv
+import re
+from functools import lru_cache
+from typing import Optional
 
+from src.settings import Settings, get_settings
 
-load_dotenv("config/config.env")
-BASE_SILENCE_PROBABILITY = float(os.getenv("SILENCE_PROBABILITY", '0.2'))
+ADVICE_INDICATORS = ["лучше", "следует", "рекомендую", "нужно", "стоит"]
 
-SILENCE_PATTERNS = [
-    
-    "...",
-    "- - -",
-    "",
-    "   ",
-    "."
+EMPATHY_PHRASES = [
+    "понимаю", "сочувствую", "чувствую", "мне жаль",
+    "я с вами", "вы не один", "всё будет хорошо"
 ]
 
-MODE_MULTIPLIERS = {
-    
-    "ask": 1.0,
-    "distort": 1.5,
-    "void": 2.0,
-    "silence": float('inf')
-    
-}
-
-def should_be_silent(user_input: str, mode: str = "ask") -> bool:
-    
-    if mode == "silence":
-        return True
-        
-    if user_input.strip() in SILENCE_PATTERNS:
-        return random.random() < 0.5
-        
-    probability = BASE_SILENCE_PROBABILITY * MODE_MULTIPLIERS.get(mode, 1.0)
-    
-    probability = min(probability, 0.95)
-    
-    return random.random() > probability 
-    
-def should_void_speak() -> bool:
-
-    void_speak_prob = float(os.getenv("VOID_SPEAK_PROBABILITY", 0.02))
-    return random.random() < void_speak_prob
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
 
 
-import re
-
 def filter_thinking(text: str) -> str:
     """Удаляет блок размышлений <think>...</think> из ответа, включая незавершенные блоки."""
     # Удаляем завершенные блоки
@@ -58,55 +26,373 @@ def filter_thinking(text: str) -> str:
     return text.strip()
 
 
-def filter_advice(text: str) -> str:
+def filter_advice(text: str, settings: Optional[Settings] = None) -> str:
     """Фильтр для удаления советов."""
-    advice_filter_enabled = os.getenv("ENABLE_ADVICE_FILTER", "true").lower() == "true"
+    settings = settings or get_settings()
     
     # If advice filter is disabled, return text unchanged
-    if not advice_filter_enabled:
+    if not settings.enable_advice_filter:
         return text
 
     # Удалить явные советы
-    advice_indicators = ["лучше", "следует", "рекомендую", "нужно", "стоит"]
     lines = text.split('\n')
     filtered_lines = []
 
     for line in lines:
-        if not any(indicator in line.lower() for indicator in advice_indicators):
+        if not any(indicator in line.lower() for indicator in ADVICE_INDICATORS):
             filtered_lines.append(line)
 
     return '\n'.join(filtered_lines)
 
 
-def filter_empathy(text: str, mode: str = "ask") -> str:
+def filter_empathy(text: str, mode: str = "ask", settings: Optional[Settings] = None) -> str:
     # If mode is psycholog, skip empathy filtering
     if mode == "psycholog":
         return text
     
-    # Check if empathy filter is enabled
-    empathy_filter_enabled = os.getenv("ENABLE_EMPATHY_FILTER", "true").lower() == "true"
+    settings = settings or get_settings()
     
     # If empathy filter is disabled, return text unchanged
-    if not empathy_filter_enabled:
+    if not settings.enable_empathy_filter:
         return text
 
-    empathy_phrases = [
-        "понимаю", "сочувствую", "чувствую", "мне жаль",
-        "я с вами", "вы не один", "всё будет хорошо"
-    ]
-
-    for phrase in empathy_phrases:
+    for phrase in EMPATHY_PHRASES:
         text = text.replace(phrase, "...")
 
     return text
 
 
-def filter_length(text: str) -> str:
+def filter_length(text: str, settings: Optional[Settings] = None) -> str:
     """Фильтр для ограничения длины ответа."""
-    max_len = int(os.getenv("MAX_RESPONSE_LENGTH", "200"))
+    max_len = (settings or get_settings()).max_response_length
     
     if len(text) <= max_len:
         return text
     
     return text[:max_len] + "..."
-    
+
+
+# Однопроходный движок фильтров.
+#
+# Все, что ищут filter_thinking, filter_advice и filter_empathy, собрано
+# в одно регулярное выражение (без учета регистра, Unicode). Текст
+# проходится один раз конечным автоматом: внутри <think> ищется только
+# закрывающий тег, снаружи - переводы строк, индикаторы советов
+# и фразы эмпатии. Тот же автомат работает и по кускам потока.
+
+_SENTENCE_END = "[.!?…]"
+
+def _alternation(words) -> str:
+    # Длинные варианты раньше коротких: "сочувствую" не должно стать "со..."
+    return "|".join(re.escape(word) for word in sorted(set(words), key=len, reverse=True))
+
+
+class FilterEngine:
+    """Скомпилированный фильтр ответа для одного режима."""
+
+    def __init__(
+        self,
+        advice_indicators=ADVICE_INDICATORS,
+        empathy_phrases=EMPATHY_PHRASES,
+        advice: bool = True,
+        empathy: bool = True,
+        max_len: int = 200,
+        max_sentences: Optional[int] = None,
+    ):
+        self.advice = advice and bool(advice_indicators)
+        self.empathy = empathy and bool(empathy_phrases)
+        self.max_len = max_len
+        # Сколько предложений показывать; None - только лимит длины
+        self.max_sentences = max_sentences or None
+
+        # Теги размышлений чувствительны к регистру, как и в filter_thinking
+        parts = [
+            f"(?P<open>(?-i:{re.escape(THINK_OPEN)}))",
+            f"(?P<close>(?-i:{re.escape(THINK_CLOSE)}))",
+            r"(?P<nl>\n)",
+        ]
+        tokens = [THINK_OPEN, THINK_CLOSE]
+        if self.advice:
+            parts.append(f"(?P<advice>{_alternation(advice_indicators)})")
+            tokens.extend(advice_indicators)
+        if self.empathy:
+            parts.append(f"(?P<empathy>{_alternation(empathy_phrases)})")
+            tokens.extend(empathy_phrases)
+        # Концы предложений: по ним поток отдает текст, и с них же
+        # начинается вырезаемый совет (в потоке и в ответе целиком)
+        parts.append(rf"(?P<end>{_SENTENCE_END}+(?=\s))")
+        self.pattern = re.compile("|".join(parts), re.IGNORECASE)
+
+        # Хвосты, с которых может начинаться совпадение: начала токенов и сами
+        # токены целиком (иначе короткое начало другого токена в самом конце,
+        # как "н" у "нужно", разрезало бы уже пришедшую фразу "вы не один")
+        self.prefixes = {
+            token.lower()[:size]
+            for token in tokens
+            for size in range(1, len(token) + 1)
+        }
+        self.longest_token = max(len(token) for token in tokens)
+
+    @classmethod
+    def for_mode(cls, mode: str = "ask", settings: Optional[Settings] = None) -> "FilterEngine":
+        """Движок для режима; собирается один раз на пару (режим, снимок настроек)."""
+        return _engine_for_mode(mode, settings or get_settings())
+
+    def apply(self, text: str) -> str:
+        """Фильтрует готовый ответ целиком (совет - от своего предложения до конца строки).
+
+        С max_sentences ответ проходит через поток одним куском: предложения
+        считаются так же, как при выводе по мере генерации.
+        """
+        if not text:
+            return text
+        if self.max_sentences:
+            stream = self.stream()
+            return stream.feed(text) + stream.flush()
+        state = _FilterState(self, limit=self.max_len)
+        state.scan(text, 0, len(text))
+        if not state.full:
+            state.finish(text)
+        result = "\n".join(state.kept()).strip()
+        if len(result) <= self.max_len:
+            return result
+        return result[:self.max_len] + "..."
+
+    def stream(self) -> "FilterStream":
+        return FilterStream(self)
+
+
+_SKIP_LINE = re.compile(r"\n|" + re.escape(THINK_OPEN))
+
+
+class _FilterState:
+    """Состояние автомата: внутри ли <think>, текущая строка, найден ли в ней совет.
+
+    Совет вырезается с начала своего предложения до конца строки:
+    предложения перед ним поток уже показал, и ответ целиком их тоже
+    оставляет.
+
+    limit - для ответа целиком: как только сохраненные строки длиннее
+    лимита, остаток текста уже не влияет на результат и не читается.
+    """
+
+    def __init__(self, engine: FilterEngine, limit: Optional[int] = None):
+        self.engine = engine
+        self.limit = limit
+        self.in_think = False
+        self.line = []
+        # Сколько кусков line относится к законченным предложениям строки
+        self.sentence_start = 0
+        self.dropped = False
+        self.lines = []
+        self.pos = 0
+        self.full = False
+        self._kept_chars = 0
+
+    def kept(self) -> list:
+        return [line for line, dropped in self.lines if not dropped]
+
+    def scan(self, text: str, start: int, stop: int, on_sentence=None) -> None:
+        pattern = self.engine.pattern
+        pos = start
+        while pos < stop:
+            if self.in_think:
+                # Внутри размышлений интересен только закрывающий тег
+                idx = text.find(THINK_CLOSE, pos, stop)
+                if idx == -1:
+                    pos = stop
+                    break
+                self.in_think = False
+                pos = idx + len(THINK_CLOSE)
+                continue
+            if self.dropped:
+                # Строка с советом уже выброшена - сразу к ее концу
+                match = _SKIP_LINE.search(text, pos, stop)
+                if match is None:
+                    pos = stop
+                    break
+                pos = match.start()
+            match = pattern.search(text, pos, stop)
+            if match is None:
+                break
+            kind = match.lastgroup
+            self.line.append(text[pos:match.start()])
+            pos = match.end()
+            if kind == "open":
+                self.in_think = True
+            elif kind == "nl":
+                self._end_line()
+                if on_sentence:
+                    on_sentence(True)
+                if self.full:
+                    break
+            elif kind == "advice":
+                del self.line[self.sentence_start:]
+                self.dropped = True
+            elif kind == "empathy":
+                self.line.append("...")
+            else:
+                # Закрывающий тег без открывающего и концы предложений - обычный текст
+                self.line.append(match.group())
+                if kind == "end":
+                    if on_sentence:
+                        on_sentence(False)
+                        if self.full:
+                            break
+                    else:
+                        self.sentence_start = len(self.line)
+        self.pos = pos
+
+    def finish(self, text: str) -> None:
+        # Незавершенный блок размышлений отбрасывается целиком
+        if not self.in_think and not self.dropped:
+            self.line.append(text[self.pos:])
+        self.pos = len(text)
+        self._end_line()
+
+    def _end_line(self) -> None:
+        line = "".join(self.line)
+        # Строка с советом остается, если до совета были предложения
+        dropped = self.dropped and not line
+        self.lines.append((line, dropped))
+        if self.limit is not None and not dropped:
+            self._kept_chars += len(line) + 1
+            if self._kept_chars > self.limit:
+                self.full = len("\n".join(self.kept()).strip()) > self.limit
+        self.line = []
+        self.sentence_start = 0
+        self.dropped = False
+
+
+class FilterStream:
+    """Потоковый вариант FilterEngine.apply.
+
+    feed() принимает куски ответа и возвращает текст, который уже
+    не изменится. Видимый текст отдается по предложениям, результат
+    тот же, что у apply(): совет выбрасывается с того предложения,
+    где встретился индикатор, до конца строки. После лимита
+    длины или max_sentences предложений выставляется done - дальше
+    поток можно закрывать.
+    """
+
+    def __init__(self, engine: FilterEngine):
+        self.engine = engine
+        self.done = False
+        self._state = _FilterState(engine)
+        self._buf = ""
+        self._out = []
+        self._line_emitted = False
+        self._started = False
+        self._pending_ws = ""
+        self._emitted = 0
+        self._sentences = 0
+        self._full = False
+
+    def feed(self, chunk: str) -> str:
+        if self.done or not chunk:
+            return ""
+        self._buf += chunk
+        stop = len(self._buf) - self._holdback()
+        self._state.scan(self._buf, 0, stop, self._on_sentence)
+        # Необработанный остаток строки остается в буфере
+        if not self._state.in_think and not self._full:
+            self._state.line.append(self._buf[self._state.pos:stop])
+        self._buf = self._buf[stop:]
+        return self._take()
+
+    def flush(self) -> str:
+        if self.done:
+            return ""
+        # Придержанный хвост тоже может содержать фразу или индикатор
+        self._state.scan(self._buf, 0, len(self._buf), self._on_sentence)
+        self._state.finish(self._buf)
+        self._buf = ""
+        self._on_sentence(False)
+        text = self._take()
+        # Пробелы в самом конце ответа не нужны
+        self._pending_ws = ""
+        return text
+
+    def _holdback(self) -> int:
+        lowered = self._buf[-self.engine.longest_token:].lower()
+        keep = 0
+        for size in range(len(lowered), 0, -1):
+            if lowered[-size:] in self.engine.prefixes:
+                keep = size
+                break
+        # Знаки препинания в конце могут оказаться концом предложения
+        while keep < len(lowered) and lowered[len(lowered) - keep - 1] in ".!?…":
+            keep += 1
+        return keep
+
+    def _on_sentence(self, line_end: bool) -> None:
+        state = self._state
+        if self._full:
+            # Лимит предложений набран: остаток ответа не показывается
+            state.lines.clear()
+            state.line = []
+            return
+        if line_end:
+            text, dropped = state.lines.pop()
+            if dropped:
+                # Начало строки уже напечатано - перевод строки сохраняем
+                text = "\n" if self._line_emitted else ""
+            else:
+                text += "\n"
+            self._line_emitted = False
+        else:
+            if state.lines:
+                text, dropped = state.lines.pop()
+            else:
+                text, dropped = "".join(state.line), state.dropped
+                state.line = []
+            if dropped:
+                text = ""
+            self._line_emitted = self._line_emitted or bool(text)
+        if text:
+            self._out.append(text)
+            if text.strip():
+                self._sentences += 1
+                self._full = self._sentences == self.engine.max_sentences
+                # Остаток ответа не показывается - автомат его не читает
+                state.full = self._full
+
+    def _take(self) -> str:
+        text = "".join(self._out)
+        self._out = []
+        if self._full:
+            self.done = True
+        # Аналог strip(): пробелы в начале выбрасываем, в конце придерживаем
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        if not text:
+            return ""
+        text = self._pending_ws + text
+        stripped = text.rstrip()
+        # Придержанный перевод строки перед последним предложением
+        # уже вошел в text; после лимита хвост из пробелов не нужен
+        self._pending_ws = "" if self.done else text[len(stripped):]
+        if self._emitted + len(stripped) <= self.engine.max_len:
+            self._emitted += len(stripped)
+            return stripped
+        self.done = True
+        return stripped[:self.engine.max_len - self._emitted] + "..."
+
+
+@lru_cache(maxsize=32)
+def _engine_for_mode(mode: str, settings: Settings) -> FilterEngine:
+    return FilterEngine(
+        advice_indicators=ADVICE_INDICATORS + list(settings.extra_advice_indicators),
+        empathy_phrases=EMPATHY_PHRASES + list(settings.extra_empathy_phrases),
+        advice=(
+            settings.enable_advice_filter
+            and mode not in settings.advice_filter_skip_modes
+        ),
+        empathy=(
+            settings.enable_empathy_filter
+            and mode not in settings.empathy_filter_skip_modes
+        ),
+        max_len=settings.max_response_length_for(mode),
+        max_sentences=settings.max_sentences_for(mode),
+    )
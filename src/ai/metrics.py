@@ -0,0 +1,188 @@
+# метрики хода: длительность фаз и счетчики генерации Ollama
+"""
+Каждая фаза хода (решение о молчании, кэш, запрос к модели, первый
+видимый токен, фильтры, пауза и вывод) пишется в скользящее окно
+по ключу (метрика, режим, модель). Из последнего чанка Ollama берутся
+total_duration, load_duration, prompt_eval_* и eval_*.
+
+/stats в REPL печатает p50/p95/p99, METRICS_FILE - тот же набор
+в текстовом формате Prometheus.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.settings import Settings, get_settings
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Поля последнего чанка Ollama (наносекунды) -> имя метрики
+OLLAMA_DURATIONS = {
+    "total_duration": "ollama_total",
+    "load_duration": "ollama_load",
+    "prompt_eval_duration": "prompt_eval",
+    "eval_duration": "eval",
+}
+
+
+class Window:
+    """Последние значения метрики: квантили по окну, счетчик и сумма - за все время."""
+
+    def __init__(self, size: int = 1024):
+        self.values = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self) -> Dict[float, float]:
+        ordered = sorted(self.values)
+        if not ordered:
+            return {}
+        # Ближайший ранг: p50 из двух значений - меньшее, p99 - наибольшее
+        return {q: ordered[max(0, math.ceil(q * len(ordered)) - 1)] for q in QUANTILES}
+
+
+class Metrics:
+    """Хранилище метрик процесса. Пишется из потоков генерации и цикла событий."""
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._windows: Dict[Tuple[str, str, str], Window] = {}
+        self.counters = Counter()
+        self._dumped = 0.0
+
+    def observe(self, name: str, value: float, mode: str, model: str) -> None:
+        key = (name, mode, model)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = Window(self.window)
+            window.add(value)
+
+    @contextmanager
+    def span(self, name: str, mode: str, model: str) -> Iterator[None]:
+        """Замер фазы хода: with metrics.span("inference", mode, model): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, mode, model)
+
+    def count(self, name: str, mode: str, model: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[(name, mode, model)] += value
+
+    def record_ollama(self, data: dict, mode: str, model: str) -> None:
+        """Счетчики из последнего чанка ответа Ollama."""
+        for field, name in OLLAMA_DURATIONS.items():
+            if data.get(field) is not None:
+                self.observe(name, data[field] / 1e9, mode, model)
+        prompt_tokens = data.get("prompt_eval_count")
+        eval_tokens = data.get("eval_count")
+        if prompt_tokens:
+            self.count("prompt_tokens", mode, model, prompt_tokens)
+        if eval_tokens:
+            self.count("eval_tokens", mode, model, eval_tokens)
+            if data.get("eval_duration"):
+                self.observe("eval_tokens_per_sec", eval_tokens / (data["eval_duration"] / 1e9), mode, model)
+
+    def snapshot(self) -> Dict[Tuple[str, str, str], dict]:
+        with self._lock:
+            return {
+                key: {"count": window.count, "sum": window.total, "quantiles": window.quantiles()}
+                for key, window in self._windows.items()
+            }
+
+    def report(self) -> str:
+        """Таблица для /stats: по режиму и модели - квантили каждой метрики."""
+        snapshot = self.snapshot()
+        if not snapshot:
+            return "Пока нет измерений."
+        with self._lock:
+            counters = dict(self.counters)
+
+        lines = []
+        for mode, model in sorted({(mode, model) for _, mode, model in snapshot}):
+            lines.append(f"[{mode}] {model}")
+            for (name, m, mdl), data in sorted(snapshot.items()):
+                if (m, mdl) != (mode, model):
+                    continue
+                q = data["quantiles"]
+                unit, scale = ("tok/s", 1) if name.endswith("per_sec") else ("ms", 1000)
+                lines.append(
+                    f"  {name:20s} n={data['count']:<5d} "
+                    + "  ".join(f"p{int(k * 100)}={v * scale:.1f}" for k, v in q.items())
+                    + f" {unit}"
+                )
+            for (name, m, mdl), value in sorted(counters.items()):
+                if (m, mdl) == (mode, model):
+                    lines.append(f"  {name:20s} {value}")
+        return "\n".join(lines)
+
+    def prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus."""
+        snapshot = self.snapshot()
+        with self._lock:
+            counters = dict(self.counters)
+
+        lines = []
+        for name in sorted({key[0] for key in snapshot}):
+            metric = f"star_void_{name}" if name.endswith("per_sec") else f"star_void_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for (n, mode, model), data in sorted(snapshot.items()):
+                if n != name:
+                    continue
+                labels = f'mode="{mode}",model="{model}"'
+                for q, value in data["quantiles"].items():
+                    lines.append(f'{metric}{{{labels},quantile="{q}"}} {value:.6f}')
+                lines.append(f"{metric}_sum{{{labels}}} {data['sum']:.6f}")
+                lines.append(f"{metric}_count{{{labels}}} {data['count']}")
+        for name in sorted({key[0] for key in counters}):
+            metric = f"star_void_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (n, mode, model), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f'{metric}{{mode="{mode}",model="{model}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """Атомарно записывает метрики Prometheus в файл (для node_exporter textfile)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def dump_if_due(self, settings: Optional[Settings] = None) -> None:
+        """Запись в METRICS_FILE не чаще METRICS_DUMP_INTERVAL_SEC."""
+        settings = settings or get_settings()
+        if not settings.metrics_file:
+            return
+        now = time.monotonic()
+        if now - self._dumped < settings.metrics_dump_interval_sec:
+            return
+        self._dumped = now
+        try:
+            self.dump(settings.metrics_file)
+        except OSError as e:
+            print(f"[system] Не удалось записать метрики: {e}")
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Общие на весь процесс метрики."""
+    return _metrics
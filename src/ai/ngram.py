@@ -0,0 +1,252 @@
+# локальный генератор искажений: n-граммная модель без LLM
+"""
+Триграммная модель с откатом на биграммы, обученная на корпусе
+(DISTORT_CORPUS, по умолчанию config/corpus/distort.txt) и на прошлых
+ответах режима distort из журнала диалогов. Фрагмент строится за
+микросекунды, поэтому годится и как основной движок режима, и как
+замена модели, когда сервер недоступен или ход сброшен планировщиком
+(DISTORT_ENGINE: llm, local, fallback).
+
+Модель хранится в плоских массивах (array), а не в словарях:
+    keys        отсортированные ключи контекстов (uint64);
+    offsets     начало продолжений контекста в successors;
+    successors  id следующих слов;
+    weights     накопленные частоты продолжений внутри контекста.
+Продолжение ищется бинарным поиском по keys и по weights. Те же
+массивы сохраняются в DISTORT_MODEL_PATH и читаются без обучения,
+пока корпус не изменился.
+"""
+
+import json
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional
+
+from src.settings import Settings, get_settings
+from src.utils.randomness import get_rng
+
+_TOKEN = re.compile(r"\w[\w'-]*|\.\.\.|…|[.!?,]")
+_PUNCT = frozenset({"...", "…", ".", "!", "?", ","})
+# Граница строки: начало и конец фрагмента
+BOUNDARY = 0
+# Ключ контекста из одного слова: вместо предыдущего слова - _UNIGRAM
+_UNIGRAM = 0xFFFFFFFF
+
+MAGIC = b"SVNGRAM1\n"
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def corpus_lines(text: str) -> Iterable[str]:
+    """Строки корпуса без комментариев и маркеров списков."""
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        yield line.lstrip("-* ").strip()
+
+
+class NgramModel:
+    """Триграммы с откатом на биграммы в плоских массивах."""
+
+    def __init__(self, vocab: List[str], keys: array, offsets: array, successors: array, weights: array):
+        self.vocab = vocab
+        self.ids: Dict[str, int] = {word: i for i, word in enumerate(vocab)}
+        self.keys = keys
+        self.offsets = offsets
+        self.successors = successors
+        self.weights = weights
+
+    @classmethod
+    def train(cls, lines: Iterable[str]) -> "NgramModel":
+        vocab = [""]
+        ids = {"": BOUNDARY}
+        counts: Dict[int, Dict[int, int]] = {}
+
+        def add(key: int, word: int) -> None:
+            following = counts.setdefault(key, {})
+            following[word] = following.get(word, 0) + 1
+
+        for line in lines:
+            words = tokenize(line)
+            if not words:
+                continue
+            sequence = [BOUNDARY]
+            for word in words:
+                if word not in ids:
+                    ids[word] = len(vocab)
+                    vocab.append(word)
+                sequence.append(ids[word])
+            sequence.append(BOUNDARY)
+            for i in range(1, len(sequence)):
+                previous = sequence[i - 2] if i >= 2 else BOUNDARY
+                add(_key(previous, sequence[i - 1]), sequence[i])
+                add(_key(None, sequence[i - 1]), sequence[i])
+
+        keys, offsets, successors, weights = array("Q"), array("I", [0]), array("I"), array("I")
+        for key in sorted(counts):
+            keys.append(key)
+            total = 0
+            for word, count in sorted(counts[key].items()):
+                total += count
+                successors.append(word)
+                weights.append(total)
+            offsets.append(len(successors))
+        return cls(vocab, keys, offsets, successors, weights)
+
+    def __len__(self) -> int:
+        return len(self.vocab) - 1
+
+    def next_word(self, previous: int, current: int, rng=None) -> Optional[int]:
+        """Случайное продолжение пары слов (или одного слова, если пары не было)."""
+        rng = rng or get_rng()
+        for key in (_key(previous, current), _key(None, current)):
+            index = bisect_left(self.keys, key)
+            if index < len(self.keys) and self.keys[index] == key:
+                start, stop = self.offsets[index], self.offsets[index + 1]
+                # Накопленные частоты отсчитываются заново в каждом контексте
+                point = rng.randrange(self.weights[stop - 1])
+                return self.successors[bisect_right(self.weights, point, start, stop)]
+        return None
+
+    def generate(self, seed: str = "", max_words: int = 6, rng=None) -> str:
+        """Фрагмент в духе distort: начинается со слова из seed, если модель его знает."""
+        rng = rng or get_rng()
+        known = [self.ids[word] for word in tokenize(seed) if len(word) > 3 and word in self.ids]
+        previous, current = BOUNDARY, rng.choice(known) if known else BOUNDARY
+        words = [self.vocab[current]] if current != BOUNDARY else []
+        while len(words) < max_words:
+            following = self.next_word(previous, current, rng)
+            if following is None or following == BOUNDARY:
+                break
+            words.append(self.vocab[following])
+            previous, current = current, following
+        else:
+            # Оборван на лимите: фрагмент, а не законченная фраза
+            words.append("...")
+        return _join(words)
+
+    def save(self, path: str, sources: list) -> None:
+        header = json.dumps({"vocab": self.vocab, "sources": sources, "sizes": self._sizes()}, ensure_ascii=False)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(header.encode("utf-8") + b"\n")
+            for values in (self.keys, self.offsets, self.successors, self.weights):
+                values.tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, sources: Optional[list] = None) -> Optional["NgramModel"]:
+        """Модель из файла; None - файла нет, он поврежден или обучен на другом корпусе."""
+        try:
+            with open(path, "rb") as f:
+                if f.readline() != MAGIC:
+                    return None
+                header = json.loads(f.readline())
+                if sources is not None and header["sources"] != sources:
+                    return None
+                sizes = header["sizes"]
+                arrays = []
+                for name, code in (("keys", "Q"), ("offsets", "I"), ("successors", "I"), ("weights", "I")):
+                    values = array(code)
+                    values.fromfile(f, sizes[name])
+                    arrays.append(values)
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+        return cls(header["vocab"], *arrays)
+
+    def _sizes(self) -> dict:
+        return {
+            "keys": len(self.keys),
+            "offsets": len(self.offsets),
+            "successors": len(self.successors),
+            "weights": len(self.weights),
+        }
+
+
+def _key(previous: Optional[int], current: int) -> int:
+    return ((_UNIGRAM if previous is None else previous) << 32) | current
+
+
+def _join(words: List[str]) -> str:
+    text = ""
+    for word in words:
+        text += word if word in _PUNCT or not text else " " + word
+    return text
+
+
+def _sources(settings: Settings) -> list:
+    """Файлы корпуса с размером и mtime: изменение любого - повод переобучить."""
+    sources = []
+    for path in _corpus_paths(settings):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        sources.append([path, stat.st_size, stat.st_mtime])
+    return sources
+
+
+def _corpus_paths(settings: Settings) -> List[str]:
+    paths = list(settings.distort_corpus)
+    if settings.distort_corpus_transcripts and os.path.isdir(settings.transcript_dir):
+        paths.extend(
+            os.path.join(settings.transcript_dir, name)
+            for name in sorted(os.listdir(settings.transcript_dir))
+            if name.startswith("transcript-") and (name.endswith(".jsonl") or name.endswith(".jsonl.gz"))
+        )
+    return paths
+
+
+def _read_corpus(settings: Settings) -> Iterable[str]:
+    from src.utils.transcript import _read_segment
+
+    for path in _corpus_paths(settings):
+        if path.endswith((".jsonl", ".jsonl.gz")):
+            # Из журнала берутся только ответы модели в режиме distort:
+            # на собственных ответах (source) модель выродилась бы в повторы
+            for entry in _read_segment(path):
+                if entry.get("mode") == "distort" and entry.get("role") == "assistant" and not entry.get("source"):
+                    yield from corpus_lines(entry.get("text", ""))
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                yield from corpus_lines(f.read())
+        except OSError:
+            continue
+
+
+_model: Optional[NgramModel] = None
+_model_key: Optional[tuple] = None
+_model_lock = threading.Lock()
+
+
+def get_distorter(settings: Optional[Settings] = None) -> NgramModel:
+    """Общая модель искажений: из DISTORT_MODEL_PATH или обученная заново."""
+    global _model, _model_key
+    settings = settings or get_settings()
+    key = (settings.distort_corpus, settings.distort_corpus_transcripts, settings.transcript_dir, settings.distort_model_path)
+    if _model is None or _model_key != key:
+        with _model_lock:
+            if _model is None or _model_key != key:
+                sources = _sources(settings)
+                model = NgramModel.load(settings.distort_model_path, sources) if settings.distort_model_path else None
+                if model is None:
+                    model = NgramModel.train(_read_corpus(settings))
+                    if settings.distort_model_path:
+                        try:
+                            model.save(settings.distort_model_path, sources)
+                        except OSError as e:
+                            print(f"[system] Не удалось сохранить модель искажений: {e}")
+                _model = model
+                _model_key = key
+    return _model
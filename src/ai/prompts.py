@@ -0,0 +1,127 @@
+# реестр системных промптов (config/ai/*.txt)
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from src.settings import get_settings
+
+PROMPT_DIR = os.path.join('config', 'ai')
+CORE_PROMPT = 'core.txt'
+
+
+@dataclass(frozen=True)
+class ComposedPrompt:
+    """Готовый системный промпт режима: core.txt + <mode>.txt."""
+
+    mode: str
+    text: str
+    hash: str
+
+
+def _compose(mode: str, core: str, mode_prompt: str) -> ComposedPrompt:
+    text = f"{core}\n\n{mode_prompt}".strip()
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return ComposedPrompt(mode=mode, text=text, hash=digest)
+
+
+class PromptRegistry:
+    """Загружает промпты один раз и отдает их из памяти.
+
+    Файлы перечитываются только при явном reload() или когда фоновая
+    проверка (watch) замечает изменение mtime. get() не трогает диск.
+    """
+
+    def __init__(self, directory: str = PROMPT_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._mtimes: Dict[str, float] = {}
+        self._prompts: Dict[str, ComposedPrompt] = {}
+        self._fallback = _compose('', '', '')
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.reload()
+
+    def get(self, mode: str) -> ComposedPrompt:
+        # Для режима без своего файла остается только core.txt
+        return self._prompts.get(mode, self._fallback)
+
+    def modes(self) -> list:
+        return sorted(self._prompts)
+
+    def reload(self) -> None:
+        """Перечитывает все промпты и атомарно подменяет готовые версии."""
+        with self._lock:
+            mtimes = self._scan()
+            texts = {}
+            for filename in mtimes:
+                try:
+                    with open(os.path.join(self.directory, filename), 'r', encoding='utf-8') as f:
+                        texts[filename] = f.read().strip()
+                except Exception:
+                    texts[filename] = ""
+
+            core = texts.pop(CORE_PROMPT, "")
+            prompts = {}
+            for filename, mode_prompt in texts.items():
+                mode = filename[:-len('.txt')]
+                prompts[mode] = _compose(mode, core, mode_prompt)
+
+            self._prompts = prompts
+            self._fallback = _compose('', core, '')
+            self._mtimes = mtimes
+
+    def refresh(self) -> bool:
+        """Перечитывает промпты, если файлы изменились. Возвращает True при перезагрузке."""
+        if self._scan() == self._mtimes:
+            return False
+        self.reload()
+        return True
+
+    def watch(self, interval: float) -> None:
+        """Запускает фоновую проверку mtime раз в interval секунд."""
+        if self._watcher is not None or interval <= 0:
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception:
+                continue
+
+    def _scan(self) -> Dict[str, float]:
+        mtimes = {}
+        try:
+            entries = os.listdir(self.directory)
+        except OSError:
+            return mtimes
+        for filename in entries:
+            if not filename.endswith('.txt'):
+                continue
+            try:
+                mtimes[filename] = os.stat(os.path.join(self.directory, filename)).st_mtime
+            except OSError:
+                continue
+        return mtimes
+
+
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> PromptRegistry:
+    """Общий на весь процесс реестр промптов."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptRegistry()
+                _registry.watch(get_settings().prompt_check_interval)
+    return _registry
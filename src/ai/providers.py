@@ -0,0 +1,370 @@
+# провайдеры LLM: Ollama и OpenAI-совместимые серверы
+"""
+Провайдер знает только протокол сервера: как собрать запрос из
+GenerationRequest, как назвать параметры генерации и как достать
+текст из потока. Ретраи, отмена, фильтры, метрики и история остаются
+в responder и одинаковы для всех провайдеров.
+
+LLM_PROVIDER выбирает провайдера из реестра:
+    local, ollama               - Ollama (/api/chat, откат на /api/generate);
+    openai, openai-compatible   - /v1/chat/completions (llama.cpp server,
+                                  vLLM, LM Studio и т.п.), адрес - OPENAI_API_URL.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import requests
+
+from src.ai.client import OllamaClient
+from src.ai.endpoints import Endpoint, get_pool
+from src.settings import Settings, get_settings
+
+
+# Таймаут requests: общий или (соединение, чтение)
+Timeout = Union[float, Tuple[float, float]]
+
+
+@dataclass(frozen=True)
+class GenerationRequest:
+    """Один запрос генерации, не зависящий от провайдера."""
+
+    model: str
+    system: str
+    user_input: str
+    history: Tuple[dict, ...] = ()
+    context: Optional[List[int]] = None     # context прошлого хода Ollama /api/generate
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    think: Optional[bool] = None            # False - без размышлений, None - как решит модель
+
+    def messages(self) -> List[dict]:
+        return [
+            {'role': 'system', 'content': self.system},
+            *self.history,
+            {'role': 'user', 'content': self.user_input},
+        ]
+
+
+class ProviderError(Exception):
+    """Сервер ответил ошибкой (не таймаут и не обрыв соединения)."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class Provider:
+    """Протокол сервера генерации.
+
+    open() отправляет запрос и возвращает открытый ответ (ошибки HTTP -
+    ProviderError), chunks() читает из него текст, release() вызывается,
+    когда ответ закрыт (ok=False - поток оборвался). В meta попадают
+    служебные поля ответа в формате Ollama: context, *_duration,
+    prompt_eval_count и eval_count.
+    """
+
+    name = "provider"
+    title = "LLM"
+
+    def __init__(self, settings: Settings):
+        pass
+
+    @staticmethod
+    def config_key(settings: Settings) -> tuple:
+        """Настройки, при смене которых провайдер создается заново."""
+        return ()
+
+    def options(self, request: GenerationRequest) -> dict:
+        raise NotImplementedError
+
+    def open(self, request: GenerationRequest, stream: bool, timeout: Timeout) -> requests.Response:
+        raise NotImplementedError
+
+    def chunks(self, response: requests.Response, stream: bool, meta: dict) -> Iterator[str]:
+        raise NotImplementedError
+
+    def release(self, response: requests.Response, ok: bool = True) -> None:
+        pass
+
+    def embed(self, model: str, text: str, timeout: Timeout) -> List[float]:
+        """Вектор текста от модели вложений сервера (для семантического кэша)."""
+        raise NotImplementedError
+
+    def _check(self, response: requests.Response) -> requests.Response:
+        if response.status_code != 200:
+            response.close()
+            raise ProviderError(f"{self.title} error: {response.status_code}", response.status_code)
+        return response
+
+
+class OllamaProvider(Provider):
+    """Ollama: /api/chat, при 404 (старая версия) - /api/generate с context.
+
+    Сервер выбирается из пула (src/ai/endpoints.py); ошибка соединения
+    или 5xx сразу переводит запрос на следующий сервер.
+    """
+
+    name = "ollama"
+    title = "Ollama"
+
+    def options(self, request: GenerationRequest) -> dict:
+        options = {}
+        if request.max_tokens:
+            options['num_predict'] = request.max_tokens
+        if request.temperature is not None:
+            options['temperature'] = request.temperature
+        return options
+
+    def open(self, request: GenerationRequest, stream: bool, timeout: Timeout) -> requests.Response:
+        # Пул общий и пересоздается при смене настроек
+        pool = get_pool()
+        tried = ()
+        while True:
+            endpoint = pool.acquire(exclude=tried)
+            if endpoint is None:
+                # Испробованы все серверы: наружу уходит последняя ошибка
+                raise error
+            tried += (endpoint,)
+            try:
+                response = self._post(endpoint, request, stream, timeout)
+            except requests.exceptions.RequestException as e:
+                pool.release(endpoint, ok=False)
+                error = e
+                continue
+            if response.status_code >= 500:
+                response.close()
+                pool.release(endpoint, ok=False)
+                error = ProviderError(f"{self.title} error: {response.status_code}", response.status_code)
+                continue
+            if response.status_code != 200:
+                pool.release(endpoint)
+                return self._check(response)
+            # Сервер освобождается в release(), когда ответ дочитан или закрыт
+            response.lease = (pool, endpoint)
+            return response
+
+    def release(self, response: requests.Response, ok: bool = True) -> None:
+        lease = getattr(response, 'lease', None)
+        if lease is not None:
+            response.lease = None
+            pool, endpoint = lease
+            pool.release(endpoint, ok)
+
+    def embed(self, model: str, text: str, timeout: Timeout) -> List[float]:
+        pool = get_pool()
+        endpoint = pool.acquire()
+        ok = True
+        try:
+            # /api/embed (Ollama 0.3+), у старых версий - /api/embeddings
+            response = endpoint.client.post('/api/embed', {'model': model, 'input': text}, timeout=timeout)
+            if response.status_code != 404 or _model_missing(response):
+                return self._check(response).json()['embeddings'][0]
+            response.close()
+            response = endpoint.client.post('/api/embeddings', {'model': model, 'prompt': text}, timeout=timeout)
+            return self._check(response).json()['embedding']
+        except requests.exceptions.RequestException:
+            ok = False
+            raise
+        except ProviderError as e:
+            # Неизвестная модель вложений - не поломка сервера
+            ok = e.status < 500
+            raise
+        finally:
+            pool.release(endpoint, ok)
+
+    def _post(
+        self,
+        endpoint: Endpoint,
+        request: GenerationRequest,
+        stream: bool,
+        timeout: Timeout,
+    ) -> requests.Response:
+        client = endpoint.client
+        options = self.options(request)
+        if endpoint.api == 'chat':
+            # История диалога идет между системным промптом и новым вводом:
+            # префикс совпадает с прошлым ходом, и Ollama не пересчитывает его
+            payload = {
+                'model': request.model,
+                'messages': request.messages(),
+                'options': options,
+                'stream': stream,
+            }
+            if request.think is not None:
+                payload['think'] = request.think
+            response = client.post('/api/chat', payload, timeout=timeout, stream=stream)
+            if response.status_code != 404 or _model_missing(response):
+                return response
+            response.close()
+            # Chat API нет (старая Ollama): сервер запоминает это, и следующие
+            # ходы сразу идут в Generate API
+            endpoint.api = 'generate'
+        payload = {
+            'model': request.model,
+            'prompt': generate_prompt(request),
+            'options': options,
+            'stream': stream,
+        }
+        if request.think is not None:
+            payload['think'] = request.think
+        # context прошлого хода: модель досчитывает только новые токены
+        if request.context:
+            payload['context'] = request.context
+        return client.post('/api/generate', payload, timeout=timeout, stream=stream)
+
+    def chunks(self, response: requests.Response, stream: bool, meta: dict) -> Iterator[str]:
+        if not stream:
+            data = response.json()
+            meta.update(data)
+            yield data.get('message', {}).get('content', '') or data.get('response', '')
+            return
+        # NDJSON: по объекту на строку, последний (done) несет context и счетчики
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            if data.get('done'):
+                meta.update(data)
+            chunk = data.get('message', {}).get('content', '') or data.get('response', '')
+            if chunk:
+                yield chunk
+
+
+def _model_missing(response: requests.Response) -> bool:
+    """404 из-за неизвестной модели, а не из-за отсутствия /api/chat."""
+    try:
+        error = response.json().get('error', '')
+    except ValueError:
+        return False
+    return 'model' in str(error).lower()
+
+
+def generate_prompt(request: GenerationRequest) -> str:
+    """Промпт для /api/generate.
+
+    При сохраненном context системный промпт и история уже внутри него,
+    поэтому отправляется только новая реплика.
+    """
+    turn = f"User: {request.user_input}\nAssistant:"
+    if request.context:
+        return turn
+    if request.history:
+        lines = [
+            f"{'User' if message['role'] == 'user' else 'Assistant'}: {message['content']}"
+            for message in request.history
+        ]
+        return f"{request.system}\n\n" + "\n".join(lines) + f"\n{turn}"
+    return f"{request.system}\n\n{turn}"
+
+
+class OpenAICompatibleProvider(Provider):
+    """Сервер с OpenAI Chat Completions API: поток - SSE (data: {...} ... data: [DONE])."""
+
+    name = "openai"
+    title = "OpenAI-compatible"
+
+    def __init__(self, settings: Settings):
+        # Тот же пул соединений, что и у Ollama, но без keep_alive в теле запроса
+        self.client = OllamaClient(settings.openai_api_url, keep_alive='', pool_size=settings.ollama_pool_size)
+        self.headers = {}
+        if settings.openai_api_key:
+            self.headers['Authorization'] = f"Bearer {settings.openai_api_key}"
+
+    @staticmethod
+    def config_key(settings: Settings) -> tuple:
+        return (settings.openai_api_url, settings.openai_api_key, settings.ollama_pool_size)
+
+    def options(self, request: GenerationRequest) -> dict:
+        options = {}
+        if request.max_tokens:
+            options['max_tokens'] = request.max_tokens
+        if request.temperature is not None:
+            options['temperature'] = request.temperature
+        return options
+
+    def embed(self, model: str, text: str, timeout: Timeout) -> List[float]:
+        response = self.client.post(
+            '/embeddings', {'model': model, 'input': text}, timeout=timeout, headers=self.headers
+        )
+        return self._check(response).json()['data'][0]['embedding']
+
+    def open(self, request: GenerationRequest, stream: bool, timeout: Timeout) -> requests.Response:
+        # request.think не передается: общего поля для размышлений в этом API нет
+        payload = {
+            'model': request.model,
+            'messages': request.messages(),
+            'stream': stream,
+            **self.options(request),
+        }
+        if stream:
+            # Число токенов приходит последним событием потока
+            payload['stream_options'] = {'include_usage': True}
+        response = self.client.post(
+            '/chat/completions', payload, timeout=timeout, stream=stream, headers=self.headers
+        )
+        return self._check(response)
+
+    def chunks(self, response: requests.Response, stream: bool, meta: dict) -> Iterator[str]:
+        if not stream:
+            data = response.json()
+            _usage(data, meta)
+            choices = data.get('choices') or [{}]
+            yield (choices[0].get('message') or {}).get('content') or ''
+            return
+        for line in response.iter_lines():
+            # Пустые строки разделяют события, ":" - комментарий (keep-alive)
+            if not line.startswith(b'data:'):
+                continue
+            body = line[5:].strip()
+            if body == b'[DONE]':
+                break
+            data = json.loads(body)
+            _usage(data, meta)
+            for choice in data.get('choices') or ():
+                chunk = (choice.get('delta') or {}).get('content')
+                if chunk:
+                    yield chunk
+
+
+def _usage(data: dict, meta: dict) -> None:
+    """usage OpenAI -> счетчики в формате Ollama (для метрик)."""
+    usage = data.get('usage')
+    if usage:
+        meta['prompt_eval_count'] = usage.get('prompt_tokens')
+        meta['eval_count'] = usage.get('completion_tokens')
+
+
+_PROVIDERS: Dict[str, Callable[[Settings], Provider]] = {}
+_instances: Dict[str, Tuple[tuple, Provider]] = {}
+_instances_lock = threading.Lock()
+
+
+def register_provider(factory: Callable[[Settings], Provider], *names: str) -> None:
+    """Добавляет провайдера в реестр под одним или несколькими именами LLM_PROVIDER."""
+    for name in names:
+        _PROVIDERS[name.lower()] = factory
+
+
+register_provider(OllamaProvider, 'local', 'ollama')
+register_provider(OpenAICompatibleProvider, 'openai', 'openai-compatible')
+
+
+def get_provider(settings: Optional[Settings] = None) -> Provider:
+    """Провайдер из LLM_PROVIDER. Пересоздается, если поменялись его настройки."""
+    settings = settings or get_settings()
+    name = settings.llm_provider.strip().lower()
+    factory = _PROVIDERS.get(name)
+    if factory is None:
+        raise ProviderError(
+            f"LLM_PROVIDER={settings.llm_provider} не поддерживается (доступны: {', '.join(sorted(_PROVIDERS))})"
+        )
+    key = getattr(factory, 'config_key', Provider.config_key)(settings)
+    with _instances_lock:
+        cached = _instances.get(name)
+        if cached is None or cached[0] != key:
+            cached = (key, factory(settings))
+            _instances[name] = cached
+        return cached[1]
@@ -1,114 +1,349 @@
 # единая точка общения с ИИ
 import os
 import sys
-import json
 import time
+import asyncio
+import functools
 import requests
-from typing import Optional
-from dotenv import load_dotenv
-from src.ai.filters import filter_advice, filter_empathy, filter_length, filter_thinking
+from typing import Callable, Iterator, Optional
+from src.ai.cache import ResponseCache, get_cache
+from src.ai.client import CancelScope
+from src.ai.conversation import Conversation, get_conversation
+from src.ai.prompts import get_registry
+from src.ai.providers import GenerationRequest, Provider, ProviderError, get_provider
+from src.ai.retry import Deadline, RetryPolicy
+from src.ai.scheduler import get_scheduler
+from src.ai.semantic import get_semantic_cache, scope_of
+from src.ai.filters import FilterEngine
+from src.ai.metrics import get_metrics
+from src.ai.silence import get_policy
+from src.settings import Settings, get_settings
 
 
-# Загружаем конфигурацию
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-load_dotenv("config/config.env")
 
-def _load_prompt(filename: str) -> str:
+def respond(
+    user_input: str,
+    mode: str = "ask",
+    on_token: Optional[Callable[[str], None]] = None,
+    cancel: Optional[CancelScope] = None,
+    session: str = "default",
+    fallback: Optional[Callable[[str], Optional[str]]] = None,
+    local: bool = False,
+) -> Optional[str]:
+    """Ответ ИИ на ввод пользователя.
 
-    # Файлы промптов находятся в config/ai/
-    path = os.path.join('config', 'ai', filename)
-    if not os.path.exists(path):
-        return ""
+    Если передан on_token, ответ запрашивается потоково и видимый текст
+    (уже без <think> и после фильтров) отдается в on_token по мере генерации.
+    Возвращается полный отфильтрованный ответ в обоих случаях.
+
+    cancel позволяет прервать генерацию из другого потока; прерванный
+    ход возвращает None.
+
+    Режимы из HISTORY_MODES помнят прошлые ходы сессии session.
+    При перегрузке планировщик (src/ai/scheduler.py) отвечает молчанием.
+
+    fallback - локальный ответ без модели: вместо молчания, когда ход
+    сброшен планировщиком или сервер не ответил; при local=True - всегда.
+    """
+    # Один снимок настроек на весь ход
+    settings = get_settings()
+    metrics = get_metrics()
+    model = settings.model
+    started = time.perf_counter()
+
+    # Молчание решается до запроса: такой ход не тратит время модели
+    with metrics.span("policy", mode, model):
+        silent = get_policy().decide(user_input, mode, settings, session)
+    if silent:
+        return None
+
+    if on_token is not None:
+        # Время до первого видимого токена - то, что ощущает пользователь
+        emit = on_token
+        first = []
+
+        def on_token(chunk: str) -> None:
+            if not first:
+                first.append(True)
+                metrics.observe("first_token", time.perf_counter() - started, mode, model)
+            emit(chunk)
+
+    if fallback is not None and local:
+        return _fallback(fallback, user_input, mode, on_token, model)
+
+    conversation = get_conversation(session, mode, settings)
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read().strip()
-    except Exception:
-        return ""
-
-def respond(user_input: str, mode: str = "ask") -> Optional[str]:
-    # Получаем провайдера ИИ
-    provider = os.getenv('LLM_PROVIDER', 'local').lower()
-    
-    if provider == 'local' or provider == 'ollama':  
-        return _call_ollama_api(user_input, mode)  
-        
-def _call_ollama_api(user_input: str, mode: str = "ask") -> Optional[str]:
-    # Получаем модель из конфига
-    model = os.getenv('MODEL_NAME', 'deepseek-r1:8b')
-    if model == 'default':
-        model = 'deepseek-r1:8b'
-
-    base_url = os.getenv('OLLAMA_API_URL', 'http://localhost:11434/api/chat').replace('/api/chat', '').replace('/api/generate', '')
-    chat_url = f"{base_url}/api/chat"
-    gen_url = f"{base_url}/api/generate"
-
-    # Загружаем промпты
-    core_prompt = _load_prompt('core.txt')
-    mode_prompt = _load_prompt(f'{mode}.txt')
-    system_content = f"{core_prompt}\n\n{mode_prompt}".strip()
-
-    # Подготовка опций
-    options = {}
-    max_tokens = os.getenv('MAX_TOKENS')
-    if max_tokens:
-        options['num_predict'] = int(max_tokens)
-    temperature = os.getenv('TEMPERATURE')
-    if temperature:
-        options['temperature'] = float(temperature)
-
-    # 1. Сначала пробуем Chat API
-    payload_chat = {
-        'model': model,
-        'messages': [
-            {'role': 'system', 'content': system_content},
-            {'role': 'user', 'content': user_input}
-        ],
-        'options': options,
-        'stream': False
-    }
-
-    timeout = int(os.getenv('OLLAMA_TIMEOUT', '30'))
-    retries = int(os.getenv('OLLAMA_RETRY_ATTEMPTS', '3'))
-    retry_delay = int(os.getenv('OLLAMA_RETRY_DELAY', '2'))
-
-    for attempt in range(retries + 1):
+        provider = get_provider(settings)
+    except ProviderError as e:
+        print(e)
+        return _fallback(fallback, user_input, mode, on_token, model) if fallback is not None else None
+    request = _build_request(user_input, mode, settings, conversation)
+    options = {provider.name: provider.options(request), 'think': request.think}
+
+    # Точный кэш: повторяющийся короткий ввод не требует новой генерации.
+    # Ответ с историей зависит от всего диалога - его не кэшируем
+    cache = get_cache(settings) if conversation is None else None
+    if cache is not None:
+        with metrics.span("cache_lookup", mode, model):
+            key = ResponseCache.make_key(model, mode, get_registry().get(mode).hash, user_input, options)
+            cached = cache.get(key)
+        if cached is not None:
+            metrics.count("cache_hits", mode, model)
+            if on_token is not None:
+                on_token(cached)
+            return cached
+
+    # Семантический кэш: тот же смысл другими словами (src/ai/semantic.py).
+    # Вложение на порядки дешевле генерации
+    semantic = get_semantic_cache(settings) if conversation is None else None
+    vector = None
+    if semantic is not None:
+        scope = scope_of(model, mode, get_registry().get(mode).hash, options)
+        with metrics.span("semantic_lookup", mode, model):
+            vector = semantic.embed(provider, user_input)
+            cached = semantic.get(mode, scope, vector) if vector is not None else None
+        if cached is not None:
+            metrics.count("semantic_hits", mode, model)
+            if on_token is not None:
+                on_token(cached)
+            return cached
+
+    # Слот у планировщика: при перегрузке ход молчит, а не ждет без предела
+    scheduler = get_scheduler(settings)
+    with metrics.span("queue", mode, model):
+        admitted = scheduler.acquire(mode, cancel)
+    if not admitted:
+        metrics.count("shed", mode, model)
+        return _fallback(fallback, user_input, mode, on_token, model) if fallback is not None else None
+    meta = {}
+    held = time.monotonic()
+    try:
+        with metrics.span("inference", mode, model):
+            # Диалогу нужен context из последнего чанка: поток дочитывается и после лимита
+            response = _generate(provider, request, mode, on_token, settings, cancel, meta, drain=conversation is not None)
+    finally:
+        scheduler.release(time.monotonic() - held)
+    metrics.record_ollama(meta, mode, model)
+    if meta.get('truncated'):
+        # Поток закрыт на лимите: счетчиков Ollama у хода нет
+        metrics.count("truncated", mode, model)
+    if response is None and fallback is not None and meta.get('error') is not None:
+        return _fallback(fallback, user_input, mode, on_token, model)
+
+    if conversation is not None and response:
+        conversation.record(user_input, response, meta.get('context'))
+    if cache is not None and response:
+        cache.put(key, response)
+    if vector is not None and response:
+        semantic.put(mode, scope, vector, user_input, response)
+    return response
+
+def _build_request(
+    user_input: str,
+    mode: str,
+    settings: Settings,
+    conversation: Optional[Conversation] = None,
+) -> GenerationRequest:
+    """Запрос генерации: готовый системный промпт режима (без обращения к диску) и история."""
+    return GenerationRequest(
+        model=settings.model,
+        system=get_registry().get(mode).text,
+        user_input=user_input,
+        history=tuple(conversation.messages()) if conversation is not None else (),
+        context=conversation.context if conversation is not None else None,
+        max_tokens=settings.max_tokens_for(mode),
+        temperature=settings.temperature,
+        think=settings.think_for(mode),
+    )
+
+def _generate(
+    provider: Provider,
+    request: GenerationRequest,
+    mode: str = "ask",
+    on_token: Optional[Callable[[str], None]] = None,
+    settings: Optional[Settings] = None,
+    cancel: Optional[CancelScope] = None,
+    meta: Optional[dict] = None,
+    drain: bool = False,
+) -> Optional[str]:
+    """Запрос к провайдеру с повторами в пределах срока хода (src/ai/retry.py).
+
+    В meta попадают служебные поля ответа (context и счетчики), а после
+    неудачи всех попыток - error. Поток, обрезанный лимитом фильтров,
+    закрывается сразу (meta['truncated']); drain=True дочитывает его
+    без вывода, чтобы получить context и счетчики.
+    """
+    settings = settings or get_settings()
+    if meta is None:
+        meta = {}
+
+    # Отменяемый запрос всегда потоковый: закрыть можно только открытый поток
+    stream = on_token is not None or cancel is not None
+    if on_token is None:
+        on_token = _ignore_token
+
+    deadline = Deadline(settings.ollama_turn_deadline_sec)
+    policy = RetryPolicy.from_settings(settings)
+    # Повтор после уже показанного текста напечатал бы ответ дважды
+    shown = []
+
+    def forward(chunk: str) -> None:
+        shown.append(True)
+        on_token(chunk)
+
+    attempt = 0
+    while True:
+        if cancel is not None and cancel.cancelled:
+            return None
         try:
-            response = requests.post(chat_url, json=payload_chat, timeout=timeout)
-            if response.status_code == 200:
-                content = response.json().get('message', {}).get('content', '')
-                return _process_content(content, mode)
-            elif response.status_code == 404:
-                # Если Chat API не найден, пробуем Generate API
-                full_prompt = f"{system_content}\n\nUser: {user_input}\nAssistant:"
-                payload_gen = {
-                    'model': model,
-                    'prompt': full_prompt,
-                    'options': options,
-                    'stream': False
-                }
-                response = requests.post(gen_url, json=payload_gen, timeout=timeout)
-                if response.status_code == 200:
-                    content = response.json().get('response', '')
-                    return _process_content(content, mode)
-
-            print(f"Ollama error: {response.status_code}")
-            break # Не ретраим при ошибках типа 404 или 500, если это не таймаут
-        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-            if attempt < retries:
-                time.sleep(retry_delay)
-                continue
-            print(f"Ollama connection error after {retries} retries: {e}")
+            # Недоступный сервер отсеивается за время соединения, а не за весь таймаут ответа
+            timeout = deadline.timeout(settings.ollama_connect_timeout, settings.ollama_timeout)
+            response = provider.open(request, stream, timeout)
+            ok = False
+            try:
+                if stream:
+                    content = _read_stream(
+                        response, provider.chunks(response, True, meta), mode, forward, settings, cancel, meta, drain
+                    )
+                    ok = True
+                    return content
+                content = "".join(provider.chunks(response, False, meta))
+                ok = True
+            finally:
+                response.close()
+                # Обрыв из-за отмены - не вина сервера
+                provider.release(response, ok or (cancel is not None and cancel.cancelled))
+            return _process_content(content, mode, settings)
         except Exception as e:
-            print(f"Ollama unexpected error: {e}")
-            break
+            if cancel is not None and cancel.cancelled:
+                return None
+            delay = None if shown else policy.next_delay(e, attempt, deadline)
+            if delay is None:
+                if attempt:
+                    print(f"{provider.title} error after {attempt} retries: {e}")
+                else:
+                    print(e if isinstance(e, ProviderError) else f"{provider.title} error: {e}")
+                meta['error'] = e
+                return None
+            time.sleep(delay)
+            attempt += 1
+
+class LocalResponse(str):
+    """Ответ локального движка режима, а не модели: журнал помечает его source."""
 
-    return None
+    source = "local"
 
-def _process_content(content: str, mode: str = "ask") -> str:
+
+def _fallback(
+    fallback: Callable[[str], Optional[str]],
+    user_input: str,
+    mode: str,
+    on_token: Optional[Callable[[str], None]],
+    model: str,
+) -> Optional[str]:
+    """Локальный ответ режима целиком одним куском, с пометкой LocalResponse."""
+    metrics = get_metrics()
+    with metrics.span("fallback", mode, model):
+        response = fallback(user_input) or None
+    if response and on_token is not None:
+        on_token(response)
+    return LocalResponse(response) if response else response
+
+def _process_content(content: str, mode: str = "ask", settings: Optional[Settings] = None) -> str:
     if content:
-        content = filter_thinking(content)
-        content = filter_advice(content)
-        content = filter_empathy(content, mode)
-        content = filter_length(content)
+        settings = settings or get_settings()
+        with get_metrics().span("filter", mode, settings.model):
+            content = FilterEngine.for_mode(mode, settings).apply(content)
     return content
 
+def _ignore_token(chunk: str) -> None:
+    pass
+
+def _read_stream(
+    response: requests.Response,
+    chunks: Iterator[str],
+    mode: str,
+    on_token: Callable[[str], None],
+    settings: Optional[Settings] = None,
+    cancel: Optional[CancelScope] = None,
+    meta: Optional[dict] = None,
+    drain: bool = False,
+) -> Optional[str]:
+    """Пропускает текст провайдера через потоковые фильтры и отдает видимое в on_token."""
+    settings = settings or get_settings()
+    stream_filter = FilterEngine.for_mode(mode, settings).stream()
+    parts = []
+    # Суммарное время фильтров по всем чанкам
+    filtering = 0.0
+    if cancel is not None:
+        cancel.attach(response)
+    try:
+        for chunk in chunks:
+            if cancel is not None and cancel.cancelled:
+                return None
+            if stream_filter.done:
+                # Ответ уже полный: остаток читается только ради последнего чанка
+                continue
+            mark = time.perf_counter()
+            visible = stream_filter.feed(chunk)
+            filtering += time.perf_counter() - mark
+            if visible:
+                parts.append(visible)
+                on_token(visible)
+            # Лимит длины или предложений достигнут - остальное все равно будет отрезано
+            if stream_filter.done and not drain:
+                if meta is not None:
+                    meta['truncated'] = True
+                break
+        # Иначе поток дочитан до конца (вместе со счетчиками) и соединение вернется в пул
+    finally:
+        if cancel is not None:
+            cancel.detach()
+        response.close()
+
+    mark = time.perf_counter()
+    visible = stream_filter.flush()
+    filtering += time.perf_counter() - mark
+    get_metrics().observe("filter", filtering, mode, settings.model)
+    if visible:
+        parts.append(visible)
+        on_token(visible)
+    return "".join(parts)
+
+async def run_cancellable(
+    func: Callable[..., Optional[str]],
+    *args,
+    on_token: Optional[Callable[[str], None]] = None,
+    **kwargs,
+) -> Optional[str]:
+    """Выполняет блокирующую функцию режима в потоке, не блокируя цикл событий.
+
+    on_token вызывается в потоке цикла событий. Отмена корутины
+    закрывает HTTP-поток через CancelScope, и сервер перестает
+    генерировать брошенный ответ.
+    """
+    loop = asyncio.get_running_loop()
+    scope = CancelScope()
+
+    def forward(chunk: str) -> None:
+        if not scope.cancelled:
+            loop.call_soon_threadsafe(on_token, chunk)
+
+    call = functools.partial(
+        func, *args, on_token=forward if on_token is not None else None, cancel=scope, **kwargs
+    )
+    try:
+        return await loop.run_in_executor(None, call)
+    except asyncio.CancelledError:
+        scope.cancel()
+        raise
+
+async def respond_async(
+    user_input: str,
+    mode: str = "ask",
+    on_token: Optional[Callable[[str], None]] = None,
+    session: str = "default",
+) -> Optional[str]:
+    """Асинхронный respond(): отмена задачи прерывает генерацию на сервере."""
+    return await run_cancellable(respond, user_input, mode, on_token=on_token, session=session)
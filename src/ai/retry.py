@@ -0,0 +1,78 @@
+# повторы запроса: срок на ход и экспоненциальная пауза со случайным разбросом
+"""
+Ход ограничен сроком OLLAMA_TURN_DEADLINE_SEC: таймауты соединения и
+чтения каждой попытки урезаются до оставшегося времени, а повтор, пауза
+перед которым не помещается в срок, не начинается. Поэтому худшая
+задержка хода предсказуема и не зависит от числа попыток.
+
+Повторяются только ошибки, которые могут пройти сами:
+    обрыв и таймаут соединения, таймаут чтения;
+    HTTP 408, 429, 500, 502, 503, 504 (модель грузится, сервер перегружен).
+Остальные ответы сервера (404, 400 и т.п.) повтор не исправит.
+
+Пауза - "full jitter": случайная в [0, min(max_delay, base * 2**attempt)],
+чтобы несколько клиентов не били в восстановившийся сервер одновременно.
+"""
+
+import random
+import time
+from typing import Optional, Tuple
+
+import requests
+
+from src.settings import Settings, get_settings
+
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class Deadline:
+    """Срок хода по монотонным часам."""
+
+    def __init__(self, seconds: float):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, connect: float, read: float) -> Tuple[float, float]:
+        """Таймауты (соединение, чтение) попытки, урезанные до остатка срока."""
+        remaining = self.remaining()
+        return min(connect, read, remaining), min(read, remaining)
+
+
+class RetryPolicy:
+    """Какие ошибки повторять и сколько ждать перед повтором."""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None) -> "RetryPolicy":
+        settings = settings or get_settings()
+        return cls(settings.ollama_retry_attempts, settings.ollama_retry_delay, settings.ollama_retry_max_delay)
+
+    def retryable(self, error: Exception) -> bool:
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        status = getattr(error, 'status', None)
+        return status in RETRY_STATUSES
+
+    def backoff(self, attempt: int) -> float:
+        """Пауза перед повтором номер attempt (с нуля)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def next_delay(self, error: Exception, attempt: int, deadline: Deadline) -> Optional[float]:
+        """Пауза перед следующей попыткой или None, если повторять не нужно или некогда."""
+        if attempt >= self.attempts or not self.retryable(error):
+            return None
+        delay = self.backoff(attempt)
+        # После паузы должно остаться время хотя бы на соединение
+        if delay >= deadline.remaining():
+            return None
+        return delay
@@ -0,0 +1,188 @@
+# планировщик запросов к модели: приоритеты режимов и сброс нагрузки в молчание
+"""
+Перед обращением к модели ход получает слот. Слотов
+SCHEDULER_CONCURRENCY на каждый сервер (для пула Ollama - на каждый
+адрес OLLAMA_API_URLS), остальные ходы ждут в ограниченной очереди
+SCHEDULER_QUEUE_SIZE. Свободный слот достается ходу самого важного
+режима (SCHEDULER_PRIORITIES, по умолчанию psycholog > ask > distort
+> void), среди равных - раньше пришедшему.
+
+У каждого режима есть бюджет ожидания (SCHEDULER_WAIT_BUDGETS). Ход
+не ставится в очередь, если ожидаемое ожидание (место в очереди на
+среднее время обращения к модели) больше бюджета, и снимается с
+очереди, если бюджет истек. Такой ход отвечает молчанием: для Star_Void
+это допустимый ответ, а хвост задержек остается ограниченным. При
+полной очереди новый ход вытесняет самый неважный из ждущих (или
+молчит сам, если он и есть самый неважный).
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Optional
+
+from src.settings import Settings, get_settings
+
+# Как часто ждущий ход проверяет отмену (CancelScope не будит очередь)
+CANCEL_POLL = 0.05
+# Вес нового замера в скользящем среднем времени обращения к модели
+SERVICE_ALPHA = 0.2
+
+
+class _Ticket:
+    """Ход в очереди: меньше priority - важнее."""
+
+    __slots__ = ("priority", "seq", "shed")
+
+    def __init__(self, priority: int, seq: int):
+        self.priority = priority
+        self.seq = seq
+        self.shed = False
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Scheduler:
+    """Слоты обращения к модели с приоритетной очередью и сбросом нагрузки."""
+
+    def __init__(
+        self,
+        capacity: int,
+        queue_size: int,
+        priorities: Dict[str, int],
+        budgets: Dict[str, float],
+        default_budget: float,
+    ):
+        self.capacity = capacity
+        self.queue_size = queue_size
+        self.priorities = priorities
+        self.budgets = budgets
+        self.default_budget = default_budget
+        # Среднее время занятия слота; None - замеров еще не было
+        self.service_time: Optional[float] = None
+        self.running = 0
+        self.admitted = 0
+        self.shed = 0
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def priority(self, mode: str) -> int:
+        return self.priorities.get(mode, len(self.priorities))
+
+    def budget(self, mode: str) -> float:
+        return self.budgets.get(mode, self.default_budget)
+
+    def expected_wait(self, position: int) -> float:
+        """Ожидаемое ожидание хода, перед которым position ходов в очереди."""
+        if self.service_time is None:
+            return 0.0
+        return self.service_time * (position + 1) / self.capacity
+
+    def acquire(self, mode: str, cancel=None) -> bool:
+        """Ждет слот. False - ход сброшен (очередь, бюджет или отмена), модель не вызывается."""
+        ticket = _Ticket(self.priority(mode), next(self._seq))
+        budget = self.budget(mode)
+        with self._cond:
+            if self.running < self.capacity and not self._queue:
+                return self._admit()
+            position = sum(1 for other in self._queue if other < ticket)
+            if self.expected_wait(position) > budget:
+                return self._shed()
+            if len(self._queue) >= self.queue_size:
+                worst = max(self._queue, default=None)
+                if worst is None or worst < ticket:
+                    return self._shed()
+                self._remove(worst)
+                worst.shed = True
+            heapq.heappush(self._queue, ticket)
+
+            deadline = time.monotonic() + budget
+            while True:
+                if ticket.shed:
+                    return self._shed()
+                if self._queue[0] is ticket and self.running < self.capacity:
+                    heapq.heappop(self._queue)
+                    # Следующий в очереди может занять еще один свободный слот
+                    self._cond.notify_all()
+                    return self._admit()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (cancel is not None and cancel.cancelled):
+                    self._remove(ticket)
+                    return self._shed()
+                self._cond.wait(min(remaining, CANCEL_POLL) if cancel is not None else remaining)
+
+    def release(self, held: float) -> None:
+        """Освобождает слот; held - сколько он был занят."""
+        with self._cond:
+            self.running -= 1
+            if self.service_time is None:
+                self.service_time = held
+            else:
+                self.service_time += SERVICE_ALPHA * (held - self.service_time)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            total = self.admitted + self.shed
+            return {
+                "running": self.running,
+                "queued": len(self._queue),
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "shed_ratio": self.shed / total if total else 0.0,
+                "service_time": self.service_time,
+            }
+
+    def _admit(self) -> bool:
+        self.running += 1
+        self.admitted += 1
+        return True
+
+    def _shed(self) -> bool:
+        self.shed += 1
+        return False
+
+    def _remove(self, ticket: _Ticket) -> None:
+        self._queue.remove(ticket)
+        heapq.heapify(self._queue)
+        self._cond.notify_all()
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_key: Optional[tuple] = None
+_scheduler_lock = threading.Lock()
+
+
+def backend_count(settings: Settings) -> int:
+    """Сколько серверов обслуживают запросы: адреса пула Ollama или один внешний сервер."""
+    if settings.llm_provider.strip().lower() in ('local', 'ollama'):
+        return len(settings.ollama_endpoints)
+    return 1
+
+
+def get_scheduler(settings: Optional[Settings] = None) -> Scheduler:
+    """Общий планировщик; пересоздается при смене его настроек."""
+    global _scheduler, _scheduler_key
+    settings = settings or get_settings()
+    key = (
+        settings.scheduler_concurrency * backend_count(settings),
+        settings.scheduler_queue_size,
+        settings.scheduler_priorities,
+        settings.scheduler_wait_budgets,
+        settings.scheduler_wait_budget_sec,
+    )
+    if _scheduler is None or _scheduler_key != key:
+        with _scheduler_lock:
+            if _scheduler is None or _scheduler_key != key:
+                _scheduler = Scheduler(
+                    key[0],
+                    settings.scheduler_queue_size,
+                    {mode: rank for rank, mode in enumerate(settings.scheduler_priorities)},
+                    settings.wait_budgets,
+                    settings.scheduler_wait_budget_sec,
+                )
+                _scheduler_key = key
+    return _scheduler
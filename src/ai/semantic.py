@@ -0,0 +1,330 @@
+# семантический кэш: близкие по смыслу реплики получают сохраненный ответ
+"""
+Пользователи повторяют одно и то же разными словами ("мне пусто",
+"внутри пусто", "пустота внутри"). Точный кэш (src/ai/cache.py) такие
+реплики не узнает, а каждая из них стоит полной генерации.
+
+Ввод переводится в вектор моделью вложений сервера
+(SEMANTIC_CACHE_MODEL, у Ollama - /api/embed). Для каждого режима
+хранится непрерывная матрица нормированных векторов float32; поиск -
+одно умножение матрицы на вектор (косинусная близость) и argmax. Ответ
+отдается, если близость не меньше SEMANTIC_CACHE_THRESHOLD, а промпт
+режима и параметры генерации те же, что при сохранении.
+
+При переполнении (SEMANTIC_CACHE_SIZE на режим) вытесняется давно не
+использованная запись. Матрица лежит в SEMANTIC_CACHE_DIR как .npy,
+открытый через memmap, рядом - JSON с ответами. Изменения сбрасываются
+на диск не чаще раза в SEMANTIC_CACHE_SAVE_SEC и при выходе.
+
+NumPy - необязательная зависимость: без него SEMANTIC_CACHE не
+действует (pip install numpy).
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from src.ai.cache import normalize_input
+from src.settings import Settings, get_settings
+from src.utils.randomness import get_rng
+
+# NumPy - необязательная зависимость; импортируется в get_semantic_cache(),
+# только когда кэш включен (импорт responder не должен его тянуть)
+np = None
+
+
+def _load_numpy() -> bool:
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+
+class SemanticIndex:
+    """Векторы и ответы одного режима: матрица (capacity, dim) и LRU по такту обращения."""
+
+    def __init__(self, capacity: int, dim: int, path: Optional[str] = None):
+        self.capacity = capacity
+        self.dim = dim
+        self.path = path
+        self.count = 0
+        self.responses: List[Optional[str]] = [None] * capacity
+        self.inputs: List[Optional[str]] = [None] * capacity
+        self.scopes = np.zeros(capacity, dtype=np.int64)
+        self.used = np.zeros(capacity, dtype=np.int64)
+        self.tick = 0
+        # Есть изменения, еще не записанные на диск
+        self.dirty = False
+        self.vectors = self._open_vectors()
+
+    def search(self, vector, scope: int) -> Tuple[int, float]:
+        """Самая близкая запись той же области: (номер, близость); (-1, -1.0) - нет записей."""
+        if not self.count:
+            return -1, -1.0
+        scores = self.vectors[:self.count] @ vector
+        # Записи другого промпта или других параметров не подходят
+        scores[self.scopes[:self.count] != scope] = -1.0
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+    def touch(self, slot: int) -> None:
+        self.tick += 1
+        self.used[slot] = self.tick
+
+    def add(self, vector, scope: int, user_input: str, response: str) -> int:
+        if self.count < self.capacity:
+            slot = self.count
+            self.count += 1
+        else:
+            slot = int(np.argmin(self.used))
+        self.vectors[slot] = vector
+        self.scopes[slot] = scope
+        self.responses[slot] = response
+        self.inputs[slot] = user_input
+        self.touch(slot)
+        return slot
+
+    def meta(self) -> dict:
+        """Снимок ответов и счетчиков для JSON рядом с матрицей."""
+        return {
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "count": self.count,
+            "tick": self.tick,
+            "scopes": self.scopes[:self.count].tolist(),
+            "used": self.used[:self.count].tolist(),
+            "responses": self.responses[:self.count],
+            "inputs": self.inputs[:self.count],
+        }
+
+    def save(self, meta: Optional[dict] = None) -> None:
+        """Сбрасывает матрицу на диск и атомарно переписывает JSON с ответами."""
+        if self.path is None:
+            return
+        meta = meta if meta is not None else self.meta()
+        self.vectors.flush()
+        tmp = f"{self.path}.json.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, f"{self.path}.json")
+
+    def _open_vectors(self):
+        if self.path is None:
+            return np.zeros((self.capacity, self.dim), dtype=np.float32)
+        matrix_path = f"{self.path}.npy"
+        meta = _read_meta(f"{self.path}.json")
+        if (
+            meta is not None
+            and meta.get("dim") == self.dim
+            and meta.get("capacity") == self.capacity
+            and os.path.exists(matrix_path)
+        ):
+            try:
+                vectors = np.lib.format.open_memmap(matrix_path, mode="r+")
+            except (OSError, ValueError):
+                vectors = None
+            if vectors is not None and vectors.shape == (self.capacity, self.dim):
+                self.count = min(meta["count"], self.capacity)
+                self.tick = meta.get("tick", 0)
+                self.scopes[:self.count] = meta["scopes"][:self.count]
+                self.used[:self.count] = meta["used"][:self.count]
+                self.responses[:self.count] = meta["responses"][:self.count]
+                self.inputs[:self.count] = meta["inputs"][:self.count]
+                return vectors
+        # Файла нет или он от другой модели вложений (другая размерность) - начинаем заново
+        return np.lib.format.open_memmap(matrix_path, mode="w+", dtype=np.float32, shape=(self.capacity, self.dim))
+
+
+def _read_meta(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def scope_of(*parts) -> int:
+    """Область записи: модель, режим, хэш промпта и параметры генерации в int64."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(raw).digest()[:8], "little", signed=True)
+
+
+class SemanticCache:
+    """Индексы режимов, вложения через провайдера и статистика попаданий."""
+
+    def __init__(
+        self,
+        model: str,
+        threshold: float = 0.92,
+        capacity: int = 512,
+        directory: Optional[str] = None,
+        timeout: float = 2.0,
+        serve_probability: float = 1.0,
+        save_interval: float = 30.0,
+    ):
+        self.model = model
+        self.threshold = threshold
+        self.capacity = capacity
+        self.directory = directory or None
+        self.timeout = timeout
+        self.serve_probability = serve_probability
+        self.save_interval = save_interval
+        self._indexes = {}
+        self._lock = threading.Lock()
+        # Запись на диск идет вне _lock: ходы не ждут файловой системы
+        self._save_lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.errors = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def embed(self, provider, user_input: str):
+        """Нормированный вектор ввода или None, если сервер вложений не ответил."""
+        try:
+            values = provider.embed(self.model, normalize_input(user_input), self.timeout)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                # Первая ошибка видна, остальные только в статистике
+                if self.errors == 1:
+                    print(f"[system] Семантический кэш: нет вложений от {self.model}: {e}")
+            return None
+        vector = np.asarray(values, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if not norm:
+            return None
+        return vector / norm
+
+    def get(self, mode: str, scope: int, vector) -> Optional[str]:
+        with self._lock:
+            index = self._index(mode, len(vector))
+            slot, score = index.search(vector, scope)
+            if slot < 0 or score < self.threshold:
+                self.misses += 1
+                return None
+            index.touch(slot)
+            if self.serve_probability < 1.0 and get_rng().random() >= self.serve_probability:
+                self.bypassed += 1
+                return None
+            self.hits += 1
+            return index.responses[slot]
+
+    def put(self, mode: str, scope: int, vector, user_input: str, response: str) -> None:
+        with self._lock:
+            index = self._index(mode, len(vector))
+            slot, score = index.search(vector, scope)
+            if slot >= 0 and score >= 0.999:
+                # Тот же ввод: обновляется ответ, а не занимается новая строка
+                index.responses[slot] = response
+                index.touch(slot)
+            else:
+                index.add(vector, scope, user_input, response)
+            index.dirty = index.path is not None
+            due = time.monotonic() - self._saved_at >= self.save_interval
+            snapshots = self._snapshots() if due else []
+        self._write(snapshots)
+
+    def save(self) -> None:
+        """Записывает на диск все измененные индексы."""
+        with self._lock:
+            snapshots = self._snapshots()
+        self._write(snapshots)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.bypassed
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "errors": self.errors,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": sum(index.count for index in self._indexes.values()),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            snapshots = self._snapshots()
+            self._indexes.clear()
+        self._write(snapshots)
+
+    def _snapshots(self) -> list:
+        """Снимки измененных индексов; вызывается под _lock."""
+        self._saved_at = time.monotonic()
+        snapshots = []
+        for index in self._indexes.values():
+            if index.dirty:
+                index.dirty = False
+                snapshots.append((index, index.meta()))
+        return snapshots
+
+    def _write(self, snapshots: list) -> None:
+        if not snapshots:
+            return
+        with self._save_lock:
+            for index, meta in snapshots:
+                try:
+                    index.save(meta)
+                except OSError as e:
+                    index.dirty = True
+                    print(f"[system] Семантический кэш не сохранен: {e}")
+
+    def _index(self, mode: str, dim: int) -> SemanticIndex:
+        index = self._indexes.get(mode)
+        if index is None or index.dim != dim:
+            path = None
+            if self.directory:
+                name = "".join(c if c.isalnum() or c in "-_" else "_" for c in f"{mode}-{self.model}")
+                path = os.path.join(self.directory, name)
+            index = SemanticIndex(self.capacity, dim, path)
+            self._indexes[mode] = index
+        return index
+
+
+_semantic: Optional[SemanticCache] = None
+_semantic_key: Optional[tuple] = None
+_semantic_lock = threading.Lock()
+_warned = False
+
+
+def get_semantic_cache(settings: Optional[Settings] = None) -> Optional[SemanticCache]:
+    """Общий семантический кэш или None (SEMANTIC_CACHE выключен или нет NumPy)."""
+    global _semantic, _semantic_key, _warned
+    settings = settings or get_settings()
+    if not settings.semantic_cache:
+        return None
+    if not _load_numpy():
+        if not _warned:
+            _warned = True
+            print("[system] SEMANTIC_CACHE требует NumPy (pip install numpy) - кэш выключен.")
+        return None
+
+    key = (
+        settings.semantic_cache_model,
+        settings.semantic_cache_threshold,
+        settings.semantic_cache_size,
+        settings.semantic_cache_dir,
+        settings.semantic_cache_timeout_sec,
+        settings.response_cache_serve_probability,
+        settings.semantic_cache_save_sec,
+    )
+    if _semantic is None or _semantic_key != key:
+        with _semantic_lock:
+            if _semantic is None or _semantic_key != key:
+                if _semantic is not None:
+                    _semantic.close()
+                _semantic = SemanticCache(*key)
+                _semantic_key = key
+                atexit.register(_semantic.close)
+    return _semantic
@@ -1,45 +1,144 @@
 # логика намеренного молчания
-import os
+"""
+Единая политика молчания.
+
+Решение о молчании принимается до запроса к модели: если ход все равно
+закончится тишиной, генерация не запускается вовсе. Правила задаются
+по режимам (SilenceRule), а счетчики показывают, сколько запросов
+к модели удалось не делать.
+"""
+
+import re
 import time
-import random
-from dotenv import load_dotenv
-
-from src.ai.filters import BASE_SILENCE_PROBABILITY
-
-load_dotenv("config/config.env")
-
-BASE_SILENCE_PROBABILITY = float(os.getenv("SILENCE_PROBABILITY", "0.25"))
-
-SILENS_PATTERNS = {
-    
-    "...",
-    "..",
-    ".",
-    "   "
-}
-
-MODE_MULTIPLIERS = {
-    
-    "ask": 1.0,
-    "distort": 1.5,
-    "void": 4.0,
-    "silence": float("inf")
-}
-
-def should_be_silent(user_input: str, mode: str = "ask") -> bool:
-    
-    if mode == "silence":
-        return True    
-    
-    if user_input.strip() in SILENS_PATTERNS:
-        return random.random()  < 0.8
-        
-    probability = BASE_SILENCE_PROBABILITY * MODE_MULTIPLIERS.get(mode, 1.0)
-
-    probability = min(probability, 0.95)
-    
-    return random.random() < probability
-    
-def should_void_speak() -> bool:
-    void_speak_prob = float(os.getenv("VOID_SPEAK_PROBABILITY", "0.05"))
-    return random.random() < void_speak_prob
\ No newline at end of file
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+
+from src.settings import Settings, get_settings
+from src.utils.randomness import get_rng
+
+# Ввод без букв и цифр: "...", "?", "- - -"
+_NO_WORDS = re.compile(r"^[\W_]*$")
+
+
+@dataclass(frozen=True)
+class SilenceRule:
+    """Правила молчания режима."""
+
+    always: bool = False          # режим молчит всегда
+    probability: float = 0.0      # вероятность случайного молчания
+    empty: bool = True            # молчать на пустой ввод
+    punctuation: bool = True      # молчать на ввод без слов ("...", "?")
+    repeat_window: float = 0.0    # молчать на повтор того же ввода в течение N секунд
+
+
+@lru_cache(maxsize=16)
+def _rules(settings: Settings) -> Dict[str, SilenceRule]:
+    window = settings.silence_repeat_window_sec
+    return {
+        "silence": SilenceRule(always=True),
+        # void говорит редко: молчание - это все, кроме VOID_SPEAK_PROBABILITY
+        "void": SilenceRule(probability=1.0 - settings.void_speak_probability, repeat_window=window),
+        "distort": SilenceRule(probability=settings.distort_empty_probability, repeat_window=window),
+        "ask": SilenceRule(repeat_window=window),
+        "psycholog": SilenceRule(repeat_window=window),
+    }
+
+
+class SilencePolicy:
+    """Решает, промолчать ли на ввод, до любого сетевого запроса.
+
+    decide() возвращает причину молчания ("mode", "empty", "punctuation",
+    "repeat", "random") или None, если нужно спрашивать модель.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last: Dict[tuple, tuple] = {}
+        self.avoided = Counter()
+        self.passed = Counter()
+
+    def rule(self, mode: str, settings: Optional[Settings] = None) -> SilenceRule:
+        return _rules(settings or get_settings()).get(mode, SilenceRule())
+
+    def decide(
+        self,
+        user_input: str,
+        mode: str = "ask",
+        settings: Optional[Settings] = None,
+        session: str = "default",
+    ) -> Optional[str]:
+        rule = self.rule(mode, settings)
+        reason = self._reason(rule, user_input, mode, session)
+        with self._lock:
+            if reason:
+                self.avoided[(mode, reason)] += 1
+            else:
+                self.passed[mode] += 1
+        return reason
+
+    def stats(self) -> dict:
+        """Сколько ходов обошлось без модели (по режимам и причинам)."""
+        with self._lock:
+            avoided = sum(self.avoided.values())
+            passed = sum(self.passed.values())
+            return {
+                "avoided": avoided,
+                "passed": passed,
+                "avoided_ratio": avoided / (avoided + passed) if avoided + passed else 0.0,
+                "by_reason": {f"{mode}:{reason}": n for (mode, reason), n in self.avoided.items()},
+            }
+
+    def drop_session(self, session: str) -> None:
+        """Забывает последние реплики сессии (для проверки повторов)."""
+        with self._lock:
+            for key in [key for key in self._last if key[0] == session]:
+                del self._last[key]
+
+    def _reason(self, rule: SilenceRule, user_input: str, mode: str, session: str) -> Optional[str]:
+        if rule.always:
+            return "mode"
+
+        text = " ".join(user_input.lower().split())
+        if not text:
+            return "empty" if rule.empty else None
+        if rule.punctuation and _NO_WORDS.match(text):
+            return "punctuation"
+
+        if rule.repeat_window > 0:
+            now = time.monotonic()
+            key = (session, mode)
+            with self._lock:
+                previous = self._last.get(key)
+                self._last[key] = (text, now)
+            if previous and previous[0] == text and now - previous[1] <= rule.repeat_window:
+                return "repeat"
+
+        if rule.probability > 0 and get_rng().random() < rule.probability:
+            return "random"
+        return None
+
+
+_policy = SilencePolicy()
+
+
+def get_policy() -> SilencePolicy:
+    """Общая на весь процесс политика молчания."""
+    return _policy
+
+
+def should_be_silent(
+    user_input: str,
+    mode: str = "ask",
+    settings: Optional[Settings] = None,
+    session: str = "default",
+) -> bool:
+    """Промолчать ли на ввод - то же решение, что get_policy().decide()."""
+    return get_policy().decide(user_input, mode, settings, session) is not None
+
+
+def should_void_speak(settings: Optional[Settings] = None) -> bool:
+    """Заговорит ли void сам, без ввода - по правилу режима void из политики."""
+    return get_rng().random() >= get_policy().rule("void", settings).probability
@@ -0,0 +1,177 @@
+# быстрый старт: проверка готовности Ollama и предзагрузка модели
+import http.client
+import json
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from src.settings import get_settings
+
+# Кэш ответа /api/tags: список моделей нужен при старте несколько раз
+_tags: Optional[List[str]] = None
+
+
+def wait_ready(
+    deadline: Optional[float] = None,
+    first_interval: float = 0.05,
+    max_interval: float = 1.0,
+    on_wait=None,
+) -> bool:
+    """Ждет, пока Ollama ответит на /api/tags.
+
+    Интервал между попытками растет от first_interval до max_interval,
+    поэтому уже запущенный сервер находится за миллисекунды, а медленный
+    старт не заваливается запросами. on_wait(elapsed) вызывается перед
+    каждой паузой (для сообщения пользователю).
+    """
+    if deadline is None:
+        deadline = get_settings().ollama_startup_timeout
+    started = time.monotonic()
+    interval = first_interval
+    while True:
+        if list_models(refresh=True) is not None:
+            return True
+        elapsed = time.monotonic() - started
+        if elapsed + interval > deadline:
+            return False
+        if on_wait is not None:
+            on_wait(elapsed)
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+
+
+def list_models(refresh: bool = False) -> Optional[List[str]]:
+    """Имена моделей на серверах пула или None, если не отвечает ни один.
+
+    Опрашиваются те же адреса, что получают генерацию (OLLAMA_API_URLS
+    или OLLAMA_API_URL); модели ответивших серверов объединяются.
+    Запрос идет через http.client: requests при старте еще не импортирован
+    (его загружает фоновый поток ModelPreloader).
+    """
+    global _tags
+    if _tags is not None and not refresh:
+        return _tags
+    names = None
+    for url in get_settings().ollama_endpoints:
+        models = _server_models(url)
+        if models is None:
+            continue
+        names = names or []
+        names.extend(model for model in models if model not in names)
+    if names is not None:
+        _tags = names
+    return names
+
+
+def _server_models(base_url: str) -> Optional[List[str]]:
+    parts = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(parts.hostname or 'localhost', parts.port, timeout=1)
+    try:
+        connection.request('GET', f"{parts.path}/api/tags")
+        response = connection.getresponse()
+        if response.status != 200:
+            return None
+        return [model['name'] for model in json.loads(response.read()).get('models', [])]
+    except Exception:
+        return None
+    finally:
+        connection.close()
+
+
+class ModelPreloader:
+    """Загружает модель в память в фоне, пока пользователь вводит имя.
+
+    Пустой промпт в /api/generate заставляет Ollama только загрузить
+    модель (0 токенов генерации), а keep_alive удерживает ее в памяти,
+    так что первый настоящий ход не платит за загрузку. Запрос уходит
+    на каждый исправный сервер пула (src/ai/endpoints.py) параллельно:
+    ход может попасть на любой из них.
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model or get_settings().model
+        self.loaded = threading.Event()
+        self.error: Optional[str] = None
+        self.load_time: Optional[float] = None
+        self._finished = False
+        self._announce = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "ModelPreloader":
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self._thread.join(timeout)
+        return self.loaded.is_set()
+
+    def report(self) -> None:
+        """Сообщает о состоянии модели; если загрузка еще идет - сообщит по завершении."""
+        with self._lock:
+            finished = self._finished
+            self._announce = not finished
+        if finished:
+            self._print()
+        else:
+            print(f"[system] Модель {self.model} загружается в память...")
+
+    def _run(self) -> None:
+        started = time.monotonic()
+        errors = []
+        try:
+            # Заодно прогреваем импорт HTTP-клиента и конвейера ответа
+            from src.ai.endpoints import get_pool
+            import src.ai.responder  # noqa: F401
+
+            now = time.monotonic()
+            endpoints = [endpoint for endpoint in get_pool().endpoints if endpoint.available(now)]
+            threads = [
+                threading.Thread(target=self._preload, args=(endpoint, started, errors), daemon=True)
+                for endpoint in endpoints
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if not endpoints:
+                errors.append("нет исправных серверов")
+        except Exception as e:
+            errors.append(str(e))
+        if errors:
+            self.error = "; ".join(errors)
+        with self._lock:
+            self._finished = True
+            announce = self._announce
+        if announce:
+            self._print()
+
+    def _preload(self, endpoint, started: float, errors: list) -> None:
+        try:
+            response = endpoint.client.post(
+                "/api/generate",
+                {'model': self.model, 'stream': False},
+                timeout=get_settings().ollama_preload_timeout,
+            )
+            response.close()
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+        except Exception as e:
+            with self._lock:
+                errors.append(f"{endpoint.url}: {e}")
+            return
+        with self._lock:
+            # Время до первого сервера с моделью в памяти
+            if self.load_time is None:
+                self.load_time = time.monotonic() - started
+        self.loaded.set()
+
+    def _print(self) -> None:
+        if self.loaded.is_set():
+            print(f"[system] Модель {self.model} в памяти ({self.load_time:.1f} с).")
+            if self.error:
+                print(f"[system] Не на всех серверах: {self.error}")
+        else:
+            print(f"[system] Не удалось загрузить модель {self.model}: {self.error}")
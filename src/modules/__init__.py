@@ -15,7 +15,11 @@ from .silence import silence
 from .void import void
 from .psycholog import psycholog
 
+# Имена режимов: имя модуля = имя функции режима
+MODES = ("ask", "distort", "void", "silence", "psycholog")
+
 __all__ = [
+    "MODES",
     "ask",
     "distort",
     "void",
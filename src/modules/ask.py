@@ -1,8 +1,14 @@
 # режим диалога
 
-from typing import Optional
+from typing import Callable, Optional
+from src.ai.client import CancelScope
 from src.ai.responder import respond 
 
-def ask (user_input: str) -> Optional[str]:
+def ask(
+    user_input: str,
+    on_token: Optional[Callable[[str], None]] = None,
+    cancel: Optional[CancelScope] = None,
+    session: str = "default",
+) -> Optional[str]:
     
-    return respond(user_input, mode = "ask")
+    return respond(user_input, mode = "ask", on_token = on_token, cancel = cancel, session = session)
@@ -1,7 +1,10 @@
 # режим искажения
-import random
-from typing import Optional
+from typing import Callable, Optional
+from src.ai.client import CancelScope
+from src.ai.ngram import get_distorter
 from src.ai.responder import respond
+from src.settings import get_settings
+from src.utils.randomness import get_rng
 from src.utils.text import (
     fragment_sentence,
     extract_random_word,
@@ -10,7 +13,12 @@ from src.utils.text import (
 )
 
     
-def distort(user_input: str) -> Optional[str]:
+def distort(
+    user_input: str,
+    on_token: Optional[Callable[[str], None]] = None,
+    cancel: Optional[CancelScope] = None,
+    session: str = "default",
+) -> Optional[str]:
 
     distorted = fragment_sentence(user_input)
     if len(distorted) > 10:
@@ -19,8 +27,27 @@ def distort(user_input: str) -> Optional[str]:
         distorted = truncate_mid_sentence(distorted)
     
     # Добавляем немного рандомности
-    if len(distorted) > 5 and random.random() < 0.3:
+    if len(distorted) > 5 and get_rng().random() < 0.3:
         distorted = extract_random_word(distorted)
     
-    return respond(distorted, mode="distort") if distorted else None
+    if not distorted:
+        return None
+
+    # Локальная n-граммная модель: основной движок (local) или замена недоступной модели (fallback)
+    settings = get_settings()
+    fallback = None
+    if settings.distort_engine != "llm":
+        # Модель строится при первом обращении к ней, а не на каждом ходе с ответом LLM
+        def fallback(text: str) -> str:
+            return get_distorter(settings).generate(text, settings.distort_max_words)
+
+    return respond(
+        distorted,
+        mode="distort",
+        on_token=on_token,
+        cancel=cancel,
+        session=session,
+        fallback=fallback,
+        local=settings.distort_engine == "local",
+    )
 
@@ -1,6 +1,12 @@
-from typing import Optional
+from typing import Callable, Optional
+from src.ai.client import CancelScope
 from src.ai.responder import respond
 
-def psycholog(user_input: str) -> Optional[str]:
+def psycholog(
+    user_input: str,
+    on_token: Optional[Callable[[str], None]] = None,
+    cancel: Optional[CancelScope] = None,
+    session: str = "default",
+) -> Optional[str]:
 
-    return respond(user_input, mode = "psycholog")
\ No newline at end of file
+    return respond(user_input, mode = "psycholog", on_token = on_token, cancel = cancel, session = session)
\ No newline at end of file
@@ -1,8 +1,15 @@
 # режим молчания
 
-from typing import Optional
+from typing import Callable, Optional
 
+from src.ai.client import CancelScope
 
-def silence(user_input: str = "") -> Optional[str]:
+
+def silence(
+    user_input: str = "",
+    on_token: Optional[Callable[[str], None]] = None,
+    cancel: Optional[CancelScope] = None,
+    session: str = "default",
+) -> Optional[str]:
 
     return None
@@ -1,14 +1,16 @@
 # пассивный режим
-from typing import Optional
-import time 
-import threading
+from typing import Callable, Optional
 
+from src.ai.client import CancelScope
 from src.ai.responder import respond
-from src.ai.filters import should_void_speak
 
-def void(user_input: str = "") -> Optional[str]:
+def void(
+    user_input: str = "",
+    on_token: Optional[Callable[[str], None]] = None,
+    cancel: Optional[CancelScope] = None,
+    session: str = "default",
+) -> Optional[str]:
     
-    if user_input and should_void_speak():
-        return respond(user_input, mode = "void")
-    return None
+    # Редкие реплики решает политика молчания (VOID_SPEAK_PROBABILITY) до запроса к модели
+    return respond(user_input, mode = "void", on_token = on_token, cancel = cancel, session = session)
 
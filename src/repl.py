@@ -0,0 +1,301 @@
+# терминальный диалог Star_Void (REPL на asyncio)
+"""
+Все, что нужно после ввода имени: цикл ввода, анимация ожидания,
+отменяемые ходы. Модуль импортируется лениво из main(), поэтому
+asyncio, HTTP-клиент и режимы не замедляют первый экран.
+"""
+
+import asyncio
+import importlib
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from src.ai.metrics import get_metrics
+from src.settings import get_settings
+from src.utils.delay import LatencyHider, delay_seconds
+from src.utils.render import Renderer
+from src.utils.transcript import get_transcript
+
+
+def print_help():
+    print("""
+            /ask       - диалог (краткие ответы, вопросы, дистанция)
+            /distort   - искажение (фрагментация, растворение смысла)
+            /void      - пустота (пассивное присутствие, молчание)
+            /silence   - молчание (полный отказ от ответов)
+            
+            /psycholog - слушатель, может вести диалог
+
+            /stop     - прервать текущий ответ (или Ctrl+C)
+            /stats    - задержки и счетчики модели
+            /history <слова> - поиск по журналу диалогов
+            /quit     - выход из программы
+        """)
+
+def print_stats():
+    from src.ai.cache import get_cache
+    from src.ai.silence import get_policy
+
+    print(get_metrics().report())
+    silence = get_policy().stats()
+    print(f"\nмолчание: {silence['avoided']} ходов без модели ({silence['avoided_ratio']:.0%})")
+    cache = get_cache()
+    if cache is not None:
+        stats = cache.stats()
+        print(f"кэш: {stats['memory_hits'] + stats['disk_hits']} попаданий ({stats['hit_ratio']:.0%})")
+    from src.ai.semantic import get_semantic_cache
+    semantic = get_semantic_cache()
+    if semantic is not None:
+        stats = semantic.stats()
+        print(f"семантический кэш: {stats['hits']} попаданий ({stats['hit_ratio']:.0%}), записей {stats['entries']}")
+    from src.ai.scheduler import get_scheduler
+    scheduler = get_scheduler().stats()
+    if scheduler["shed"]:
+        print(f"перегрузка: {scheduler['shed']} ходов ответили молчанием ({scheduler['shed_ratio']:.0%})")
+    if len(get_settings().ollama_endpoints) > 1:
+        from src.ai.endpoints import get_pool
+        print("серверы Ollama:")
+        print(get_pool().report())
+
+# Сколько /history ждет, пока писатель журнала допишет очередь
+HISTORY_FLUSH_TIMEOUT = 2.0
+
+async def print_history(query: str):
+    transcript = get_transcript()
+    if transcript is None:
+        print("Журнал выключен (ENABLE_LOGGING=false).")
+        return
+    if not query:
+        print("Использование: /history <слова>")
+        return
+    # Ожидание писателя и поиск - блокирующий ввод-вывод, цикл событий их не ждет
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, transcript.flush, HISTORY_FLUSH_TIMEOUT):
+        print("[system] Журнал еще не записан - последние реплики могут не найтись.")
+    entries = await loop.run_in_executor(None, transcript.search, query)
+    if not entries:
+        print("Ничего не найдено.")
+        return
+    for entry in reversed(entries):
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["ts"]))
+        print(f"{when} [{entry['mode']}] {entry['role']}: {entry['text']}")
+
+# Ctrl+C в очереди ввода (когда нет генерации, которую можно прервать)
+_INTERRUPT = object()
+
+def _start_input_reader(loop: asyncio.AbstractEventLoop, lines: asyncio.Queue) -> None:
+    """Читает stdin в фоновом потоке, чтобы /stop можно было ввести во время ответа."""
+
+    def read():
+        while True:
+            try:
+                line = input()
+            except EOFError:
+                line = None
+            try:
+                loop.call_soon_threadsafe(lines.put_nowait, line)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                return
+            if line is None:
+                return
+
+    threading.Thread(target=read, daemon=True).start()
+
+def _mode_func(mode: str):
+    """Функция режима; модуль режима импортируется при первом обращении."""
+    try:
+        module = importlib.import_module(f"src.modules.{mode}")
+    except ImportError:
+        return None
+    return getattr(module, mode, None)
+
+class Repl:
+    """Терминальный диалог на asyncio.
+
+    Запрос к модели и вывод ответа (Renderer, вместе с анимацией
+    ожидания) - задачи одного цикла событий. Ctrl+C или /stop во время ответа отменяют ход и закрывают
+    HTTP-поток, так что Ollama перестает генерировать брошенный ответ.
+    """
+
+    def __init__(self, username: str):
+        self.username = username
+        # Сессия для журнала: один запуск программы
+        self.session = f"{username}-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.mode = 'psycholog'
+        self.modes = ("ask", "distort", "void", "silence", "psycholog")
+        self.renderer: Optional[Renderer] = None
+        self._lines: Optional[asyncio.Queue] = None
+        self._turn: Optional[asyncio.Task] = None
+        self._pending = deque()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._lines = asyncio.Queue()
+        self.renderer = Renderer()
+        self.renderer.start()
+        _start_input_reader(loop, self._lines)
+
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._on_sigint)
+            sigint_handled = True
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C по-прежнему завершает программу
+            sigint_handled = False
+
+        try:
+            await self._loop()
+        finally:
+            await self.renderer.close()
+            if sigint_handled:
+                loop.remove_signal_handler(signal.SIGINT)
+
+    def _on_sigint(self) -> None:
+        if self._turn is not None and not self._turn.done():
+            self._turn.cancel()
+        else:
+            self._lines.put_nowait(_INTERRUPT)
+
+    async def _loop(self) -> None:
+        while True:
+            if self._pending:
+                line = self._pending.popleft()
+            else:
+                sys.stdout.write(f"[{self.username}] > ")
+                sys.stdout.flush()
+                line = await self._lines.get()
+
+            if line is _INTERRUPT:
+                print("\n\nПрограмма завершена.")
+                break
+            if line is None:
+                print()
+                break
+
+            user_input = line.strip()
+
+            # Обработка команд
+            if user_input.startswith("/"):
+                if await self._command(user_input[1:].lower()):
+                    break
+                continue
+
+            mode_func = _mode_func(self.mode)
+            if mode_func:
+                self._turn = asyncio.create_task(self._respond(self.mode, mode_func, user_input))
+                await self._wait_turn()
+
+    async def _command(self, command: str) -> bool:
+        """Выполняет команду; True - выйти из программы."""
+        if command in ['exit', 'quit']:
+            print("\nДо встречи в пустоте...")
+            return True
+
+        elif command in self.modes:
+            self.mode = command
+            print(f"Режим изменен на {self.mode}")
+
+        elif command == "help":
+            print_help()
+
+        elif command == "stop":
+            print("Сейчас нечего останавливать.")
+
+        elif command == "stats":
+            print_stats()
+
+        elif command == "history" or command.startswith("history "):
+            await print_history(command[len("history"):].strip())
+
+        else:
+            print(f"Команда '{command}' не распознана. Введите /help для помощи.")
+        return False
+
+    async def _wait_turn(self) -> None:
+        """Ждет конца хода, принимая ввод: /stop отменяет ход, остальное - в очередь."""
+        turn = self._turn
+        while not turn.done():
+            getter = asyncio.create_task(self._lines.get())
+            done, _ = await asyncio.wait({turn, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                continue
+            typed = getter.result()
+            if isinstance(typed, str) and typed.strip().lower() == "/stop":
+                turn.cancel()
+            else:
+                self._pending.append(typed)
+
+        self._turn = None
+        if turn.cancelled():
+            return
+        error = turn.exception()
+        if error is not None:
+            print(f"\nПроизошла ошибка: {error}")
+
+    async def _respond(self, mode: str, mode_func, user_input: str) -> None:
+        from src.ai.responder import run_cancellable
+
+        settings = get_settings()
+        metrics = get_metrics()
+        model = settings.model
+        started = time.perf_counter()
+        renderer = self.renderer
+        streamed = []
+
+        def on_token(chunk: str) -> None:
+            # Первый видимый кусок ответа: убираем анимацию и печатаем префикс
+            if not streamed:
+                renderer.spinner(False)
+                renderer.write(f"[{mode}] > ")
+            streamed.append(chunk)
+            renderer.type(chunk)
+
+        # Модель начинает работать сразу, пауза лишь откладывает показ ответа
+        hider = LatencyHider(delay_seconds(), on_token)
+        stream_enabled = settings.ollama_stream
+        generation = asyncio.create_task(run_cancellable(
+            mode_func, user_input, on_token=hider.push if stream_enabled else None, session=self.session
+        ))
+
+        try:
+            with metrics.span("pause", mode, model):
+                await hider.reveal()
+            if not generation.done() and not streamed:
+                renderer.spinner(True)
+            try:
+                # Ожидание сверх паузы - задержка, которую видно
+                with metrics.span("wait", mode, model):
+                    response = await generation
+            finally:
+                renderer.spinner(False)
+
+            with metrics.span("render", mode, model):
+                if not streamed:
+                    if response:
+                        on_token(response)
+                    elif mode != "silence":
+                        on_token("...")
+                if streamed:
+                    renderer.write("\n")
+                await renderer.drain()
+            metrics.observe("turn", time.perf_counter() - started, mode, model)
+            transcript = get_transcript(settings)
+            if transcript is not None:
+                transcript.log(self.session, mode, "user", user_input)
+                transcript.log(self.session, mode, "assistant", response or "", getattr(response, "source", None))
+            metrics.dump_if_due(settings)
+        except asyncio.CancelledError:
+            metrics.count("cancelled", mode, model)
+            hider.cancel()
+            generation.cancel()
+            renderer.clear()
+            await renderer.drain()
+            if streamed:
+                print()
+            print("[system] Ответ остановлен.")
+            raise
@@ -0,0 +1,253 @@
+# пакетный прогон: файл реплик через режимы без терминала
+"""
+Прогоняет файл реплик через режимы из src/modules на пуле потоков и
+пишет результат каждого хода строкой JSON по мере готовности. Нужен
+для замеров пропускной способности и для регрессионных прогонов после
+правки промптов или фильтров.
+
+Вход - JSONL или простой текст (строка - реплика):
+    {"text": "мне пусто", "session": "anna", "mode": "ask"}
+session и mode необязательны. Реплики одной сессии идут по порядку
+в одном потоке (у режимов из HISTORY_MODES общая история), разные
+сессии - параллельно. Строка без session - отдельная сессия.
+
+Случайность (обрезка в distort, молчание, кэш) берется из генератора
+сессии, засеянного --seed и именем сессии (src/utils/randomness.py),
+поэтому повторный прогон с тем же seed принимает те же решения.
+Молчание на повтор (SILENCE_REPEAT_WINDOW_SEC) зависит от часов,
+а не от seed, поэтому в прогоне выключено.
+Кэш ответов выключен, а планировщик не сбрасывает ходы в молчание
+(--shed возвращает обычное поведение сервера).
+
+Выход - по строке на ход:
+    {"index": 0, "session": "...", "mode": "ask", "input": "...",
+     "output": "..." | null, "ms": 812.4, "first_token_ms": 190.2}
+
+Запуск:
+    python -m src.replay inputs.jsonl [--modes ask,distort] [--concurrency 4]
+        [--seed 0] [--output results.jsonl] [--cache] [--shed]
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, TextIO
+
+import src.modules
+from src.ai.conversation import drop_session
+from src.ai.metrics import get_metrics
+from src.ai.silence import get_policy
+from src.settings import get_settings, set_settings
+from src.utils.randomness import seeded
+
+
+@dataclasses.dataclass(frozen=True)
+class ReplayItem:
+    """Одна реплика входного файла."""
+
+    index: int
+    text: str
+    session: str
+    mode: Optional[str] = None
+
+
+def read_inputs(lines) -> List[ReplayItem]:
+    """Реплики из строк JSONL или простого текста; пустые строки пропускаются.
+
+    Неизвестный mode - ValueError с номером строки: ошибку во входе
+    видно до прогона, а не по упавшей на середине сессии.
+    """
+    items = []
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        index = len(items)
+        data = None
+        if line.startswith("{"):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                data = None
+        if isinstance(data, dict):
+            text = str(data.get("text", data.get("input", "")))
+            session = str(data.get("session") or f"line-{index}")
+            mode = data.get("mode") or None
+            if mode is not None and mode not in src.modules.MODES:
+                raise ValueError(f"строка {lineno}: неизвестный режим {mode!r}")
+            items.append(ReplayItem(index, text, session, mode))
+        else:
+            items.append(ReplayItem(index, line, f"line-{index}"))
+    return items
+
+
+class ResultWriter:
+    """Потокобезопасная запись результатов строкой JSON."""
+
+    def __init__(self, output: TextIO):
+        self.output = output
+        self._lock = threading.Lock()
+
+    def write(self, result: dict) -> None:
+        line = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+
+def run_session(
+    items: List[ReplayItem],
+    mode: str,
+    seed: Optional[int],
+    writer: ResultWriter,
+    timings: Dict[str, list],
+) -> None:
+    """Ходы одной сессии в одном режиме по порядку, со своим генератором."""
+    settings = get_settings()
+    metrics = get_metrics()
+    if mode not in src.modules.MODES:
+        # Ходы сессии записываются с ошибкой, остальные сессии идут дальше
+        for item in items:
+            writer.write({
+                "index": item.index,
+                "session": item.session,
+                "mode": mode,
+                "input": item.text,
+                "output": None,
+                "error": f"неизвестный режим {mode!r}",
+            })
+        return
+    mode_func = getattr(src.modules, mode)
+    # Своя история на каждый режим: прогон режимов не смешивает диалоги
+    session = f"replay:{items[0].session}:{mode}"
+    with seeded(seed, session):
+        for item in items:
+            first = []
+            started = time.perf_counter()
+
+            def on_token(chunk: str) -> None:
+                if not first:
+                    first.append(time.perf_counter() - started)
+
+            try:
+                output = mode_func(item.text, on_token=on_token if settings.ollama_stream else None, session=session)
+                error = None
+            except Exception as e:
+                output, error = None, str(e)
+            elapsed = time.perf_counter() - started
+            metrics.observe("turn", elapsed, mode, settings.model)
+            timings[mode].append(elapsed)
+            result = {
+                "index": item.index,
+                "session": item.session,
+                "mode": mode,
+                "input": item.text,
+                "output": output,
+                "ms": round(elapsed * 1000, 1),
+                "first_token_ms": round(first[0] * 1000, 1) if first else None,
+            }
+            if error is not None:
+                result["error"] = error
+            writer.write(result)
+    drop_session(session)
+    get_policy().drop_session(session)
+
+
+def replay(
+    items: List[ReplayItem],
+    modes: List[str],
+    output: TextIO,
+    concurrency: int = 4,
+    seed: Optional[int] = 0,
+) -> Dict[str, list]:
+    """Прогоняет реплики; возвращает длительности ходов по режимам."""
+    sessions: Dict[tuple, List[ReplayItem]] = OrderedDict()
+    for item in items:
+        for mode in ([item.mode] if item.mode else modes):
+            sessions.setdefault((item.session, mode), []).append(item)
+
+    writer = ResultWriter(output)
+    timings: Dict[str, list] = defaultdict(list)
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="replay") as pool:
+        futures = [
+            pool.submit(run_session, session_items, mode, seed, writer, timings)
+            for (_, mode), session_items in sessions.items()
+        ]
+        for future in futures:
+            future.result()
+    return timings
+
+
+def _quantile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Star_Void: пакетный прогон реплик")
+    parser.add_argument("input", help="JSONL или текст (строка - реплика); - для stdin")
+    parser.add_argument("--modes", default="ask", help="режимы через запятую или all")
+    parser.add_argument("--concurrency", type=int, default=4, help="сессий одновременно")
+    parser.add_argument("--seed", type=int, default=0, help="seed генераторов сессий")
+    parser.add_argument("--output", default="-", help="файл результатов JSONL (по умолчанию stdout)")
+    parser.add_argument("--cache", action="store_true", help="не выключать кэш ответов")
+    parser.add_argument("--shed", action="store_true", help="планировщик сбрасывает лишние ходы, как в сервере")
+    args = parser.parse_args()
+
+    modes = list(src.modules.MODES) if args.modes == "all" else [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [mode for mode in modes if mode not in src.modules.MODES]
+    if unknown or args.concurrency < 1:
+        parser.error(f"неизвестные режимы: {', '.join(unknown)}" if unknown else "--concurrency должен быть >= 1")
+
+    settings = get_settings()
+    # Окно повторов считается по часам: с ним молчание зависело бы от скорости прогона, а не от seed
+    overrides = {"silence_repeat_window_sec": 0.0}
+    if not args.cache:
+        overrides["response_cache"] = False
+    if not args.shed:
+        # Ход ждет слот сколько нужно: прогон не должен зависеть от нагрузки
+        overrides.update(
+            scheduler_queue_size=max(settings.scheduler_queue_size, args.concurrency),
+            scheduler_wait_budgets=(),
+            scheduler_wait_budget_sec=settings.ollama_turn_deadline_sec * max(1, args.concurrency),
+        )
+    set_settings(dataclasses.replace(settings, **overrides))
+
+    try:
+        if args.input == "-":
+            items = read_inputs(sys.stdin)
+        else:
+            with open(args.input, encoding="utf-8") as f:
+                items = read_inputs(f)
+    except ValueError as e:
+        parser.error(f"{args.input}: {e}")
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        timings = replay(items, modes, output, args.concurrency, args.seed)
+    except KeyboardInterrupt:
+        print("\n[system] Прогон прерван.", file=sys.stderr)
+        return
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - started
+
+    # Сводка в stderr: stdout может быть файлом результатов
+    turns = sum(len(values) for values in timings.values())
+    print(f"[system] {turns} ходов за {elapsed:.2f} с ({turns / elapsed if elapsed else 0:.1f} ходов/с)", file=sys.stderr)
+    for mode, values in timings.items():
+        print(
+            f"  {mode:10s} p50 {_quantile(values, 0.5) * 1000:8.1f} мс  p95 {_quantile(values, 0.95) * 1000:8.1f} мс",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
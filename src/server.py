@@ -0,0 +1,255 @@
+# headless-сервер: много сессий в одном процессе
+"""
+Сервер без терминала: asyncio поверх TCP (SERVER_HOST:SERVER_PORT)
+или Unix-сокета (SERVER_SOCKET). Каждое соединение - отдельная сессия
+со своим режимом, именем и историей диалога (для HISTORY_MODES).
+
+Протокол - JSON по строке в каждую сторону.
+
+Клиент:
+    {"type": "hello", "name": "anna", "mode": "ask"}   имя и режим (необязательно)
+    {"type": "mode", "mode": "distort"}                 смена режима
+    {"type": "message", "text": "..."}                 реплика
+    {"type": "stop"}                                    прервать текущий ответ
+    {"type": "reset"}                                   забыть историю сессии
+
+Сервер:
+    {"type": "ready", "session": "...", "mode": "...", "modes": [...]}
+    {"type": "token", "text": "..."}                    видимый текст по мере генерации
+    {"type": "done", "text": "..." | null, "ms": 123.4} конец хода (null - молчание)
+    {"type": "stopped"}                                 ход прерван
+    {"type": "mode", "mode": "..."}
+    {"type": "error", "error": "..."}
+
+Пауз и анимации нет: это забота клиента. Обращения к модели идут
+через планировщик (src/ai/scheduler.py): лишние ходы ждут в очереди
+по приоритету режима, а при перегрузке отвечают молчанием.
+
+Запуск:
+    python -m src.server [--host 127.0.0.1] [--port 8765] [--socket /tmp/star_void.sock]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import src.modules
+from src.ai.conversation import drop_session
+from src.ai.metrics import get_metrics
+from src.ai.responder import run_cancellable
+from src.ai.scheduler import backend_count
+from src.ai.silence import get_policy
+from src.settings import Settings, get_settings, install_reload_handlers
+from src.utils.transcript import get_transcript
+
+# Самая длинная строка протокола (байт)
+LINE_LIMIT = 64 * 1024
+
+_ids = itertools.count(1)
+
+
+class Session:
+    """Состояние одного соединения."""
+
+    def __init__(self, writer: asyncio.StreamWriter, mode: str = "psycholog"):
+        self.id = f"s{next(_ids)}-{int(time.time())}"
+        self.name = "anon"
+        self.mode = mode
+        self.writer = writer
+        self.turn: Optional[asyncio.Task] = None
+
+    def send(self, payload: dict) -> None:
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class Server:
+    """Сервер сессий Star_Void."""
+
+    def __init__(self, settings: Optional[Settings] = None):
+        settings = settings or get_settings()
+        # Потоки на все слоты планировщика и всю его очередь: ждущий ход держит поток
+        self.workers = settings.scheduler_concurrency * backend_count(settings) + settings.scheduler_queue_size
+        self.sessions = {}
+        self.turns = 0
+        self._handlers = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        socket_path: Optional[str] = None,
+    ) -> "Server":
+        settings = get_settings()
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(self.workers, thread_name_prefix="turn")
+        )
+        socket_path = socket_path if socket_path is not None else settings.server_socket
+        if socket_path:
+            self._server = await asyncio.start_unix_server(self._handle, socket_path, limit=LINE_LIMIT)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle,
+                host or settings.server_host,
+                settings.server_port if port is None else port,
+                limit=LINE_LIMIT,
+            )
+        return self
+
+    @property
+    def address(self):
+        """Адрес прослушивания: (host, port) или путь Unix-сокета."""
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Останавливает прием, прерывает ответы и ждет закрытия всех сессий."""
+        self._server.close()
+        for session in list(self.sessions.values()):
+            if session.turn is not None:
+                session.turn.cancel()
+            session.writer.close()
+        if self._handlers:
+            await asyncio.wait(self._handlers)
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = Session(writer)
+        self.sessions[session.id] = session
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        session.send({"type": "ready", "session": session.id, "mode": session.mode, "modes": list(src.modules.MODES)})
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    session.send({"type": "error", "error": "слишком длинная строка"})
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    session.send({"type": "error", "error": "ожидается JSON"})
+                    continue
+                if isinstance(request, dict):
+                    self._dispatch(session, request)
+                else:
+                    session.send({"type": "error", "error": "ожидается объект JSON"})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if session.turn is not None:
+                session.turn.cancel()
+            del self.sessions[session.id]
+            self._handlers.discard(handler)
+            drop_session(session.id)
+            get_policy().drop_session(session.id)
+            writer.close()
+
+    def _dispatch(self, session: Session, request: dict) -> None:
+        kind = request.get("type")
+        if kind == "hello":
+            session.name = str(request.get("name") or session.name)
+            if "mode" in request:
+                self._set_mode(session, request["mode"])
+        elif kind == "mode":
+            self._set_mode(session, request.get("mode"))
+        elif kind == "message":
+            if session.turn is not None and not session.turn.done():
+                session.send({"type": "error", "error": "предыдущий ответ еще не закончен"})
+                return
+            text = str(request.get("text") or "").strip()
+            session.turn = asyncio.create_task(self._respond(session, session.mode, text))
+        elif kind == "stop":
+            if session.turn is not None and not session.turn.done():
+                session.turn.cancel()
+        elif kind == "reset":
+            drop_session(session.id)
+            get_policy().drop_session(session.id)
+        else:
+            session.send({"type": "error", "error": f"неизвестный тип: {kind}"})
+
+    def _set_mode(self, session: Session, mode) -> None:
+        if mode in src.modules.MODES:
+            session.mode = mode
+            session.send({"type": "mode", "mode": mode})
+        else:
+            session.send({"type": "error", "error": f"неизвестный режим: {mode}"})
+
+    async def _respond(self, session: Session, mode: str, user_input: str) -> None:
+        settings = get_settings()
+        metrics = get_metrics()
+        started = time.perf_counter()
+        mode_func = getattr(src.modules, mode)
+
+        def on_token(chunk: str) -> None:
+            session.send({"type": "token", "text": chunk})
+
+        try:
+            response = await run_cancellable(
+                mode_func,
+                user_input,
+                on_token=on_token if settings.ollama_stream else None,
+                session=session.id,
+            )
+        except asyncio.CancelledError:
+            metrics.count("cancelled", mode, settings.model)
+            session.send({"type": "stopped"})
+            return
+        except Exception as e:
+            session.send({"type": "error", "error": str(e)})
+            return
+
+        elapsed = time.perf_counter() - started
+        self.turns += 1
+        metrics.observe("turn", elapsed, mode, settings.model)
+        session.send({"type": "done", "text": response, "ms": round(elapsed * 1000, 1)})
+        transcript = get_transcript(settings)
+        if transcript is not None:
+            transcript.log(session.id, mode, "user", user_input)
+            transcript.log(session.id, mode, "assistant", response or "", getattr(response, "source", None))
+        metrics.dump_if_due(settings)
+
+
+async def serve(host: Optional[str] = None, port: Optional[int] = None, socket_path: Optional[str] = None) -> None:
+    server = await Server().start(host, port, socket_path)
+    address = server.address
+    where = address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+    print(f"[system] Star_Void слушает {where}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Star_Void: сервер сессий")
+    parser.add_argument("--host", help="адрес (по умолчанию SERVER_HOST)")
+    parser.add_argument("--port", type=int, help="порт (по умолчанию SERVER_PORT)")
+    parser.add_argument("--socket", help="Unix-сокет вместо TCP (по умолчанию SERVER_SOCKET)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    install_reload_handlers()
+    if settings.enable_logging:
+        from src.utils.transcript import configure_logging
+        configure_logging(settings)
+    try:
+        asyncio.run(serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        print("\n[system] Сервер остановлен.")
+
+
+if __name__ == "__main__":
+    main()
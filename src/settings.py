@@ -0,0 +1,364 @@
+# настройки Star_Void (config/config.env)
+"""
+Единый снимок настроек.
+
+config/config.env читается один раз: значения приводятся к нужным типам
+и проверяются, результат - неизменяемый объект Settings. Горячий путь
+берет текущий снимок через get_settings() и дальше работает только с ним.
+Новый снимок подменяет старый целиком (SIGHUP или изменение файла),
+поэтому один ход никогда не видит смесь старых и новых значений.
+"""
+
+import os
+import signal
+import sys
+import threading
+import typing
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from dotenv import dotenv_values
+
+CONFIG_PATH = os.path.join('config', 'config.env')
+
+
+class SettingsError(ValueError):
+    """Некорректное значение в config.env."""
+
+
+def _probability(default: float) -> float:
+    return field(default=default, metadata={'min': 0.0, 'max': 1.0})
+
+
+def _positive(default):
+    return field(default=default, metadata={'min': 0})
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Все настройки config.env. Имя переменной - имя поля в верхнем регистре."""
+
+    # LLM API
+    llm_provider: str = 'local'
+    model_name: str = 'deepseek-r1:8b'
+    # Ключи не попадают в repr: снимок настроек печатается в логи и ошибки
+    openai_api_key: Optional[str] = field(default=None, repr=False)
+    anthropic_api_key: Optional[str] = field(default=None, repr=False)
+    openai_api_url: str = 'http://localhost:8080/v1'
+
+    # Ollama
+    ollama_api_url: str = 'http://localhost:11434/api/chat'
+    ollama_api_urls: Tuple[str, ...] = ()
+    ollama_timeout: float = _positive(30.0)
+    ollama_connect_timeout: float = _positive(3.0)
+    ollama_retry_attempts: int = _positive(3)
+    ollama_retry_delay: float = _positive(2.0)
+    ollama_retry_max_delay: float = _positive(8.0)
+    ollama_turn_deadline_sec: float = field(default=60.0, metadata={'min': 0.1})
+    ollama_stream: bool = True
+    ollama_keep_alive: str = '30m'
+    ollama_pool_size: int = field(default=4, metadata={'min': 1})
+    ollama_startup_timeout: float = _positive(15.0)
+    ollama_preload: bool = True
+    ollama_preload_timeout: float = _positive(300.0)
+    ollama_health_interval_sec: float = _positive(5.0)
+    ollama_breaker_failures: int = field(default=3, metadata={'min': 1})
+    ollama_breaker_cooldown_sec: float = _positive(30.0)
+
+    # Параметры LLM
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    # Списки "режим:значение" поверх общих MAX_TOKENS и MAX_RESPONSE_LENGTH
+    mode_max_tokens: Tuple[str, ...] = ('ask:160', 'distort:96', 'void:96')
+    think_modes: Tuple[str, ...] = ('psycholog',)
+    prompt_check_interval: float = _positive(2.0)
+
+    # Кэш ответов
+    response_cache: bool = True
+    response_cache_path: str = 'cache/responses.sqlite3'
+    response_cache_size: int = field(default=256, metadata={'min': 1})
+    response_cache_ttl_sec: float = _positive(86400.0)
+    response_cache_serve_probability: float = _probability(0.7)
+    # Семантический кэш: близкие по смыслу реплики (нужны NumPy и модель вложений)
+    semantic_cache: bool = False
+    semantic_cache_model: str = 'nomic-embed-text'
+    semantic_cache_threshold: float = _probability(0.92)
+    semantic_cache_size: int = field(default=512, metadata={'min': 1})
+    semantic_cache_dir: str = 'cache/semantic'
+    semantic_cache_timeout_sec: float = _positive(2.0)
+    semantic_cache_save_sec: float = _positive(30.0)
+
+    # История диалога
+    history_modes: Tuple[str, ...] = ('psycholog',)
+    history_max_messages: int = field(default=20, metadata={'min': 2})
+    history_token_budget: int = field(default=2048, metadata={'min': 1})
+
+    # Поведение
+    ellipsis_probability: float = _probability(0.15)
+    void_speak_probability: float = _probability(0.05)
+    allow_empty_output: bool = True
+    silence_repeat_window_sec: float = _positive(10.0)
+
+    # Фильтры
+    max_response_length: int = field(default=200, metadata={'min': 1})
+    mode_max_response_length: Tuple[str, ...] = ()
+    mode_max_sentences: Tuple[str, ...] = ('ask:2', 'distort:1', 'void:1')
+    enable_advice_filter: bool = True
+    enable_empathy_filter: bool = True
+    advice_filter_skip_modes: Tuple[str, ...] = ()
+    empathy_filter_skip_modes: Tuple[str, ...] = ('psycholog',)
+    extra_advice_indicators: Tuple[str, ...] = ()
+    extra_empathy_phrases: Tuple[str, ...] = ()
+
+    # Искажение
+    distort_empty_probability: float = _probability(0.2)
+    distort_fragment_probability: float = _probability(0.6)
+    # llm - только модель, local - только n-граммы, fallback - n-граммы, если модель недоступна
+    distort_engine: str = 'fallback'
+    # Промпт режима (config/ai/distort.txt) не годится: модель повторяла бы его инструкции
+    distort_corpus: Tuple[str, ...] = ('config/corpus/distort.txt',)
+    distort_corpus_transcripts: bool = True
+    distort_model_path: str = 'cache/distort.ngram'
+    distort_max_words: int = field(default=6, metadata={'min': 1})
+
+    # Задержки
+    min_delay_sec: float = _positive(0.5)
+    max_delay_sec: float = _positive(2.0)
+    typing_speed_cps: int = field(default=30, metadata={'min': 1})
+    render_fps: int = field(default=60, metadata={'min': 1})
+
+    # Планировщик запросов к модели
+    scheduler_concurrency: int = field(default=2, metadata={'min': 1})
+    scheduler_queue_size: int = field(default=32, metadata={'min': 0})
+    scheduler_priorities: Tuple[str, ...] = ('psycholog', 'ask', 'distort', 'void')
+    scheduler_wait_budgets: Tuple[str, ...] = ('psycholog:30', 'ask:10', 'distort:5', 'void:2')
+    scheduler_wait_budget_sec: float = _positive(10.0)
+
+    # Сервер сессий (python -m src.server)
+    server_host: str = '127.0.0.1'
+    server_port: int = field(default=8765, metadata={'min': 0})
+    server_socket: Optional[str] = None
+
+    # Метрики
+    metrics_file: Optional[str] = None
+    metrics_dump_interval_sec: float = _positive(10.0)
+
+    # Логирование
+    enable_logging: bool = False
+    log_file: str = 'logs/star_void.log'
+    log_level: str = 'INFO'
+    transcript_dir: str = 'logs/transcripts'
+    transcript_segment_kb: int = field(default=1024, metadata={'min': 1})
+    transcript_compress: bool = True
+    transcript_queue_size: int = field(default=1000, metadata={'min': 1})
+
+    # Дополнительно
+    use_thinking_animation: bool = True
+    void_min_wait_sec: float = _positive(300.0)
+    void_max_wait_sec: float = _positive(1200.0)
+
+    def __post_init__(self):
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if value is None:
+                continue
+            low = f.metadata.get('min')
+            high = f.metadata.get('max')
+            if low is not None and value < low:
+                raise SettingsError(f"{f.name.upper()}={value}: значение должно быть >= {low}")
+            if high is not None and value > high:
+                raise SettingsError(f"{f.name.upper()}={value}: значение должно быть <= {high}")
+        if self.min_delay_sec > self.max_delay_sec:
+            raise SettingsError("MIN_DELAY_SEC не может быть больше MAX_DELAY_SEC")
+        if self.distort_engine not in ('llm', 'local', 'fallback'):
+            raise SettingsError(f"DISTORT_ENGINE={self.distort_engine}: ожидается llm, local или fallback")
+        # Списки "режим:значение" разбираются один раз на снимок: *_for()
+        # вызываются на каждом ходе и только читают словари
+        tables = {}
+        for name, convert in (
+            ('scheduler_wait_budgets', float),
+            ('mode_max_tokens', int),
+            ('mode_max_response_length', int),
+            ('mode_max_sentences', int),
+        ):
+            items = getattr(self, name)
+            try:
+                values = _mode_values(items, convert)
+            except ValueError:
+                raise SettingsError(f"{name.upper()}={','.join(items)}: ожидается режим:значение") from None
+            if any(value < 0 for value in values.values()):
+                raise SettingsError(f"{name.upper()}={','.join(items)}: значения должны быть >= 0")
+            tables[name] = values
+        object.__setattr__(self, '_mode_tables', tables)
+
+    @property
+    def model(self) -> str:
+        """Имя модели для API ('default' означает модель по умолчанию)."""
+        return 'deepseek-r1:8b' if self.model_name == 'default' else self.model_name
+
+    @property
+    def wait_budgets(self) -> Dict[str, float]:
+        """SCHEDULER_WAIT_BUDGETS как словарь режим -> секунды."""
+        return dict(self._mode_tables['scheduler_wait_budgets'])
+
+    def max_tokens_for(self, mode: str) -> Optional[int]:
+        """Бюджет токенов режима (MODE_MAX_TOKENS, иначе MAX_TOKENS)."""
+        return self._mode_tables['mode_max_tokens'].get(mode, self.max_tokens) or None
+
+    def max_response_length_for(self, mode: str) -> int:
+        """Лимит видимого ответа режима в символах."""
+        return self._mode_tables['mode_max_response_length'].get(mode) or self.max_response_length
+
+    def max_sentences_for(self, mode: str) -> Optional[int]:
+        """Сколько предложений показывать в режиме (None - без ограничения)."""
+        return self._mode_tables['mode_max_sentences'].get(mode) or None
+
+    def think_for(self, mode: str) -> Optional[bool]:
+        """Опция think для Ollama: False выключает размышления, None - как решит модель."""
+        return None if mode in self.think_modes else False
+
+    @property
+    def ollama_endpoints(self) -> Tuple[str, ...]:
+        """Базовые адреса серверов Ollama: OLLAMA_API_URLS или один OLLAMA_API_URL."""
+        return tuple(api_base_url(url) for url in (self.ollama_api_urls or (self.ollama_api_url,)))
+
+    @classmethod
+    def from_mapping(cls, values: Mapping[str, Optional[str]]) -> "Settings":
+        """Собирает Settings из строковых значений (ключи - имена переменных)."""
+        hints = typing.get_type_hints(cls)
+        kwargs = {}
+        for f in fields(cls):
+            raw = values.get(f.name.upper())
+            if raw is None:
+                continue
+            # Пустое значение - значение по умолчанию (для списков - пустой список)
+            if raw.strip() == '' and typing.get_origin(hints[f.name]) is not tuple:
+                continue
+            try:
+                kwargs[f.name] = _convert(raw.strip(), hints[f.name])
+            except ValueError:
+                raise SettingsError(f"{f.name.upper()}={raw!r}: неверный формат") from None
+        return cls(**kwargs)
+
+
+def _mode_values(items: Tuple[str, ...], convert) -> dict:
+    """("ask:160", "void:96") -> {"ask": 160, "void": 96}."""
+    values = {}
+    for item in items:
+        mode, value = item.split(':')
+        values[mode.strip()] = convert(value)
+    return values
+
+
+def _convert(raw: str, hint):
+    if typing.get_origin(hint) is tuple:
+        # Список через запятую: "ask,void"
+        return tuple(item.strip() for item in raw.split(',') if item.strip())
+    # Optional[X] -> X
+    args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+    if args:
+        hint = args[0]
+    if hint is bool:
+        lowered = raw.lower()
+        if lowered in ('true', '1', 'yes', 'on'):
+            return True
+        if lowered in ('false', '0', 'no', 'off'):
+            return False
+        raise ValueError(raw)
+    if hint is int:
+        return int(raw)
+    if hint is float:
+        return float(raw)
+    return raw
+
+
+def api_base_url(url: str) -> str:
+    """Базовый адрес сервера из OLLAMA_API_URL (без /api/chat и /api/generate)."""
+    return url.replace('/api/chat', '').replace('/api/generate', '').rstrip('/')
+
+
+def load_settings(path: str = CONFIG_PATH) -> Settings:
+    """Читает config.env; переменные окружения процесса имеют приоритет над файлом."""
+    values = dict(dotenv_values(path)) if os.path.exists(path) else {}
+    for f in fields(Settings):
+        name = f.name.upper()
+        if name in os.environ:
+            values[name] = os.environ[name]
+    return Settings.from_mapping(values)
+
+
+_current: Optional[Settings] = None
+_lock = threading.Lock()
+_listeners: List[Callable[[Settings], None]] = []
+_watcher: Optional[threading.Thread] = None
+
+
+def get_settings() -> Settings:
+    """Текущий снимок настроек."""
+    global _current
+    if _current is None:
+        with _lock:
+            if _current is None:
+                _current = load_settings()
+    return _current
+
+
+def set_settings(settings: Settings) -> None:
+    """Атомарно подменяет снимок и оповещает подписчиков."""
+    global _current
+    with _lock:
+        _current = settings
+    for listener in list(_listeners):
+        try:
+            listener(settings)
+        except Exception as e:
+            print(f"[system] Ошибка применения настроек: {e}", file=sys.stderr)
+
+
+def reload_settings(path: str = CONFIG_PATH) -> Settings:
+    """Перечитывает config.env. При ошибке остается прежний снимок."""
+    try:
+        settings = load_settings(path)
+    except SettingsError as e:
+        print(f"[system] config.env не применен: {e}", file=sys.stderr)
+        return get_settings()
+    if settings != _current:
+        set_settings(settings)
+    return settings
+
+
+def on_reload(listener: Callable[[Settings], None]) -> None:
+    """Подписка на смену снимка настроек."""
+    _listeners.append(listener)
+
+
+def install_reload_handlers(path: str = CONFIG_PATH, interval: float = 2.0) -> None:
+    """Горячая перезагрузка: по SIGHUP и при изменении mtime файла.
+
+    Вызывать из главного потока (обработчик сигнала ставится только там).
+    """
+    global _watcher
+    if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_settings(path))
+
+    if _watcher is not None or interval <= 0:
+        return
+    _watcher = threading.Thread(target=_watch, args=(path, interval), daemon=True)
+    _watcher.start()
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _watch(path: str, interval: float) -> None:
+    last = _mtime(path)
+    stop = threading.Event()
+    while not stop.wait(interval):
+        current = _mtime(path)
+        if current != last:
+            last = current
+            reload_settings(path)
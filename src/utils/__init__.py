@@ -3,25 +3,40 @@
 Вспомогательные утилиты для Star_Void.
 
 Модули:
-    randomness: Рандомизация промптов, загрузка из файлов
+    randomness: Рандомизация промптов, генератор сессии (seeded)
     delay: Паузы перед ответом, эффект печати
     text: Фрагментация, обрезка, извлечение слов
+    transcript: Журнал диалогов с индексом для /history
+    render: Кадровый вывод ответа и анимация ожидания
 """
 
-from .delay import random_delay, typing_effect
-from .randomness import random_prompt, random_prompt_block, safe_format
-from .text import (
-    extract_random_word,
-    fragment_sentence,
-    reduce_text,
-    truncate_mid_sentence,
-)
+import importlib
+
+# Подмодули импортируются при первом обращении к имени (PEP 562)
+_EXPORTS = {
+    "random_prompt": "randomness",
+    "random_prompt_block": "randomness",
+    "safe_format": "randomness",
+    "get_rng": "randomness",
+    "seeded": "randomness",
+    "random_delay": "delay",
+    "typing_effect": "delay",
+    "fragment_sentence": "text",
+    "extract_random_word": "text",
+    "reduce_text": "text",
+    "truncate_mid_sentence": "text",
+    "TranscriptLogger": "transcript",
+    "get_transcript": "transcript",
+    "Renderer": "render",
+}
 
 __all__ = [
     # randomness
     "random_prompt",
     "random_prompt_block",
     "safe_format",
+    "get_rng",
+    "seeded",
     # delay
     "random_delay",
     "typing_effect",
@@ -30,4 +45,22 @@ __all__ = [
     "extract_random_word",
     "reduce_text",
     "truncate_mid_sentence",
+    # transcript
+    "TranscriptLogger",
+    "get_transcript",
+    # render
+    "Renderer",
 ]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -1,52 +1,73 @@
 # паузы, медленность
-import os
 import time
 import random
-from dotenv import load_dotenv
+import asyncio
+from typing import Callable, Optional
 
-load_dotenv("config/config.env")
+from src.settings import get_settings
+from src.utils.render import Renderer
 
-MIN_DELAY = float(os.getenv("MIN_DELAY_SEC", "0.5"))
-MAX_DELAY = float(os.getenv("MAX_DELAY_SEC", "2.0"))
-TYPING_SPEED = int(os.getenv("TYPING_SPEED_CPS", "30"))    
+def delay_seconds(min_sec: Optional[float] = None, max_sec: Optional[float] = None) -> float:
+    """Случайная пауза перед ответом в пределах MIN_DELAY_SEC..MAX_DELAY_SEC."""
+    settings = get_settings()
+    if min_sec is None:
+        min_sec = settings.min_delay_sec
+    if max_sec is None:
+        max_sec = settings.max_delay_sec
+    return random.uniform(min_sec, max_sec)
 
-def random_delay(min_sec: float = MIN_DELAY, max_sec: float = MAX_DELAY) -> None:
+def random_delay(min_sec: Optional[float] = None, max_sec: Optional[float] = None) -> None:
  
-    time.sleep(random.uniform(min_sec, max_sec))
-
-def typing_effect(text: str, chars_per_second: int = TYPING_SPEED) -> None:
-    
-    for char in text:
-        print(char, end = '', flush = True)
-        time.sleep(1 / chars_per_second)
-        
-    print()
-    
+    time.sleep(delay_seconds(min_sec, max_sec))
+
+def typing_effect(text: str, chars_per_second: Optional[int] = None) -> None:
+    """Печатает text со скоростью печати через Renderer. Только вне цикла событий."""
+
+    async def run() -> None:
+        renderer = Renderer(chars_per_second=chars_per_second)
+        renderer.start()
+        renderer.type(text)
+        renderer.write("\n")
+        await renderer.close()
+
+    asyncio.run(run())
+
+class LatencyHider:
+    """Пауза перед ответом, спрятанная за временем генерации.
+
+    Запрос к модели стартует сразу, а пауза MIN/MAX_DELAY_SEC становится
+    минимальным временем до показа: ответ появляется через
+    max(пауза, генерация), а не через их сумму. Куски ответа, пришедшие
+    раньше конца паузы, копятся и выводятся разом в reveal().
+    """
+
+    def __init__(self, seconds: float, emit: Callable[[str], None]):
+        self._emit = emit
+        self._buffer = []
+        self._revealed = False
+        self._pause = asyncio.get_running_loop().create_task(asyncio.sleep(seconds))
+
+    def push(self, chunk: str) -> None:
+        if self._revealed:
+            self._emit(chunk)
+        else:
+            self._buffer.append(chunk)
+
+    async def reveal(self) -> None:
+        """Дожидается конца паузы и отдает накопленное."""
+        await self._pause
+        self._revealed = True
+        buffered, self._buffer = self._buffer, []
+        for chunk in buffered:
+            self._emit(chunk)
+
+    def cancel(self) -> None:
+        self._pause.cancel()
+
 def weighted_delay(user_input: str) -> None:
     """Задержка зависит от длины ввода пользователя."""
-    base_delay = MIN_DELAY
+    settings = get_settings()
+    base_delay = settings.min_delay_sec
     input_length_factor = len(user_input) * 0.01
     calculated_delay = base_delay + input_length_factor
-    time.sleep(min(calculated_delay, MAX_DELAY))
-    
-
-def thinking_animation(duration: float = 2.0) -> None:
-    """Анимация 'мышления' с точками."""
-    import sys
-    
-    # Use the duration parameter or calculate based on config
-    total_duration = duration
-    dots_count = 0
-    
-    while total_duration > 0:
-        # Show thinking animation
-        sys.stdout.write('\r' + '.' * ((dots_count % 4) + 1))
-        sys.stdout.flush()
-        time.sleep(0.5)
-        total_duration -= 0.5
-        dots_count += 1
-    
-    # Clear the line
-    sys.stdout.write('\r')
-    sys.stdout.flush()
-    
\ No newline at end of file
+    time.sleep(min(calculated_delay, settings.max_delay_sec))
@@ -1,20 +1,54 @@
 # Утилиты для рандомизации промптов из src/config/ai
 import random
 import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Генератор текущей сессии; None - общий генератор модуля random
+_rng: ContextVar[Optional[random.Random]] = ContextVar("star_void_rng", default=None)
+
+
+def get_rng():
+    """Источник случайности хода: генератор сессии внутри seeded(), иначе модуль random."""
+    rng = _rng.get()
+    return random if rng is None else rng
+
+
+def session_rng(seed: int, session: str) -> random.Random:
+    """Генератор сессии: одинаковые seed и session дают одинаковую последовательность."""
+    return random.Random(f"{seed}:{session}")
+
+
+@contextmanager
+def seeded(seed: Optional[int], session: str = "default") -> Iterator[None]:
+    """Внутри блока text.py, silence.py, кэш и режимы берут случайность из генератора сессии.
+
+    Переменная контекста своя у каждого потока и задачи asyncio, поэтому
+    параллельные сессии не делят генератор. seed=None ничего не меняет.
+    """
+    if seed is None:
+        yield
+        return
+    token = _rng.set(session_rng(seed, session))
+    try:
+        yield
+    finally:
+        _rng.reset(token)
 
 
 def random_prompt(prompts_list=None):
     """Выбирает случайный промпт из списка."""
     if prompts_list is None:
         prompts_list = ["default", "basic", "simple"]
-    return random.choice(prompts_list)
+    return get_rng().choice(prompts_list)
 
 
 def random_prompt_block(block_dict=None):
     """Выбирает случайный блок промпта из словаря."""
     if block_dict is None:
         block_dict = {"default": "default content"}
-    key = random.choice(list(block_dict.keys()))
+    key = get_rng().choice(list(block_dict.keys()))
     return key, block_dict[key]
 
 
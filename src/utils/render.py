@@ -0,0 +1,173 @@
+# вывод ответа в терминал кадрами
+"""
+Один долгоживущий рендерер на весь диалог.
+
+Текст (готовая строка или поток токенов) и служебные строки попадают
+в общую очередь, а задача рендерера выводит их кадрами RENDER_FPS раз
+в секунду: одна запись и один flush на кадр вместо пары на каждый
+символ. Сколько символов показать, считается от монотонных часов
+с начала печати, поэтому скорость TYPING_SPEED_CPS не уплывает из-за
+накладных расходов sleep. Спиннер ожидания рисуется тем же циклом.
+"""
+
+import asyncio
+import sys
+import time
+from collections import deque
+from typing import Optional, TextIO
+
+from src.settings import get_settings
+
+SPINNER = [".  ", ".. ", "...", "  .", "   "]
+SPINNER_STEP = 0.1
+
+
+class Renderer:
+    """Кадровый вывод: write() - сразу в ближайшем кадре, type() - со скоростью печати."""
+
+    def __init__(
+        self,
+        out: Optional[TextIO] = None,
+        fps: Optional[int] = None,
+        chars_per_second: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.out = out or sys.stdout
+        self.fps = fps or settings.render_fps
+        self.chars_per_second = chars_per_second or settings.typing_speed_cps
+
+        self._segments = deque()    # [текст, печатать ли посимвольно]
+        self._spinning = False
+        self._spinner_frame: Optional[int] = None
+        self._typing_started = 0.0
+        self._typed = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Счетчики для /stats и бенчмарков
+        self.frames = 0
+        self.writes = 0
+
+    def start(self) -> None:
+        """Запускает цикл кадров в текущем цикле событий."""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            await self.drain()
+            self._task.cancel()
+            self._task = None
+
+    def write(self, text: str) -> None:
+        """Служебный текст (префикс, перевод строки) - целиком в ближайшем кадре."""
+        self._enqueue(text, False)
+
+    def type(self, text: str) -> None:
+        """Текст ответа - со скоростью печати. Можно вызывать на каждый токен потока."""
+        self._enqueue(text, True)
+
+    def spinner(self, active: bool) -> None:
+        """Включает или выключает анимацию ожидания."""
+        if active and not get_settings().use_thinking_animation:
+            return
+        self._spinning = active
+        self._wake_up()
+
+    def clear(self) -> None:
+        """Отбрасывает все, что еще не выведено (отмена хода)."""
+        self._segments.clear()
+        self._spinning = False
+        self._wake_up()
+
+    async def drain(self) -> None:
+        """Ждет, пока очередь не будет выведена полностью."""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    def _enqueue(self, text: str, typed: bool) -> None:
+        if not text:
+            return
+        if typed and not any(segment[1] for segment in self._segments):
+            # Печать началась заново: отсчет скорости - с этого момента
+            self._typing_started = time.monotonic()
+            self._typed = 0
+        self._segments.append([text, typed])
+        self._wake_up()
+
+    def _wake_up(self) -> None:
+        if self._idle is not None:
+            self._idle.clear()
+            self._wake.set()
+
+    async def _run(self) -> None:
+        interval = 1.0 / self.fps
+        while True:
+            if not self._segments and not self._spinning:
+                self._clear_spinner()
+                self._idle.set()
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            # Кадры отсчитываются от начала серии, а не от конца прошлого sleep
+            started = time.monotonic()
+            frame = 0
+            while self._segments or self._spinning:
+                self._frame()
+                frame += 1
+                delay = started + frame * interval - time.monotonic()
+                if delay < 0:
+                    # Опоздали больше чем на кадр - пропускаем кадры, а не догоняем
+                    frame = int((time.monotonic() - started) / interval) + 1
+                    delay = started + frame * interval - time.monotonic()
+                await asyncio.sleep(delay)
+
+    def _frame(self) -> None:
+        self.frames += 1
+        parts = []
+        if self._segments and self._spinner_frame is not None:
+            parts.append("\r   \r")
+            self._spinner_frame = None
+
+        # Сколько символов уже положено показать по часам
+        budget = int((time.monotonic() - self._typing_started) * self.chars_per_second) + 1 - self._typed
+        while self._segments:
+            segment = self._segments[0]
+            text, typed = segment
+            if not typed:
+                parts.append(text)
+                self._segments.popleft()
+                continue
+            if budget <= 0:
+                break
+            shown = text[:budget]
+            parts.append(shown)
+            budget -= len(shown)
+            self._typed += len(shown)
+            if len(shown) == len(text):
+                self._segments.popleft()
+            else:
+                segment[0] = text[len(shown):]
+
+        if not self._segments and self._spinning:
+            step = int(time.monotonic() / SPINNER_STEP)
+            if step != self._spinner_frame:
+                self._spinner_frame = step
+                parts.append(f"\r{SPINNER[step % len(SPINNER)]}")
+
+        if parts:
+            self.out.write("".join(parts))
+            self.out.flush()
+            self.writes += 1
+
+    def _clear_spinner(self) -> None:
+        if self._spinner_frame is not None:
+            self._spinner_frame = None
+            self.out.write("\r   \r")
+            self.out.flush()
+            self.writes += 1
@@ -1,7 +1,8 @@
 # обрезка, фрагментация
-import random
 import re
 
+from src.utils.randomness import get_rng
+
 def fragment_sentence(text: str) -> str:
     if len(text) == 0:
         return "i'm dead?"
@@ -10,10 +11,10 @@ def fragment_sentence(text: str) -> str:
         return text
         
     if len(text) <= 9:
-        cut_point = random.randint(5, len(text) - 2)
+        cut_point = get_rng().randint(5, len(text) - 2)
         return text[:cut_point] + "..."
 
-    cut_point = random.randint(7, len(text) - 3)
+    cut_point = get_rng().randint(7, len(text) - 3)
     return text[:cut_point] + "..."
 
 
@@ -26,9 +27,9 @@ def extract_random_word(text: str) -> str:
     signifficant_word = [w for w in word if len(w) > 3]
 
     if signifficant_word:
-        return random.choice(signifficant_word).strip(f".,?!:;")
+        return get_rng().choice(signifficant_word).strip(f".,?!:;")
     
-    return random.choice(word).strip(".,?!:;")
+    return get_rng().choice(word).strip(".,?!:;")
      
      
 def reduce_text(text: str, reduction_level: float = 0.5) -> str:
@@ -41,7 +42,7 @@ def reduce_text(text: str, reduction_level: float = 0.5) -> str:
     keep_count = max(1, int(len(words) * (1 - reduction_level)))
     
     # Сохранить порядок слов
-    indices = sorted(random.sample(range(len(words)), keep_count))
+    indices = sorted(get_rng().sample(range(len(words)), keep_count))
     kept_words = [words[i] for i in indices]
     
     return " ".join(kept_words)    
@@ -68,7 +69,7 @@ def ellipsis_replace(text: str, replacement_prob: float = 0.3) -> str:
     
     result = []
     for word in words:
-        if random.random() < replacement_prob:
+        if get_rng().random() < replacement_prob:
             result.append("...")
         else:
             result.append(word)
@@ -85,4 +86,4 @@ def abstract_text(text: str) -> str:
         "тишина",
         "ничто"
     ]
-    return random.choice(abstractions)
+    return get_rng().choice(abstractions)
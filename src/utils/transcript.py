@@ -0,0 +1,306 @@
+# журнал диалогов: фоновая запись JSONL-сегментов и индекс для /history
+"""
+Запись не блокирует ход: реплики кладутся в ограниченную очередь,
+фоновый поток забирает их пачками и дописывает в текущий сегмент
+(компактный JSONL). Сегмент больше TRANSCRIPT_SEGMENT_KB закрывается
+и при TRANSCRIPT_COMPRESS сжимается в .jsonl.gz.
+
+Рядом лежит SQLite-индекс: для каждого слова - в каких сегментах,
+у какой сессии и когда оно встречалось. Поиск /history читает только
+сегменты, где есть все слова запроса, а не весь архив.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from src.settings import Settings, get_settings
+
+_WORD = re.compile(r"\w+")
+# Слова короче не индексируются (предлоги, союзы)
+MIN_TERM = 3
+_STOP = object()
+
+
+def terms(text: str) -> Set[str]:
+    return {word for word in _WORD.findall(text.lower()) if len(word) >= MIN_TERM}
+
+
+class TranscriptLogger:
+    """Журнал реплик с фоновым писателем, ротацией и индексом по словам."""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 1024 * 1024,
+        compress: bool = True,
+        queue_size: int = 1000,
+        batch_size: int = 256,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compress = compress
+        self.batch_size = batch_size
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._index_path = os.path.join(directory, "index.sqlite3")
+        self._segment_id: Optional[int] = None
+        self._file = None
+        self._size = 0
+        self._sequence = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+        self._closed = False
+
+        db = self._connect()
+        db.executescript(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            " id INTEGER PRIMARY KEY, path TEXT NOT NULL, started REAL NOT NULL, ended REAL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL, segment INTEGER NOT NULL, session TEXT NOT NULL,"
+            " first_ts REAL NOT NULL, last_ts REAL NOT NULL,"
+            " PRIMARY KEY (term, segment, session)) WITHOUT ROWID;"
+        )
+        db.close()
+        self._thread.start()
+
+    def log(self, session: str, mode: str, role: str, text: str, source: Optional[str] = None) -> None:
+        """Кладет реплику в очередь. При переполнении реплика теряется, ход не ждет.
+
+        source - кто написал ответ, если не модель (например, "local").
+        """
+        if self._closed or not text:
+            return
+        entry = {"ts": round(time.time(), 3), "session": session, "mode": mode, "role": role, "text": text}
+        if source is not None:
+            entry["source"] = source
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ждет, пока все принятые реплики будут записаны и проиндексированы.
+
+        False - не дождались: журнал закрыт, писатель остановлен или
+        истек timeout.
+        """
+        if self._closed or not self._thread.is_alive():
+            return False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # queue.join() без таймаута: то же ожидание на условии очереди
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+
+    def search(self, query: str, session: Optional[str] = None, since: Optional[float] = None, limit: int = 10) -> List[dict]:
+        """Последние реплики, содержащие все слова запроса (слова - по префиксу)."""
+        words = [word for word in _WORD.findall(query.lower())]
+        if not words:
+            return []
+        db = self._connect()
+        try:
+            segments = self._candidates(db, words, session, since)
+            rows = db.execute("SELECT id, path FROM segments ORDER BY id DESC").fetchall()
+        finally:
+            db.close()
+
+        found = []
+        for segment_id, path in rows:
+            if segments is not None and segment_id not in segments:
+                continue
+            matches = [
+                entry for entry in _read_segment(path)
+                if (session is None or entry["session"] == session)
+                and (since is None or entry["ts"] >= since)
+                and all(word in entry["text"].lower() for word in words)
+            ]
+            found.extend(reversed(matches))
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+    # --- фоновый писатель ---
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self._index_path, timeout=5)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def _candidates(self, db, words: List[str], session: Optional[str], since: Optional[float]) -> Optional[Set[int]]:
+        """Сегменты, где встречаются все индексируемые слова; None - индекс не помогает."""
+        result = None
+        for word in words:
+            if len(word) < MIN_TERM:
+                continue
+            sql = "SELECT DISTINCT segment FROM postings WHERE term >= ? AND term < ?"
+            params = [word, word + "\U0010ffff"]
+            if session is not None:
+                sql += " AND session = ?"
+                params.append(session)
+            if since is not None:
+                sql += " AND last_ts >= ?"
+                params.append(since)
+            segments = {row[0] for row in db.execute(sql, params)}
+            result = segments if result is None else result & segments
+            if not result:
+                break
+        return result
+
+    def _run(self) -> None:
+        self._db = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                entries = [entry for entry in batch if entry is not _STOP]
+                try:
+                    if entries:
+                        self._write(entries)
+                except Exception:
+                    logging.getLogger("star_void").exception("Ошибка записи журнала")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if len(entries) != len(batch):
+                    break
+        finally:
+            self._finish_segment()
+            self._db.close()
+
+    def _write(self, entries: List[dict]) -> None:
+        if self._file is None:
+            self._open_segment(entries[0]["ts"])
+        data = "".join(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n" for entry in entries
+        ).encode("utf-8")
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        self._index(entries)
+        if self._size >= self.segment_bytes:
+            self._finish_segment()
+
+    def _index(self, entries: List[dict]) -> None:
+        postings: Dict[tuple, list] = {}
+        for entry in entries:
+            for term in terms(entry["text"]):
+                key = (term, self._segment_id, entry["session"])
+                span = postings.get(key)
+                if span is None:
+                    postings[key] = [entry["ts"], entry["ts"]]
+                else:
+                    span[1] = entry["ts"]
+        self._db.executemany(
+            "INSERT INTO postings (term, segment, session, first_ts, last_ts) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (term, segment, session) DO UPDATE SET last_ts = excluded.last_ts",
+            [(*key, first, last) for key, (first, last) in postings.items()],
+        )
+        self._db.commit()
+
+    def _open_segment(self, ts: float) -> None:
+        self._sequence += 1
+        name = time.strftime("%Y%m%d-%H%M%S", time.localtime(ts)) + f"-{os.getpid()}-{self._sequence}"
+        path = os.path.join(self.directory, f"transcript-{name}.jsonl")
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        cursor = self._db.execute("INSERT INTO segments (path, started) VALUES (?, ?)", (path, ts))
+        self._segment_id = cursor.lastrowid
+        self._db.commit()
+
+    def _finish_segment(self) -> None:
+        if self._file is None:
+            return
+        path = self._file.name
+        self._file.close()
+        self._file = None
+        if self.compress:
+            compressed = path + ".gz"
+            with open(path, "rb") as src, gzip.open(compressed, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+            path = compressed
+        self._db.execute(
+            "UPDATE segments SET path = ?, ended = ? WHERE id = ?", (path, time.time(), self._segment_id)
+        )
+        self._db.commit()
+        self._segment_id = None
+
+
+def _read_segment(path: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Недописанная строка текущего сегмента
+                    continue
+    except OSError:
+        return
+
+
+def configure_logging(settings: Optional[Settings] = None) -> None:
+    """Системный журнал в LOG_FILE с уровнем LOG_LEVEL (если ENABLE_LOGGING)."""
+    settings = settings or get_settings()
+    logger = logging.getLogger("star_void")
+    if not settings.enable_logging or logger.handlers:
+        return
+    directory = os.path.dirname(settings.log_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = logging.FileHandler(settings.log_file, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    level = logging.getLevelName(settings.log_level.upper())
+    logger.setLevel(level if isinstance(level, int) else logging.INFO)
+
+
+_transcript: Optional[TranscriptLogger] = None
+_transcript_lock = threading.Lock()
+
+
+def get_transcript(settings: Optional[Settings] = None) -> Optional[TranscriptLogger]:
+    """Общий журнал диалогов или None, если ENABLE_LOGGING выключен."""
+    global _transcript
+    settings = settings or get_settings()
+    if not settings.enable_logging:
+        return None
+    if _transcript is None:
+        with _transcript_lock:
+            if _transcript is None:
+                _transcript = TranscriptLogger(
+                    settings.transcript_dir,
+                    settings.transcript_segment_kb * 1024,
+                    settings.transcript_compress,
+                    settings.transcript_queue_size,
+                )
+                atexit.register(_transcript.close)
+    return _transcript
@@ -0,0 +1,39 @@
+# общие фикстуры: снимок настроек и заглушка Ollama из benchmarks/
+import dataclasses
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from ollama_stub import OllamaStub, StubConfig  # noqa: E402
+
+from src.settings import get_settings, set_settings  # noqa: E402
+
+
+@pytest.fixture
+def settings():
+    """Текущий снимок настроек; после теста возвращается на место."""
+    original = get_settings()
+    yield original
+    set_settings(original)
+
+
+@pytest.fixture
+def stub(settings):
+    """Заглушка Ollama без задержек; молчание, кэши и журнал выключены."""
+    with OllamaStub(StubConfig(ttft=0.0, tokens_per_sec=0.0, think_tokens=5)) as stub:
+        set_settings(dataclasses.replace(
+            settings,
+            ollama_api_url=stub.url,
+            ollama_api_urls=(),
+            model_name=stub.config.model,
+            response_cache=False,
+            semantic_cache=False,
+            distort_empty_probability=0.0,
+            silence_repeat_window_sec=0.0,
+            enable_logging=False,
+        ))
+        yield stub
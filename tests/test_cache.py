@@ -0,0 +1,57 @@
+# кэш ответов: LRU в памяти, SQLite, TTL и вероятность отдачи
+import time
+
+from src.ai.cache import ResponseCache, normalize_input
+
+
+def _key(user_input="мне пусто", mode="ask"):
+    return ResponseCache.make_key("model", mode, "prompt", user_input, {"temperature": 0.7})
+
+
+def test_key_ignores_case_and_spaces():
+    assert normalize_input("  Мне   ПУСТО ") == "мне пусто"
+    assert _key("  Мне   ПУСТО ") == _key()
+    assert _key(mode="void") != _key()
+
+
+def test_memory_lru_eviction():
+    cache = ResponseCache(None, capacity=2)
+    for i in range(3):
+        cache.put(_key(str(i)), f"ответ {i}")
+    assert cache.get(_key("0")) is None
+    assert cache.get(_key("2")) == "ответ 2"
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_survives_restart(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    cache = ResponseCache(path)
+    cache.put(_key(), "Пустота слушает.")
+    cache.close()
+
+    reopened = ResponseCache(path)
+    try:
+        assert reopened.get(_key()) == "Пустота слушает."
+        assert reopened.stats()["disk_hits"] == 1
+        assert reopened.get(_key()) == "Пустота слушает."
+        assert reopened.stats()["memory_hits"] == 1
+    finally:
+        reopened.close()
+
+
+def test_expired_entries_not_served(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttl=0.0)
+    try:
+        cache.put(_key(), "Пустота слушает.")
+        time.sleep(0.01)
+        assert cache.get(_key()) is None
+        assert cache.prune() == 1
+    finally:
+        cache.close()
+
+
+def test_serve_probability_zero_always_bypasses():
+    cache = ResponseCache(None, serve_probability=0.0)
+    cache.put(_key(), "Пустота слушает.")
+    assert cache.get(_key()) is None
+    assert cache.stats()["bypassed"] == 1
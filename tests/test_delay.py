@@ -0,0 +1,7 @@
+# паузы и эффект печати
+from src.utils.delay import typing_effect
+
+
+def test_typing_effect_prints_whole_text(capsys):
+    typing_effect("Пустота слушает.", chars_per_second=10_000)
+    assert capsys.readouterr().out == "Пустота слушает.\n"
@@ -0,0 +1,50 @@
+# режим distort: n-граммная модель строится только для запасного ответа
+import dataclasses
+import importlib
+
+from src.ai.ngram import _read_corpus
+from src.settings import get_settings, set_settings
+from src.utils.transcript import TranscriptLogger
+
+# src.modules.distort - это функция режима из src/modules/__init__.py, модуль берется отдельно
+distort_module = importlib.import_module("src.modules.distort")
+
+
+def _no_silence(**changes):
+    set_settings(dataclasses.replace(
+        get_settings(), distort_empty_probability=0.0, ollama_retry_attempts=0, **changes
+    ))
+
+
+def test_model_not_built_when_llm_answers(stub, monkeypatch):
+    _no_silence(distort_engine="fallback")
+
+    def fail(settings=None):
+        raise AssertionError("n-граммная модель не нужна, когда модель ответила")
+
+    monkeypatch.setattr(distort_module, "get_distorter", fail)
+    assert distort_module.distort("мне сегодня совсем пусто внутри")
+
+
+def test_fallback_used_when_backend_fails(stub):
+    stub.config.fail_first = 100
+    _no_silence(distort_engine="fallback")
+    assert distort_module.distort("мне сегодня совсем пусто внутри")
+    assert stub.requests["/api/chat"] == 1
+
+
+def test_local_replies_kept_out_of_transcript_corpus(tmp_path):
+    _no_silence(distort_engine="local", transcript_dir=str(tmp_path))
+    reply = distort_module.distort("мне сегодня совсем пусто внутри")
+    assert reply.source == "local"
+
+    transcript = TranscriptLogger(str(tmp_path))
+    try:
+        transcript.log("anna", "distort", "assistant", "пустота смотрит в ответ")
+        transcript.log("anna", "distort", "assistant", "эхо собственной модели", reply.source)
+        assert transcript.flush(timeout=5.0)
+    finally:
+        transcript.close()
+    # Только журнал, без файлов корпуса
+    settings = dataclasses.replace(get_settings(), distort_corpus=(), distort_corpus_transcripts=True)
+    assert list(_read_corpus(settings)) == ["пустота смотрит в ответ"]
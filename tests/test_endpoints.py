@@ -0,0 +1,55 @@
+# пул серверов: маршрутизация по нагрузке и размыкатель
+import time
+
+from src.ai.endpoints import EndpointPool
+
+
+def _pool(**kwargs):
+    return EndpointPool(["http://a:11434", "http://b:11434"], health_interval=0, **kwargs)
+
+
+def test_least_outstanding_routing():
+    pool = _pool()
+    try:
+        first = pool.acquire()
+        second = pool.acquire()
+        assert first is not second
+        pool.release(first)
+        assert pool.acquire() is first
+    finally:
+        pool.close()
+
+
+def test_breaker_opens_after_failures_and_closes_on_success():
+    pool = _pool(failure_threshold=2, cooldown=60.0)
+    try:
+        bad = pool.endpoints[0]
+        for _ in range(2):
+            pool.acquire(exclude=(pool.endpoints[1],))
+            pool.release(bad, ok=False)
+        assert bad.state(time.monotonic()) == "open"
+        # Разомкнутый сервер не получает запросов, пока есть другой
+        for _ in range(3):
+            endpoint = pool.acquire()
+            assert endpoint is pool.endpoints[1]
+            pool.release(endpoint)
+
+        # После паузы - пробный запрос; успех замыкает цепь
+        bad.open_until = 0.0
+        assert bad.state(time.monotonic()) == "half-open"
+        pool.acquire(exclude=(pool.endpoints[1],))
+        pool.release(bad, ok=True)
+        assert bad.state(time.monotonic()) == "ok"
+    finally:
+        pool.close()
+
+
+def test_all_open_still_tries_someone():
+    pool = _pool(failure_threshold=1, cooldown=60.0)
+    try:
+        for endpoint in pool.endpoints:
+            pool.acquire(exclude=tuple(e for e in pool.endpoints if e is not endpoint))
+            pool.release(endpoint, ok=False)
+        assert pool.acquire() is not None
+    finally:
+        pool.close()
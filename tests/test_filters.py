@@ -0,0 +1,84 @@
+# потоковый фильтр должен давать то же, что и фильтр готового ответа
+import dataclasses
+
+import pytest
+
+from src.ai.filters import FilterEngine
+from src.ai.responder import respond
+from src.settings import get_settings, set_settings
+
+TEXTS = [
+    "вы не один.",
+    "Понимаю. Вы не один, и мне жаль.",
+    "<think>долго думаю, лучше так</think>Пустота слушает. Сочувствую тебе.",
+    "Пустота.\nЛучше отдохни.\nТишина остается.",
+    "мне жаль\nвсё будет хорошо",
+    "Стоит помолчать. Ничего.",
+    "а" * 250 + ".",
+    "Первое. Второе! Третье? Четвертое.",
+    "<think>незакрытый блок",
+    "Текст без точки в конце",
+    "  пробелы вокруг.  ",
+    "Я с вами. Я с вами!\n\nПусто…",
+    "я с вами",
+    "Пустота слушает. Лучше отдохни.",
+    "Пустота слушает. Тебе нужно спать.\nТишина.",
+    "Лучше отдохни. Пустота слушает.\nТишина.",
+    "Пустота. Понимаю, стоит поспать! Тишина.",
+]
+
+
+def stream_all(engine: FilterEngine, text: str, size: int) -> str:
+    stream = engine.stream()
+    parts = []
+    for i in range(0, len(text), size):
+        parts.append(stream.feed(text[i:i + size]))
+        if stream.done:
+            break
+    parts.append(stream.flush())
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("size", range(1, 13))
+def test_stream_matches_apply(text, size):
+    engine = FilterEngine()
+    assert stream_all(engine, text, size) == engine.apply(text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("size", range(1, 13))
+@pytest.mark.parametrize("sentences", [1, 2, 3])
+def test_sentence_limit_stream_matches_apply(text, size, sentences):
+    engine = FilterEngine(max_sentences=sentences)
+    assert stream_all(engine, text, size) == engine.apply(text)
+
+
+def test_sentence_limit_keeps_line_breaks():
+    engine = FilterEngine(max_sentences=2)
+    assert engine.apply("Пустота.\nТишина.\nЕще.") == "Пустота.\nТишина."
+    assert engine.apply("мне жаль\nвсё будет хорошо") == "...\n..."
+    # "..." вместо фразы эмпатии - не конец предложения
+    assert engine.apply("Пустота слушает. Сочувствую тебе. Еще.") == "Пустота слушает. ... тебе."
+
+
+def test_advice_cut_from_its_sentence_to_line_end():
+    engine = FilterEngine()
+    assert engine.apply("Пустота слушает. Лучше отдохни.") == "Пустота слушает."
+    assert engine.apply("Пустота слушает. Тебе нужно спать.\nТишина.") == "Пустота слушает.\nТишина."
+    assert engine.apply("Лучше отдохни.\nТишина.") == "Тишина."
+
+
+def test_empathy_phrase_split_across_chunks():
+    engine = FilterEngine()
+    assert stream_all(engine, "вы не один.", 1) == "...."
+
+
+def test_streamed_turn_matches_whole_turn(stub):
+    stub.config.answer = "Понимаю тебя. Вы не один. Всё будет хорошо"
+    set_settings(dataclasses.replace(get_settings(), mode_max_sentences=()))
+    tokens = []
+    streamed = respond("мне пусто", "ask", on_token=tokens.append)
+    whole = respond("мне пусто", "ask")
+    assert streamed == whole == "".join(tokens)
+    assert "вы не один" not in streamed.lower()
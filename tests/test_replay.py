@@ -0,0 +1,50 @@
+# пакетный прогон: разбор входа и ошибки отдельных ходов
+import dataclasses
+import io
+import json
+import sys
+
+import pytest
+
+from src.replay import ReplayItem, main, read_inputs, replay
+from src.settings import get_settings, set_settings
+
+
+def test_read_inputs():
+    items = read_inputs([
+        '{"text": "мне пусто", "session": "anna", "mode": "ask"}\n',
+        "\n",
+        "просто строка\n",
+        '{"input": "кто ты"}\n',
+    ])
+    assert items == [
+        ReplayItem(0, "мне пусто", "anna", "ask"),
+        ReplayItem(1, "просто строка", "line-1"),
+        ReplayItem(2, "кто ты", "line-2"),
+    ]
+
+
+def test_unknown_mode_reported_with_line_number():
+    with pytest.raises(ValueError, match="строка 3"):
+        read_inputs(['{"text": "а"}', "", '{"text": "б", "mode": "shout"}'])
+
+
+def test_unknown_mode_fails_only_its_session(stub):
+    items = [ReplayItem(0, "мне пусто", "anna", "shout"), ReplayItem(1, "кто ты", "boris", "ask")]
+    output = io.StringIO()
+    replay(items, ["ask"], output, concurrency=2)
+    results = {result["index"]: result for result in map(json.loads, output.getvalue().splitlines())}
+    assert results[0]["output"] is None and "shout" in results[0]["error"]
+    assert results[1]["output"] and "error" not in results[1]
+
+
+def test_repeat_window_off_in_replay(stub, tmp_path, monkeypatch):
+    set_settings(dataclasses.replace(get_settings(), silence_repeat_window_sec=60.0))
+    inputs = tmp_path / "inputs.jsonl"
+    inputs.write_text('{"text": "мне пусто", "session": "anna"}\n' * 2, encoding="utf-8")
+    results = tmp_path / "results.jsonl"
+    monkeypatch.setattr(sys, "argv", ["replay", str(inputs), "--output", str(results)])
+    main()
+    outputs = [json.loads(line)["output"] for line in results.read_text(encoding="utf-8").splitlines()]
+    # Второй такой же ход не молчит: решение не зависит от того, как быстро шел прогон
+    assert len(outputs) == 2 and all(outputs)
@@ -0,0 +1,68 @@
+# ход целиком: кэши и история диалога
+import dataclasses
+
+from src.ai.cache import get_cache
+from src.ai.conversation import drop_session, get_conversation
+from src.ai.metrics import get_metrics
+from src.ai.responder import respond
+from src.settings import get_settings, set_settings
+
+
+def test_history_turns_bypass_cache_from_first_turn(stub):
+    set_settings(dataclasses.replace(
+        get_settings(),
+        history_modes=("psycholog",),
+        response_cache=True,
+        response_cache_path="",
+        response_cache_serve_probability=1.0,
+    ))
+    # Тот же ввод в режиме без истории уже в кэше
+    get_cache().clear()
+    session = "test-empty-history"
+    try:
+        for turn in range(2):
+            assert respond("мне пусто", "psycholog", session=session)
+            assert stub.requests["/api/chat"] == turn + 1
+        # Оба хода попали в историю, включая первый при пустой истории
+        assert len(get_conversation(session, "psycholog")) == 4
+        assert get_cache().stats()["memory_entries"] == 0
+    finally:
+        drop_session(session)
+
+
+def _counter(name, mode):
+    settings = get_settings()
+    return get_metrics().counters[(name, mode, settings.model)]
+
+
+def test_sentence_limit_closes_stream_and_counts_truncated(stub):
+    stub.config.answer = "Пустота слушает. Тишина остается. Что дальше?"
+    set_settings(dataclasses.replace(get_settings(), mode_max_sentences=("ask:1",)))
+    truncated = _counter("truncated", "ask")
+    tokens = []
+    assert respond("мне пусто", "ask", on_token=tokens.append) == "Пустота слушает."
+    assert "".join(tokens) == "Пустота слушает."
+    assert _counter("truncated", "ask") == truncated + 1
+
+
+def test_sentence_limit_keeps_context_for_history_modes(stub):
+    # Generate API: следующий ход досчитывает только новые токены по context
+    stub.config.chat_404 = True
+    stub.config.answer = "Я слышу тебя. Расскажи еще. Я рядом."
+    set_settings(dataclasses.replace(
+        get_settings(),
+        history_modes=("psycholog",),
+        mode_max_sentences=("psycholog:1",),
+        # context заглушки длиннее бюджета по умолчанию
+        history_token_budget=100_000,
+    ))
+    session = "test-truncated-context"
+    eval_tokens = _counter("eval_tokens", "psycholog")
+    try:
+        tokens = []
+        assert respond("мне пусто", "psycholog", on_token=tokens.append, session=session) == "Я слышу тебя."
+        assert "".join(tokens) == "Я слышу тебя."
+        assert get_conversation(session, "psycholog").context
+        assert _counter("eval_tokens", "psycholog") > eval_tokens
+    finally:
+        drop_session(session)
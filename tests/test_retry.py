@@ -0,0 +1,57 @@
+# повторы запроса: какие ошибки повторяются и срок хода
+import dataclasses
+import time
+
+import requests
+
+from src.ai.providers import ProviderError
+from src.ai.responder import respond
+from src.ai.retry import Deadline, RetryPolicy
+from src.settings import get_settings, set_settings
+
+
+def test_retryable_errors():
+    policy = RetryPolicy()
+    assert policy.retryable(requests.exceptions.ConnectionError())
+    assert policy.retryable(requests.exceptions.ReadTimeout())
+    assert policy.retryable(ProviderError("перегружен", 503))
+    assert not policy.retryable(ProviderError("нет модели", 404))
+    assert not policy.retryable(ValueError())
+
+
+def test_backoff_is_capped_full_jitter():
+    policy = RetryPolicy(attempts=10, base_delay=0.5, max_delay=2.0)
+    for attempt in range(10):
+        assert 0.0 <= policy.backoff(attempt) <= min(2.0, 0.5 * 2 ** attempt)
+
+
+def test_next_delay_respects_attempts_and_deadline():
+    policy = RetryPolicy(attempts=2, base_delay=0.01, max_delay=0.01)
+    error = ProviderError("перегружен", 503)
+    assert policy.next_delay(error, 0, Deadline(10.0)) is not None
+    assert policy.next_delay(error, 2, Deadline(10.0)) is None
+    # Пауза не помещается в срок - повтора нет
+    assert policy.next_delay(error, 0, Deadline(0.0)) is None
+
+
+def test_deadline_caps_attempt_timeouts():
+    deadline = Deadline(1.0)
+    connect, read = deadline.timeout(5.0, 120.0)
+    assert connect <= 1.0 and read <= 1.0
+    assert not deadline.expired
+
+
+def test_turn_retried_after_server_error(stub):
+    stub.config.fail_first = 2
+    set_settings(dataclasses.replace(get_settings(), ollama_retry_attempts=3, ollama_retry_delay=0.01))
+    assert respond("мне пусто", "ask")
+    assert stub.requests["/api/chat"] == 3
+
+
+def test_hung_server_bounded_by_turn_deadline(stub):
+    stub.config.hang_first = 1
+    stub.config.hang_time = 3.0
+    set_settings(dataclasses.replace(get_settings(), ollama_turn_deadline_sec=0.3, ollama_retry_attempts=3))
+    started = time.monotonic()
+    assert respond("мне пусто", "ask") is None
+    assert time.monotonic() - started < 1.5
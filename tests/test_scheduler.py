@@ -0,0 +1,79 @@
+# планировщик: приоритеты, бюджеты ожидания и сброс нагрузки
+import threading
+import time
+
+from src.ai.scheduler import Scheduler
+
+
+def _scheduler(capacity=1, queue_size=4, budgets=None):
+    return Scheduler(capacity, queue_size, {"psycholog": 0, "ask": 1, "void": 2}, budgets or {}, 5.0)
+
+
+def _wait_queued(scheduler, count):
+    while scheduler.stats()["queued"] < count:
+        time.sleep(0.001)
+
+
+def test_free_slot_admits_immediately():
+    scheduler = _scheduler(capacity=2)
+    assert scheduler.acquire("ask")
+    assert scheduler.acquire("void")
+    assert scheduler.stats()["running"] == 2
+
+
+def test_higher_priority_served_first():
+    scheduler = _scheduler()
+    assert scheduler.acquire("ask")
+    order = []
+
+    def turn(mode):
+        if scheduler.acquire(mode):
+            order.append(mode)
+            scheduler.release(0.01)
+
+    threads = [threading.Thread(target=turn, args=("void",))]
+    threads[0].start()
+    _wait_queued(scheduler, 1)
+    threads.append(threading.Thread(target=turn, args=("psycholog",)))
+    threads[1].start()
+    _wait_queued(scheduler, 2)
+    scheduler.release(0.01)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["psycholog", "void"]
+
+
+def test_over_budget_turn_is_shed():
+    scheduler = _scheduler(budgets={"void": 0.5})
+    assert scheduler.acquire("ask")
+    # Обращение к модели в среднем 2 с: void со своими 0.5 с в очередь не встает
+    scheduler.service_time = 2.0
+    started = time.monotonic()
+    assert not scheduler.acquire("void")
+    assert time.monotonic() - started < 0.1
+    assert scheduler.stats()["shed"] == 1
+
+
+def test_budget_expires_in_queue():
+    scheduler = _scheduler(budgets={"void": 0.05})
+    assert scheduler.acquire("ask")
+    assert not scheduler.acquire("void")
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_full_queue_evicts_least_important():
+    scheduler = _scheduler(queue_size=1)
+    assert scheduler.acquire("ask")
+    results = {}
+    waiting = threading.Thread(target=lambda: results.setdefault("void", scheduler.acquire("void")))
+    waiting.start()
+    _wait_queued(scheduler, 1)
+    # Очередь полна: ask вытесняет void, а еще один void молчит сразу
+    admitted = threading.Thread(target=lambda: results.setdefault("ask", scheduler.acquire("ask")))
+    admitted.start()
+    waiting.join(5)
+    assert results["void"] is False
+    assert not scheduler.acquire("void")
+    scheduler.release(0.01)
+    admitted.join(5)
+    assert results["ask"] is True
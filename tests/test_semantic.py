@@ -0,0 +1,67 @@
+# семантический кэш: поиск, область записи и отложенная запись на диск
+import dataclasses
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.ai import semantic  # noqa: E402
+from src.ai.responder import respond  # noqa: E402
+from src.ai.semantic import SemanticCache, get_semantic_cache, scope_of  # noqa: E402
+from src.settings import get_settings, set_settings  # noqa: E402
+
+semantic._load_numpy()
+
+
+def _vector(*values):
+    vector = semantic.np.asarray(values, dtype=semantic.np.float32)
+    return vector / semantic.np.linalg.norm(vector)
+
+
+def test_close_vector_is_served():
+    cache = SemanticCache("embed", threshold=0.9)
+    scope = scope_of("model", "ask")
+    cache.put("ask", scope, _vector(1, 0, 0), "мне пусто", "Пустота слушает.")
+    assert cache.get("ask", scope, _vector(1, 0.1, 0)) == "Пустота слушает."
+    assert cache.get("ask", scope, _vector(0, 1, 0)) is None
+    # Другой промпт или параметры - другая область
+    assert cache.get("ask", scope_of("model", "void"), _vector(1, 0, 0)) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_put_defers_save_until_close(tmp_path):
+    directory = str(tmp_path)
+    cache = SemanticCache("embed", threshold=0.9, directory=directory, save_interval=3600.0)
+    scope = scope_of("model", "ask")
+    cache.put("ask", scope, _vector(1, 0, 0), "мне пусто", "Пустота слушает.")
+    assert not any(name.endswith(".json") for name in os.listdir(directory))
+
+    cache.close()
+    assert any(name.endswith(".json") for name in os.listdir(directory))
+
+    reopened = SemanticCache("embed", threshold=0.9, directory=directory)
+    assert reopened.get("ask", scope, _vector(1, 0, 0)) == "Пустота слушает."
+
+
+def test_put_saves_after_interval(tmp_path):
+    directory = str(tmp_path)
+    cache = SemanticCache("embed", threshold=0.9, directory=directory, save_interval=0.0)
+    cache.put("ask", scope_of("model", "ask"), _vector(1, 0, 0), "мне пусто", "Пустота слушает.")
+    assert any(name.endswith(".json") for name in os.listdir(directory))
+
+
+def test_paraphrase_answered_without_generation(stub):
+    set_settings(dataclasses.replace(
+        get_settings(),
+        semantic_cache=True,
+        semantic_cache_dir="",
+        semantic_cache_threshold=0.7,
+        response_cache_serve_probability=1.0,
+    ))
+    first = respond("мне так пусто", "ask")
+    assert first
+    hits = get_semantic_cache().stats()["hits"]
+    assert respond("мне пусто", "ask") == first
+    assert stub.requests["/api/chat"] == 1
+    assert get_semantic_cache().stats()["hits"] == hits + 1
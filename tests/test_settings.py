@@ -0,0 +1,58 @@
+# настройки: списки "режим:значение" и их проверка
+import dataclasses
+
+import pytest
+
+from src.settings import Settings, SettingsError, _mode_values
+
+
+def test_mode_values_parsing():
+    assert _mode_values(("ask:160", " void : 96"), int) == {"ask": 160, "void": 96}
+    assert _mode_values(("psycholog:30", "void:2.5"), float) == {"psycholog": 30.0, "void": 2.5}
+    assert _mode_values((), int) == {}
+
+
+def test_mode_values_from_env_strings():
+    settings = Settings.from_mapping({
+        "MAX_TOKENS": "300",
+        "MODE_MAX_TOKENS": "ask:160,void:0",
+        "MODE_MAX_SENTENCES": "ask:2",
+        "MODE_MAX_RESPONSE_LENGTH": "distort:80",
+        "SCHEDULER_WAIT_BUDGETS": "ask:10,void:2",
+    })
+    assert settings.max_tokens_for("ask") == 160
+    # 0 - без лимита, режим без записи - общий MAX_TOKENS
+    assert settings.max_tokens_for("void") is None
+    assert settings.max_tokens_for("psycholog") == 300
+    assert settings.max_sentences_for("ask") == 2
+    assert settings.max_sentences_for("distort") is None
+    assert settings.max_response_length_for("distort") == 80
+    assert settings.max_response_length_for("ask") == settings.max_response_length
+    assert settings.wait_budgets == {"ask": 10.0, "void": 2.0}
+
+
+@pytest.mark.parametrize("name, value", [
+    ("MODE_MAX_TOKENS", "ask"),
+    ("MODE_MAX_TOKENS", "ask:много"),
+    ("MODE_MAX_SENTENCES", "ask:1:2"),
+    ("SCHEDULER_WAIT_BUDGETS", "ask:-1"),
+])
+def test_bad_mode_values_rejected(name, value):
+    with pytest.raises(SettingsError):
+        Settings.from_mapping({name: value})
+
+
+def test_replace_reparses_mode_values():
+    settings = Settings(mode_max_tokens=("ask:160",))
+    changed = dataclasses.replace(settings, mode_max_tokens=("ask:64",))
+    assert settings.max_tokens_for("ask") == 160
+    assert changed.max_tokens_for("ask") == 64
+    # Разобранные словари не участвуют в сравнении и хэше снимка
+    assert settings == Settings(mode_max_tokens=("ask:160",))
+    assert hash(settings) == hash(Settings(mode_max_tokens=("ask:160",)))
+
+
+def test_api_keys_hidden_from_repr():
+    settings = Settings(openai_api_key="sk-openai-secret", anthropic_api_key="sk-ant-secret")
+    assert "secret" not in repr(settings)
+    assert settings.openai_api_key == "sk-openai-secret"
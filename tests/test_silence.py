@@ -0,0 +1,34 @@
+# политика молчания: причины, повторы и забывание сессий
+import dataclasses
+
+from src.ai.silence import SilencePolicy, get_policy, should_be_silent
+from src.settings import Settings
+
+
+def test_reasons():
+    policy = SilencePolicy()
+    settings = Settings(silence_repeat_window_sec=0.0)
+    assert policy.decide("что угодно", "silence", settings) == "mode"
+    assert policy.decide("   ", "ask", settings) == "empty"
+    assert policy.decide("...", "ask", settings) == "punctuation"
+    assert policy.decide("мне пусто", "ask", settings) is None
+
+
+def test_repeat_is_per_session_and_forgotten():
+    policy = SilencePolicy()
+    settings = Settings(silence_repeat_window_sec=60.0)
+    assert policy.decide("мне пусто", "ask", settings, "anna") is None
+    assert policy.decide("мне пусто", "ask", settings, "anna") == "repeat"
+    assert policy.decide("мне пусто", "ask", settings, "boris") is None
+
+    policy.drop_session("anna")
+    assert policy.decide("мне пусто", "ask", settings, "anna") is None
+    assert ("boris", "ask") in policy._last
+
+
+def test_should_be_silent_follows_policy():
+    settings = dataclasses.replace(Settings(), silence_repeat_window_sec=0.0)
+    assert should_be_silent("...", "ask", settings)
+    assert not should_be_silent("мне пусто", "ask", settings)
+    assert should_be_silent("мне пусто", "silence", settings)
+    get_policy().drop_session("default")
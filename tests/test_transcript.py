@@ -0,0 +1,20 @@
+# журнал диалогов: flush с таймаутом и поиск по индексу
+from src.utils.transcript import TranscriptLogger
+
+
+def test_flush_then_search(tmp_path):
+    transcript = TranscriptLogger(str(tmp_path))
+    try:
+        transcript.log("anna", "ask", "user", "мне сегодня пусто")
+        transcript.log("anna", "ask", "assistant", "Пустота слушает.")
+        assert transcript.flush(timeout=5.0)
+        entries = transcript.search("пуст")
+        assert [entry["text"] for entry in entries] == ["Пустота слушает.", "мне сегодня пусто"]
+    finally:
+        transcript.close()
+
+
+def test_flush_does_not_wait_for_stopped_writer(tmp_path):
+    transcript = TranscriptLogger(str(tmp_path))
+    transcript.close()
+    assert not transcript.flush()
@@ -0,0 +1,25 @@
+# старт: готовность, список моделей и предзагрузка идут на все серверы пула
+import dataclasses
+
+from ollama_stub import OllamaStub, StubConfig
+
+from src.ai.warmup import ModelPreloader, list_models
+from src.settings import get_settings, set_settings
+
+
+def test_preload_and_models_use_every_pool_server(settings):
+    with OllamaStub(StubConfig(model="first:1b")) as first, OllamaStub(StubConfig(model="second:1b")) as second:
+        set_settings(dataclasses.replace(
+            settings, ollama_api_url="http://127.0.0.1:9", ollama_api_urls=(first.url, second.url)
+        ))
+        assert set(list_models(refresh=True)) >= {"first:1b", "second:1b"}
+
+        preloader = ModelPreloader("first:1b").start()
+        assert preloader.wait(10)
+        assert first.loaded and second.loaded
+        assert first.requests["/api/generate"] == second.requests["/api/generate"] == 1
+
+
+def test_list_models_none_when_no_server_answers(settings):
+    set_settings(dataclasses.replace(get_settings(), ollama_api_urls=("http://127.0.0.1:9",)))
+    assert list_models(refresh=True) is None